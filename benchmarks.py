@@ -0,0 +1,321 @@
+"""
+File: benchmarks.py
+Author: Joseph Armstrong
+Purpose: Measures how the gamelog parsers, and the season stats,
+    scale with the number of games. Synthetic gamelogs are generated
+    from the real ones in `Gamelogs/`, at 10, 100, and 1000 times
+    the current game count, and every parser is timed, and
+    memory-profiled, at every size.
+
+Example:
+    python benchmarks.py --scales 10 100 --output benchmarks.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # `resource` is only available on Unix.
+    # Without it, the peak RSS is not reported.
+    resource = None
+
+from gamelog_io import GAMELOG_EXTENSIONS, load_gamelog, save_gamelog
+from generate_season_stats import generate_usfl_season_stats
+from usfl import (
+    get_json_in_folder,
+    get_usfl_schedule,
+    parse_usfl_pbp,
+    parse_usfl_player_stats,
+)
+
+BENCHMARK_SCALES = [10, 100, 1000]
+
+# The parsers that are benchmarked, in the order they are ran.
+BENCHMARK_PARSERS = ["schedule", "player_stats", "pbp", "season_stats"]
+
+
+def generate_synthetic_gamelogs(
+    scale: int,
+    output_folder: str,
+    source_folder="Gamelogs",
+    compression="gzip"
+):
+    """
+    Generates `scale` copies of every gamelog in a folder. Every copy
+    is identical to its original, except for its game ID, so every
+    synthetic game is parsed as a separate game, in the same season.
+
+    Args:
+        scale (int):
+            Required parameter. The number of copies of every gamelog.
+
+        output_folder (str):
+            Required parameter. The folder the copies are saved in.
+
+        source_folder (str):
+            Optional parameter. The folder with the real gamelogs.
+
+        compression (str):
+            Optional parameter. The compression the copies are saved
+            with, see `save_gamelog()`. At 1000 times the current game
+            count, uncompressed copies take up tens of gigabytes.
+
+    Returns:
+        json_list (list):
+            The path of every synthetic gamelog.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    source_list = sorted(get_json_in_folder(source_folder))
+
+    # Every copy gets its own range of game IDs,
+    # so they never collide with the original IDs.
+    max_id = max(
+        int(os.path.basename(i).split(".")[0]) for i in source_list
+    )
+    id_stride = 10 ** len(str(max_id))
+
+    json_list = []
+    for source_file in source_list:
+        # Each real gamelog is only decoded once.
+        data = load_gamelog(source_file)
+        game_id = int(data["header"]["id"])
+        for i in range(scale):
+            new_id = str(game_id + (i * id_stride))
+            data["header"]["id"] = new_id
+            json_list.append(
+                save_gamelog(data, new_id, output_folder, compression)
+            )
+
+    return json_list
+
+
+def _run_benchmark(func, measure_memory: bool):
+    """
+    Runs a function once, and returns its result, the wall and CPU time
+    it took, and, if `measure_memory` is True, its peak memory.
+    """
+    if measure_memory is True:
+        tracemalloc.start()
+
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    result = func()
+    stats = {
+        "wall_seconds": time.perf_counter() - start_wall,
+        "cpu_seconds": time.process_time() - start_cpu,
+    }
+
+    if measure_memory is True:
+        stats["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    if resource is not None:
+        # `ru_maxrss` is in kilobytes on Linux,
+        # and is the peak of this whole process so far.
+        stats["max_rss_mb"] = (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        )
+
+    return result, stats
+
+
+def run_benchmarks(
+    scales=BENCHMARK_SCALES,
+    source_folder="Gamelogs",
+    workers=1,
+    compression="gzip",
+    measure_memory=True,
+    keep_files=False
+):
+    """
+    Benchmarks every parser in `BENCHMARK_PARSERS`, at every scale.
+
+    Every scale is ran in its own temporary folder, which is deleted
+    afterwards, unless `keep_files` is True. `tracemalloc` slows down
+    the code it traces, so if `measure_memory` is True, every parser
+    is ran a second time to measure its memory, and only the first run
+    is timed.
+
+    Args:
+        scales (list):
+            Optional parameter. How many times the current game count
+            is benchmarked, like `[10, 100, 1000]`.
+
+        source_folder (str):
+            Optional parameter. The folder with the real gamelogs.
+
+        workers (int):
+            Optional parameter. The number of processes
+            the gamelog parsers use.
+
+        compression (str):
+            Optional parameter. The compression synthetic gamelogs
+            are saved with.
+
+        measure_memory (bool):
+            Optional parameter. If True, the peak memory of every parser
+            is measured with `tracemalloc`.
+
+        keep_files (bool):
+            Optional parameter. If True, the temporary folders
+            are not deleted.
+
+    Returns:
+        results (list):
+            One `dict` for every parser, at every scale, with its time,
+            memory, and throughput in games/s and plays/s.
+    """
+    source_folder = os.path.abspath(source_folder)
+    start_folder = os.getcwd()
+    results = []
+
+    for scale in scales:
+        work_folder = tempfile.mkdtemp(prefix=f"usfl_benchmark_{scale}x_")
+        try:
+            json_list = generate_synthetic_gamelogs(
+                scale,
+                f"{work_folder}/Gamelogs",
+                source_folder,
+                compression
+            )
+            # The season stats are read from the CSVs in the working
+            # folder, so every run uses the games generated for it.
+            os.chdir(work_folder)
+
+            parsers = {
+                "schedule": lambda: get_usfl_schedule(
+                    json_list, save=False, workers=workers
+                ),
+                "player_stats": lambda: parse_usfl_player_stats(
+                    json_list, saveResults=False, workers=workers
+                ),
+                "pbp": lambda: parse_usfl_pbp(
+                    json_list, saveResults=False, workers=workers
+                ),
+                "season_stats": lambda: generate_usfl_season_stats(
+                    save=False
+                ),
+            }
+
+            scale_results = []
+            plays = 0
+            for parser in BENCHMARK_PARSERS:
+                df, stats = _run_benchmark(parsers[parser], False)
+                if measure_memory is True:
+                    _, memory_stats = _run_benchmark(parsers[parser], True)
+                    stats["peak_traced_mb"] = memory_stats["peak_traced_mb"]
+                    stats["max_rss_mb"] = memory_stats.get("max_rss_mb")
+
+                if parser == "player_stats":
+                    _save_game_stats(df)
+                elif parser == "pbp":
+                    plays = len(df)
+
+                stats.update({
+                    "parser": parser,
+                    "scale": scale,
+                    "games": len(json_list),
+                    "rows": len(df),
+                })
+                scale_results.append(stats)
+
+            # The number of plays is only known once the play-by-play
+            # data has been parsed, so plays/s is filled in last.
+            for stats in scale_results:
+                stats["plays"] = plays
+                stats["games_per_second"] = (
+                    stats["games"] / stats["wall_seconds"]
+                )
+                stats["plays_per_second"] = plays / stats["wall_seconds"]
+                print(_format_result(stats))
+            results += scale_results
+        finally:
+            os.chdir(start_folder)
+            if keep_files is False:
+                shutil.rmtree(work_folder, ignore_errors=True)
+
+    return results
+
+
+def _save_game_stats(game_stats_df):
+    """
+    Saves the player game stats of a benchmark, where
+    `generate_usfl_season_stats()` expects them.
+    """
+    os.makedirs("player_stats/game_stats", exist_ok=True)
+    seasons_arr = game_stats_df["season"].astype(int)
+    for season in sorted(seasons_arr.unique()):
+        game_stats_df[seasons_arr == season].to_csv(
+            f"player_stats/game_stats/{season}_player_game_stats.csv",
+            index=False
+        )
+
+
+def _format_result(stats: dict):
+    """
+    Formats the result of a single benchmark as one line of text.
+    """
+    line = (
+        f"{stats['scale']:>5}x {stats['parser']:<13} " +
+        f"{stats['games']:>7} games {stats['wall_seconds']:>9.3f}s wall " +
+        f"{stats['cpu_seconds']:>9.3f}s CPU " +
+        f"{stats['games_per_second']:>10.1f} games/s " +
+        f"{stats['plays_per_second']:>11.1f} plays/s"
+    )
+    if stats.get("peak_traced_mb") is not None:
+        line += f" {stats['peak_traced_mb']:>9.1f} MB peak"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the USFL gamelog parsers."
+    )
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="+",
+        default=BENCHMARK_SCALES,
+        help="How many times the current game count is benchmarked."
+    )
+    parser.add_argument("--source", default="Gamelogs")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--compression",
+        default="gzip",
+        choices=[c for c in GAMELOG_EXTENSIONS if c is not None]
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Do not measure the peak memory of every parser."
+    )
+    parser.add_argument("--keep-files", action="store_true")
+    parser.add_argument(
+        "--output",
+        help="A JSON file the results are saved to."
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        args.scales,
+        args.source,
+        args.workers,
+        args.compression,
+        not args.no_memory,
+        args.keep_files
+    )
+
+    if args.output is not None:
+        with open(args.output, "w+", encoding="utf8") as f:
+            f.write(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+File: cli.py
+Author: Joseph Armstrong
+Purpose: A command line interface, that runs one piece of the USFL
+    data pipeline at a time. Every module is only imported by the
+    command that needs it, so a single command starts quickly,
+    and only resolves the API key if it talks to the API.
+
+Example:
+    python cli.py run
+    python cli.py fetch-games 87-89
+    python cli.py player-stats --workers 4
+    python cli.py standings --seasons 2022 2023
+    python cli.py season-stats --rebuild
+"""
+
+import argparse
+import os
+
+from usfl_config import CURRENT_SEASON, CURRENT_WEEK
+
+
+def _parse_game_ids(game_ids: list):
+    """
+    Turns a list of game IDs, and inclusive ranges of game IDs
+    (like `"87-89"`), into a list of game IDs.
+    """
+    id_list = []
+    for game_id in game_ids:
+        if "-" in game_id:
+            first_id, last_id = game_id.split("-", 1)
+            id_list += range(int(first_id), int(last_id) + 1)
+        else:
+            id_list.append(int(game_id))
+    return id_list
+
+
+def _get_api_key(args):
+    from get_usfl_api_key import get_usfl_api_key
+
+    return get_usfl_api_key(args.key_path)
+
+
+def _run_fetch_games(args, report):
+    from usfl import get_usfl_games
+
+    with report.stage("fetch_games") as stage:
+        game_ids = get_usfl_games(
+            _parse_game_ids(args.game_ids),
+            _get_api_key(args),
+            max_workers=args.workers,
+            compression=args.compression
+        )
+        stage["games"] = len(game_ids)
+
+
+def _run_gamelog_parser(args, report):
+    from usfl import get_json_in_folder, parse_usfl_gamelogs
+
+    parse_usfl_gamelogs(
+        get_json_in_folder(args.folder),
+        schedule=args.command == "schedule",
+        player_stats=args.command == "player-stats",
+        pbp=args.command == "pbp",
+        save=not args.no_save,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+        report=report
+    )
+
+
+def _run_standings(args, report):
+    from usfl import get_usfl_standings
+
+    key = _get_api_key(args)
+    for season in args.seasons:
+        with report.stage(f"standings_{season}") as stage:
+            stage["rows"] = len(
+                get_usfl_standings(season, key, not args.no_save)
+            )
+
+
+def _run_rosters(args, report):
+    from usfl import get_usfl_rosters
+
+    key = _get_api_key(args)
+    for season in args.seasons:
+        with report.stage(f"rosters_{season}") as stage:
+            stage["rows"] = len(
+                get_usfl_rosters(season, key, args.week, not args.no_save)
+            )
+
+
+def _run_season_stats(args, report):
+    from generate_season_stats import (
+        generate_usfl_season_stats,
+        update_usfl_season_stats,
+    )
+
+    with report.stage("season_stats") as stage:
+        if args.seasons is None:
+            season_df, career_df = update_usfl_season_stats(
+                rebuild=args.rebuild,
+                verify=args.verify,
+                save=not args.no_save
+            )
+            stage["rows"] = len(season_df) + len(career_df)
+        else:
+            # Only the requested seasons are rebuilt from their CSVs.
+            season_df = generate_usfl_season_stats(
+                args.seasons,
+                save=not args.no_save
+            )
+            stage["rows"] = len(season_df)
+
+
+def _run_headshots(args, report):
+    from get_usfl_headshots import get_usfl_headshots
+
+    for season in args.seasons:
+        with report.stage(f"headshots_{season}"):
+            get_usfl_headshots(
+                season,
+                max_workers=args.workers,
+                revalidate=args.revalidate
+            )
+
+
+def _run_database(args, report):
+    from usfl_database import update_usfl_database
+
+    with report.stage("database") as stage:
+        stage["sources"] = sum(
+            update_usfl_database(rebuild=args.rebuild).values()
+        )
+
+
+def _run_pipeline(args, report):
+    from pipeline import get_usfl_stages, run_pipeline
+
+    stages = get_usfl_stages(args.workers, key_path=args.key_path)
+    if args.stages is not None:
+        stages = [stage for stage in stages if stage.name in args.stages]
+    run_pipeline(stages, report, args.force)
+
+
+def get_parser():
+    """
+    Returns the `argparse.ArgumentParser` of every command.
+    """
+    parser = argparse.ArgumentParser(
+        description="Downloads, and parses, USFL data."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Options every command has.
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument(
+        "--key-path",
+        default="",
+        help="A JSON file with the USFL API key, " +
+        "if it is not in the `USFL_KEY` environment variable."
+    )
+    common_parser.add_argument(
+        "--report",
+        help="Save a JSON report of how long every stage took to this file."
+    )
+    common_parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Profile the memory of every stage, and every game. " +
+        "Implies `--report`."
+    )
+
+    save_parser = argparse.ArgumentParser(add_help=False)
+    save_parser.add_argument(
+        "--no-save",
+        action="store_true",
+        help="Run, without saving anything."
+    )
+
+    seasons_parser = argparse.ArgumentParser(add_help=False)
+    seasons_parser.add_argument(
+        "--seasons",
+        type=int,
+        nargs="+",
+        default=[CURRENT_SEASON]
+    )
+
+    workers_parser = argparse.ArgumentParser(add_help=False)
+    workers_parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1
+    )
+
+    run_parser = subparsers.add_parser(
+        "run",
+        parents=[common_parser, workers_parser],
+        help="Run every stage of the pipeline, in dependency order, " +
+        "skipping stages whose inputs have not changed."
+    )
+    run_parser.add_argument(
+        "--stages",
+        nargs="+",
+        help="Only run these stages, like `parse_gamelogs standings`."
+    )
+    run_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run every stage, even if its inputs have not changed."
+    )
+    # A scheduled run always saves its report, see `RunReport`.
+    run_parser.set_defaults(func=_run_pipeline, save_report=True)
+
+    fetch_parser = subparsers.add_parser(
+        "fetch-games",
+        parents=[common_parser, workers_parser],
+        help="Download gamelogs into `Gamelogs/`."
+    )
+    fetch_parser.add_argument(
+        "game_ids",
+        nargs="+",
+        help="Game IDs, or inclusive ranges of game IDs, like `87-89`."
+    )
+    fetch_parser.add_argument(
+        "--compression",
+        choices=["gzip", "zstd"],
+        help="Save every gamelog minified, and compressed."
+    )
+    fetch_parser.set_defaults(func=_run_fetch_games)
+
+    for command, data in [
+        ("schedule", "the schedule"),
+        ("player-stats", "player and team game stats"),
+        ("pbp", "play-by-play data"),
+    ]:
+        gamelog_parser = subparsers.add_parser(
+            command,
+            parents=[common_parser, save_parser, workers_parser],
+            help=f"Parse {data} from every gamelog."
+        )
+        gamelog_parser.add_argument("--folder", default="Gamelogs")
+        gamelog_parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Reparse every gamelog, even if it has not changed."
+        )
+        gamelog_parser.set_defaults(func=_run_gamelog_parser)
+
+    standings_parser = subparsers.add_parser(
+        "standings",
+        parents=[common_parser, save_parser, seasons_parser],
+        help="Download the standings."
+    )
+    standings_parser.set_defaults(func=_run_standings)
+
+    rosters_parser = subparsers.add_parser(
+        "rosters",
+        parents=[common_parser, save_parser, seasons_parser],
+        help="Download every team's roster."
+    )
+    rosters_parser.add_argument(
+        "--week",
+        type=int,
+        default=CURRENT_WEEK,
+        help="Also save the rosters as this week's rosters. " +
+        "Set to 0 to only save the season rosters."
+    )
+    rosters_parser.set_defaults(func=_run_rosters)
+
+    season_stats_parser = subparsers.add_parser(
+        "season-stats",
+        parents=[common_parser, save_parser],
+        help="Update the player season and career stats."
+    )
+    season_stats_parser.add_argument(
+        "--seasons",
+        type=int,
+        nargs="+",
+        help="Rebuild the season stats of these seasons from their CSVs, " +
+        "instead of adding new games to every season."
+    )
+    season_stats_parser.add_argument("--rebuild", action="store_true")
+    season_stats_parser.add_argument("--verify", action="store_true")
+    season_stats_parser.set_defaults(func=_run_season_stats)
+
+    headshots_parser = subparsers.add_parser(
+        "headshots",
+        parents=[common_parser, seasons_parser],
+        help="Download the headshot of every rostered player."
+    )
+    headshots_parser.add_argument("--workers", type=int, default=4)
+    headshots_parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        help="Also check every saved headshot for a new image " +
+        "under the same URL. Sends a request for every headshot."
+    )
+    headshots_parser.set_defaults(func=_run_headshots)
+
+    database_parser = subparsers.add_parser(
+        "database",
+        parents=[common_parser],
+        help="Update the SQLite database with every dataset."
+    )
+    database_parser.add_argument("--rebuild", action="store_true")
+    database_parser.set_defaults(func=_run_database)
+
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+
+    from run_report import RUN_REPORT_FILE, RunReport
+
+    report = RunReport(profile_memory=args.profile_memory)
+    try:
+        args.func(args, report)
+    finally:
+        if args.report is not None:
+            report.save(args.report)
+        elif args.profile_memory is True or "save_report" in args:
+            report.save(RUN_REPORT_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+File: fox_api_client.py
+Author: Joseph Armstrong
+Purpose: A shared HTTP client for the FOX Sports bifrost API,
+    with connection pooling, keep-alive, and conditional requests
+    (`If-None-Match` / `If-Modified-Since`), so unchanged data
+    is not downloaded and saved again.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+FOX_API_URL = "https://api.foxsports.com/bifrost/v1/usfl"
+HTTP_CACHE_FILE = "cache/http_cache.json"
+HTTP_CACHE_FOLDER = "cache/http"
+
+# The stats of every `FoxApiClient.record_stats()` block the current
+# context is in. Threads only see it if they are started with
+# `contextvars.copy_context().run`, see `submit_in_context()`.
+_active_stats = contextvars.ContextVar("active_stats", default=())
+
+# Matches the API key in a URL, so it can be left out of error messages.
+_API_KEY_PATTERN = re.compile(r"(apikey=)[^&\s'\"]+")
+
+
+class FoxApiClient:
+    """
+    A thread-safe HTTP client with a pool of keep-alive connections.
+
+    For every URL, the `ETag` and `Last-Modified` headers of the last
+    response are stored in `cache_file`, and sent back as
+    `If-None-Match` and `If-Modified-Since` on the next request.
+    The `apikey` query parameter is never written to disk,
+    or included in the errors this client raises.
+
+    Args:
+        cache_file (str):
+            Optional parameter. Where the `ETag` and `Last-Modified`
+            headers of every URL are stored.
+
+        cache_folder (str):
+            Optional parameter. Where response bodies are stored,
+            for requests made with `cache_body=True`.
+
+        pool_size (int):
+            Optional parameter. The maximum number of
+            keep-alive connections per host.
+
+        timeout (int):
+            Optional parameter. The timeout of every request, in seconds.
+    """
+
+    def __init__(
+        self,
+        cache_file=HTTP_CACHE_FILE,
+        cache_folder=HTTP_CACHE_FOLDER,
+        pool_size=10,
+        timeout=30,
+    ):
+        self.cache_file = cache_file
+        self.cache_folder = cache_folder
+        self.timeout = timeout
+        self.request_count = 0
+        self.not_modified_count = 0
+        self.bytes_downloaded = 0
+        # The time every request took, in seconds, in the order
+        # they were sent. See `get_stats()`.
+        self.request_seconds = []
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        try:
+            with open(cache_file, "r", encoding="utf8") as f:
+                self._validators = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._validators = {}
+
+    def get(
+        self,
+        url: str,
+        params=None,
+        cache_body=True,
+        conditional=True,
+        store_validators=True
+    ):
+        """
+        Sends a GET request, with conditional headers
+        if this URL was requested before.
+
+        Args:
+            url (str):
+                Required parameter. The URL you want to request.
+
+            params (dict):
+                Optional parameter. Query parameters for this request.
+
+            cache_body (bool):
+                Optional parameter. If True, the response body is stored
+                in `cache_folder`, and returned again on a
+                `304 Not Modified` response. If False, the caller is
+                expected to have saved the body somewhere else.
+
+            conditional (bool):
+                Optional parameter. If False, no conditional headers
+                are sent, and the full response is always downloaded.
+                Useful if the caller lost its saved copy of the data.
+
+            store_validators (bool):
+                Optional parameter. If False, the `ETag` and
+                `Last-Modified` of the response are not stored. Set this
+                to False if `cache_body` is False, and the caller does
+                not save the response body, so the next request for this
+                URL does not get a `304 Not Modified` for a body that
+                was thrown away.
+
+        Returns:
+            content (bytes):
+                The response body. None if the server responded with
+                `304 Not Modified`, and `cache_body` is False
+                (or the cached body is missing).
+
+            is_modified (bool):
+                False if the server responded with `304 Not Modified`.
+        """
+        params = params or {}
+        cache_key = self._get_cache_key(url, params)
+        body_path = self._get_body_path(cache_key)
+
+        with self._lock:
+            validators = self._validators.get(cache_key, {})
+
+        if cache_body is True and not os.path.exists(body_path):
+            conditional = False
+
+        if conditional is False:
+            validators = {}
+
+        response = self._send(url, params, validators)
+        if response.status_code == 304:
+            if cache_body is True:
+                with open(body_path, "rb") as f:
+                    return f.read(), False
+            return None, False
+
+        _raise_for_status(response)
+        content = response.content
+
+        if cache_body is True:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            with open(body_path, "wb") as f:
+                f.write(content)
+
+        if store_validators is False:
+            return content, True
+
+        validators = _get_validators(response)
+        with self._lock:
+            if len(validators) > 0:
+                self._validators[cache_key] = validators
+            else:
+                self._validators.pop(cache_key, None)
+            self._save_validators()
+
+        return content, True
+
+    def get_with_validators(self, url: str, validators=None):
+        """
+        Sends a conditional GET request, with validators the caller
+        stores itself, instead of the ones in `cache_file`. Nothing is
+        written to `cache_file`, or to `cache_folder`, so this is meant
+        for many small files, like images, that are saved elsewhere
+        along with their validators.
+
+        Args:
+            url (str):
+                Required parameter. The URL you want to request.
+
+            validators (dict):
+                Optional parameter. The validators this URL returned
+                last time. If not set, the full response is downloaded.
+
+        Returns:
+            content (bytes):
+                The response body. None if the server responded with
+                `304 Not Modified`.
+
+            validators (dict):
+                The `etag` and `last_modified` of the response,
+                or `validators` if it was not modified.
+        """
+        validators = validators or {}
+        response = self._send(url, {}, validators)
+        if response.status_code == 304:
+            return None, validators
+
+        _raise_for_status(response)
+        return response.content, _get_validators(response)
+
+    def get_json(
+        self,
+        url: str,
+        params=None,
+        cache_body=True,
+        conditional=True,
+        store_validators=True
+    ):
+        """
+        Same as `get()`, but decodes the response body as JSON.
+
+        Returns:
+            json_data (dict):
+                The decoded response body, or None if there is no body
+                (see `get()`).
+
+            is_modified (bool):
+                False if the server responded with `304 Not Modified`.
+        """
+        content, is_modified = self.get(
+            url,
+            params=params,
+            cache_body=cache_body,
+            conditional=conditional,
+            store_validators=store_validators
+        )
+        if content is None:
+            return None, is_modified
+        return json.loads(content), is_modified
+
+    def get_stats(self):
+        """
+        Returns a snapshot of the requests this client has sent so far.
+
+        Returns:
+            stats (dict):
+                The number of `requests`, how many of them were
+                `not_modified`, the `bytes` downloaded, and the time
+                every request took (`request_seconds`).
+        """
+        with self._lock:
+            return {
+                "requests": self.request_count,
+                "not_modified": self.not_modified_count,
+                "bytes": self.bytes_downloaded,
+                "request_seconds": list(self.request_seconds),
+            }
+
+    @contextmanager
+    def record_stats(self):
+        """
+        Records the requests sent in this `with` block, by this thread,
+        and by threads it started with `submit_in_context()`.
+        Unlike `get_stats()`, requests sent at the same time by
+        unrelated threads are not counted.
+
+        Yields:
+            stats (dict):
+                The same keys as `get_stats()`, filled in as requests
+                are sent.
+        """
+        stats = {
+            "requests": 0,
+            "not_modified": 0,
+            "bytes": 0,
+            "request_seconds": [],
+        }
+        token = _active_stats.set(_active_stats.get() + (stats,))
+        try:
+            yield stats
+        finally:
+            _active_stats.reset(token)
+
+    def _send(self, url: str, params: dict, validators: dict):
+        """
+        Sends a GET request, with conditional headers built from
+        `validators`, and records it in the stats of this client.
+        """
+        headers = {}
+        if "etag" in validators:
+            headers["If-None-Match"] = validators["etag"]
+        if "last_modified" in validators:
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        start_time = time.perf_counter()
+        try:
+            response = self.session.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            raise _redact_error(e) from None
+
+        request_seconds = time.perf_counter() - start_time
+        is_not_modified = response.status_code == 304
+        with self._lock:
+            self.request_count += 1
+            self.request_seconds.append(request_seconds)
+            self.bytes_downloaded += len(response.content)
+            self.not_modified_count += int(is_not_modified)
+            for stats in _active_stats.get():
+                stats["requests"] += 1
+                stats["not_modified"] += int(is_not_modified)
+                stats["bytes"] += len(response.content)
+                stats["request_seconds"].append(request_seconds)
+        return response
+
+    def _get_cache_key(self, url: str, params: dict):
+        """
+        Returns the URL and query parameters of a request,
+        without the API key.
+        """
+        query = "&".join(
+            f"{k}={v}" for k, v in sorted(params.items()) if k != "apikey"
+        )
+        if len(query) > 0:
+            return f"{url}?{query}"
+        return url
+
+    def _get_body_path(self, cache_key: str):
+        key_hash = hashlib.sha1(cache_key.encode("utf8")).hexdigest()
+        return f"{self.cache_folder}/{key_hash}"
+
+    def _save_validators(self):
+        folder = os.path.dirname(self.cache_file)
+        if len(folder) > 0:
+            os.makedirs(folder, exist_ok=True)
+        with open(self.cache_file, "w+", encoding="utf8") as f:
+            f.write(json.dumps(self._validators, indent=2, sort_keys=True))
+
+
+def _redact_error(error: requests.RequestException):
+    """
+    Returns a copy of a `requests` exception, with the API key
+    taken out of its message, which includes the URL of the request.
+    Workflow logs are public, so the original is never printed.
+    """
+    return type(error)(
+        _API_KEY_PATTERN.sub(r"\1***", str(error)),
+        request=error.request,
+        response=error.response
+    )
+
+
+def _raise_for_status(response: requests.Response):
+    """
+    Same as `response.raise_for_status()`,
+    but without the API key in the error message.
+    """
+    try:
+        response.raise_for_status()
+    except requests.HTTPError as e:
+        raise _redact_error(e) from None
+
+
+def _get_validators(response: requests.Response):
+    """
+    Returns the `ETag` and `Last-Modified` headers of a response.
+    """
+    validators = {}
+    if response.headers.get("ETag") is not None:
+        validators["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified") is not None:
+        validators["last_modified"] = response.headers["Last-Modified"]
+    return validators
+
+
+def submit_in_context(executor, func, *args):
+    """
+    Same as `executor.submit(func, *args)`, but `func` runs in a copy of
+    the current context, so the requests it sends are counted by the
+    `FoxApiClient.record_stats()` block it was submitted from.
+    """
+    return executor.submit(contextvars.copy_context().run, func, *args)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_fox_api_client():
+    """
+    Returns the `FoxApiClient` shared by every module in this repository,
+    so they all reuse the same pool of connections.
+    """
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = FoxApiClient()
+    return _client
@@ -0,0 +1,161 @@
+"""
+File: gamelog_cache.py
+Author: Joseph Armstrong
+Purpose: Keeps track of which gamelogs in `Gamelogs/` have changed since
+    they were last parsed, and caches the parsed rows of every game,
+    so `usfl.py` only has to reparse new or changed gamelogs.
+"""
+
+import hashlib
+import json
+import os
+
+CACHE_FOLDER = "cache/gamelogs"
+MANIFEST_FILE = "cache/gamelog_manifest.json"
+
+# Bump this whenever one of the per-game parsers in `usfl.py`
+# changes what it returns, so every cached game is reparsed.
+CACHE_VERSION = 3
+
+
+def get_file_hash(file_path: str):
+    """
+    Returns the SHA-256 hash of a file's contents.
+
+    Args:
+        file_path (str):
+            Required parameter. The file you want hashed.
+
+    Returns:
+        file_hash (str):
+            The hex digest of this file's contents.
+    """
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_gamelog_key(game_file: str):
+    """
+    Returns the key a gamelog is stored under in the manifest and cache.
+    """
+    return os.path.relpath(game_file).replace("\\", "/")
+
+
+def load_gamelog_manifest(manifest_path=MANIFEST_FILE):
+    """
+    Loads the gamelog manifest. If it does not exist, or was written by
+    a different `CACHE_VERSION`, an empty manifest is returned instead.
+
+    Returns:
+        manifest (dict):
+            `{"version": int, "gamelogs": {key: {size, mtime, sha256}}}`
+    """
+    try:
+        with open(manifest_path, "r", encoding="utf8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+
+    if manifest.get("version") != CACHE_VERSION:
+        manifest = {"version": CACHE_VERSION, "gamelogs": {}}
+
+    return manifest
+
+
+def save_gamelog_manifest(manifest: dict, manifest_path=MANIFEST_FILE):
+    """
+    Saves the gamelog manifest, dropping every gamelog
+    that no longer exists.
+    """
+    manifest["gamelogs"] = {
+        k: v for k, v in manifest["gamelogs"].items() if os.path.exists(k)
+    }
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, "w+", encoding="utf8") as f:
+        f.write(json.dumps(manifest, indent=2, sort_keys=True))
+
+
+def is_gamelog_unchanged(game_file: str, manifest: dict):
+    """
+    Checks if a gamelog is unchanged since it was recorded in the manifest.
+
+    The size and modification time are checked first. Only if the
+    modification time changed (e.g. after a fresh `git checkout`),
+    the file is hashed, and the manifest is updated in place
+    if the contents turn out to be the same.
+
+    Returns:
+        True if this gamelog does not need to be reparsed,
+        False otherwise.
+    """
+    entry = manifest["gamelogs"].get(get_gamelog_key(game_file))
+    if entry is None:
+        return False
+
+    stat = os.stat(game_file)
+    if stat.st_size != entry["size"]:
+        return False
+    elif stat.st_mtime == entry["mtime"]:
+        return True
+    elif get_file_hash(game_file) == entry["sha256"]:
+        entry["mtime"] = stat.st_mtime
+        return True
+
+    return False
+
+
+def update_gamelog_manifest(game_file: str, manifest: dict):
+    """
+    Records the current size, modification time and hash
+    of a gamelog in the manifest.
+    """
+    stat = os.stat(game_file)
+    manifest["gamelogs"][get_gamelog_key(game_file)] = {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": get_file_hash(game_file),
+    }
+
+
+def get_cached_game_path(game_file: str, cache_folder=CACHE_FOLDER):
+    """
+    Returns the path of the cached rows for a gamelog.
+    """
+    game_name = os.path.basename(game_file).split(".")[0]
+    return f"{cache_folder}/{game_name}.json"
+
+
+def load_cached_game(game_file: str, cache_folder=CACHE_FOLDER):
+    """
+    Loads the cached per-game rows of a gamelog.
+
+    Returns:
+        game (dict):
+            The cached `schedule`, `player_stats` and `pbp` rows of this
+            game, or None if this game has not been cached.
+    """
+    try:
+        with open(
+            get_cached_game_path(game_file, cache_folder),
+            "r",
+            encoding="utf8"
+        ) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_cached_game(game_file: str, game: dict, cache_folder=CACHE_FOLDER):
+    """
+    Caches the per-game rows of a gamelog.
+    """
+    os.makedirs(cache_folder, exist_ok=True)
+    with open(
+        get_cached_game_path(game_file, cache_folder),
+        "w+",
+        encoding="utf8"
+    ) as f:
+        f.write(json.dumps(game))
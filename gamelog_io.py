@@ -0,0 +1,220 @@
+"""
+File: gamelog_io.py
+Author: Joseph Armstrong
+Purpose: Reads and writes USFL gamelogs in `Gamelogs/`, either as plain
+    `.json` files, or minified and compressed `.json.gz` / `.json.zst`
+    files. Reading can optionally only decode the top-level sections
+    a parser asks for.
+"""
+
+import gzip
+import json
+import os
+
+try:
+    import ijson
+except ImportError:
+    # `ijson` is optional. Without it, gamelogs are always fully decoded.
+    ijson = None
+
+try:
+    import zstandard
+except ImportError:
+    # `zstandard` is optional, and only needed for `.json.zst` gamelogs.
+    zstandard = None
+
+# Every file extension a gamelog can be saved with, by compression.
+GAMELOG_EXTENSIONS = {
+    None: ".json",
+    "gzip": ".json.gz",
+    "zstd": ".json.zst",
+}
+
+# Every top-level section of a gamelog, in the order they are stored in.
+GAMELOG_SECTIONS = [
+    "header",
+    "boxscore",
+    "pbp",
+    "linescore",
+    "alternateLinescore",
+    "keyPlays",
+    "trackingData",
+    "metadata",
+]
+
+# Sections that are large enough that `json.load()` decodes them faster
+# than `ijson` can stream them.
+LARGE_GAMELOG_SECTIONS = ["boxscore", "pbp", "keyPlays"]
+
+
+def is_gamelog_file(file_name: str):
+    """
+    Returns True if this file name has one of the `GAMELOG_EXTENSIONS`.
+    """
+    return any(file_name.endswith(e) for e in GAMELOG_EXTENSIONS.values())
+
+
+def find_gamelog(gameID: int, folder="Gamelogs"):
+    """
+    Returns the path of the saved gamelog for a game,
+    in whichever format it was saved in, or None if it was not saved.
+    """
+    for extension in GAMELOG_EXTENSIONS.values():
+        game_file = f"{folder}/{gameID}{extension}"
+        if os.path.exists(game_file):
+            return game_file
+    return None
+
+
+def open_gamelog(game_file: str):
+    """
+    Opens a gamelog for reading, in binary mode.
+    Compressed gamelogs are decompressed transparently.
+    """
+    if game_file.endswith(GAMELOG_EXTENSIONS["gzip"]):
+        return gzip.open(game_file, "rb")
+    elif game_file.endswith(GAMELOG_EXTENSIONS["zstd"]):
+        if zstandard is None:
+            raise ImportError(
+                "`zstandard` must be installed to read " +
+                f"`{game_file}`."
+            )
+        return zstandard.open(game_file, "rb")
+    return open(game_file, "rb")
+
+
+def save_gamelog(
+    json_data: dict,
+    gameID: int,
+    folder="Gamelogs",
+    compression=None
+):
+    """
+    Saves a gamelog, and removes any copy of this game
+    that was saved in a different format.
+
+    Args:
+        json_data (dict):
+            Required parameter. The game data you want saved.
+
+        gameID (int):
+            Required parameter. The ID of this game.
+
+        folder (str):
+            Optional parameter. The folder gamelogs are saved in.
+
+        compression (str):
+            Optional parameter. If not set, the gamelog is saved as
+            an indented `.json` file. If set to `"gzip"` or `"zstd"`,
+            the gamelog is saved minified, as a `.json.gz` or `.json.zst`
+            file. `"zstd"` needs `zstandard` to be installed.
+
+    Returns:
+        game_file (str):
+            The path the gamelog was saved to.
+    """
+    if compression not in GAMELOG_EXTENSIONS:
+        raise ValueError(
+            f"Unsupported gamelog compression: `{compression}`."
+        )
+
+    game_file = f"{folder}/{gameID}{GAMELOG_EXTENSIONS[compression]}"
+
+    if compression is None:
+        with open(game_file, "w+") as f:
+            f.write(json.dumps(json_data, indent=2))
+    else:
+        content = json.dumps(json_data, separators=(",", ":")).encode("utf8")
+        if compression == "gzip":
+            # `mtime=0` keeps the file identical if the game is unchanged.
+            with gzip.GzipFile(game_file, "wb", mtime=0) as f:
+                f.write(content)
+        elif zstandard is None:
+            raise ImportError(
+                "`zstandard` must be installed to save `.json.zst` gamelogs."
+            )
+        else:
+            with open(game_file, "wb") as f:
+                f.write(zstandard.ZstdCompressor(level=19).compress(content))
+
+    for extension in GAMELOG_EXTENSIONS.values():
+        old_file = f"{folder}/{gameID}{extension}"
+        if old_file != game_file and os.path.exists(old_file):
+            os.remove(old_file)
+
+    return game_file
+
+
+def compress_gamelogs(folder="Gamelogs", compression="gzip"):
+    """
+    Re-saves every gamelog in a folder with the given compression.
+
+    Example:
+        compress_gamelogs("Gamelogs", "gzip")
+    """
+    for file_name in sorted(os.listdir(folder)):
+        if is_gamelog_file(file_name) and not file_name.endswith(
+            GAMELOG_EXTENSIONS[compression]
+        ):
+            gameID = file_name.split(".")[0]
+            save_gamelog(
+                load_gamelog(f"{folder}/{file_name}"),
+                gameID,
+                folder,
+                compression
+            )
+
+
+def load_gamelog(game_file: str, sections=None):
+    """
+    Opens and decodes a single USFL gamelog.
+
+    Args:
+        game_file (str):
+            Required parameter. The path to a gamelog file,
+            as returned by `get_json_in_folder()`. This can be a
+            plain `.json` file, or a compressed one.
+
+        sections (list):
+            Optional parameter. The top-level sections of the gamelog
+            you want, like `["header", "metadata"]`. Other sections are
+            skipped. If `ijson` is installed, and none of these sections
+            are in `LARGE_GAMELOG_SECTIONS`, the gamelog is streamed,
+            so the large sections are never decoded at all.
+            If not set, every section is returned.
+
+    Returns:
+        data (dict):
+            The decoded gamelog, or the requested sections of it.
+    """
+    if sections is None:
+        with open_gamelog(game_file) as f:
+            return json.load(f)
+
+    if ijson is not None and all(
+        s not in LARGE_GAMELOG_SECTIONS for s in sections
+    ):
+        return _stream_gamelog_sections(game_file, sections)
+
+    with open_gamelog(game_file) as f:
+        data = json.load(f)
+    return {s: data[s] for s in sections if s in data}
+
+
+def _stream_gamelog_sections(game_file: str, sections: list):
+    """
+    Streams the requested top-level sections out of a gamelog with
+    `ijson`. Each section is found with a separate pass over the file,
+    which `ijson`'s C backend does without building any Python objects
+    for the sections in between. A pass stops as soon
+    as its section has been read.
+    """
+    data = {}
+    for section in sections:
+        # Compressed streams can't always seek backwards,
+        # so the file is opened again for every pass.
+        with open_gamelog(game_file) as f:
+            for value in ijson.items(f, section, use_float=True):
+                data[section] = value
+                break
+    return data
@@ -1,340 +1,639 @@
-# import os
+import argparse
+import glob
+import json
+import os
 
 import pandas as pd
 
-
-def generate_usfl_player_season_stats(season: int, save=False):
-    games_df = pd.read_csv(
-        f"player_stats/game_stats/{season}_player_game_stats.csv"
-    )
-    games_df["G"] = 1
-    # print(games_df.columns)
-    season_df = pd.DataFrame(
-        games_df.groupby(
-            ["season", "team", "team_nickname", "player_id", "player_name"],
-            as_index=False,
-        )[
-            [
-                "G",
-                "COMP",
-                "ATT",
-                "PASS_YDS",
-                "PASS_TD",
-                "PASS_INT",
-                "RUSH",
-                "RUSH_YDS",
-                "RUSH_TD",
-                "REC_TARGETS",
-                "REC",
-                "REC_YDS",
-                "REC_TD",
-                "FUMBLES",
-                "FUMBLES_LOST",
-                "FF",
-                "FR",
-                "TOTAL",
-                "SOLO",
-                "AST",
-                "TFL",
-                "SACKS",
-                "INT",
-                "PD",
-                "DEF_TD",
-                "FGM",
-                "FGA",
-                "FG%",
-                "XPM",
-                "XPA",
-                "XP%",
-                "PUNTS",
-                "GROSS_PUNT_YDS",
-                "GROSS_PUNT AVG",
-                "NET_PUNT_YDS",
-                "NET_PUNT_AVG",
-                "PUNT_TB",
-                "PUNTS_IN_20",
-                "PUNTS_BLK",
-                "PR",
-                "PR_YDS",
-                "PR_AVG",
-                "PR_TD",
-                "KR",
-                "KR_YDS",
-                "KR_AVG",
-                "KR_TD",
-            ]
-        ].sum()
-    )
-
-    season_max_df = pd.DataFrame(
-        games_df.groupby(
-            ["season", "team", "team_nickname", "player_id", "player_name"],
-            as_index=False,
-        )[[
-            "RUSH_LONG",
-            "REC_LONG",
-            "PUNT_LONG",
-            "FG_LONG",
-            "PR_LONG",
-            "KR_LONG"
-        ]].max()
+from metrics import SEASON_METRICS, compute_metrics
+from run_report import RunReport
+from schemas import apply_schema, read_csv_with_schema
+from utils import load_parquet_partitions, load_partition_manifest
+
+GAME_STATS_FOLDER = "player_stats/game_stats"
+
+# The partitioned Parquet copy of the game stats saved by `usfl.py`.
+GAME_STATS_DATASET = "player_stats/game_stats/parquet"
+
+SEASON_STATS_FOLDER = "player_stats/season_stats"
+CAREER_STATS_FOLDER = "player_stats/career_stats"
+
+# How long the season stats took to update, see `RunReport`.
+SEASON_STATS_REPORT_FILE = "cache/season_stats_run_report.json"
+
+# The running totals of every player season, and the game stats
+# partitions that have been added to them. See `update_usfl_season_stats()`.
+SEASON_STATE_FOLDER = "cache/season_stats"
+
+# Every season stats row is one player, on one team, in one season.
+SEASON_STATS_KEYS = [
+    "season",
+    "team",
+    "team_nickname",
+    "player_id",
+    "player_name"
+]
+
+# Every career stats row is one player.
+CAREER_STATS_KEYS = ["player_id", "player_name"]
+
+# Every team season stats row is one team, in one season.
+TEAM_SEASON_STATS_KEYS = ["season", "team", "team_nickname"]
+
+# Game stats that are added up over a season.
+SEASON_SUM_COLUMNS = [
+    "COMP",
+    "ATT",
+    "PASS_YDS",
+    "PASS_TD",
+    "PASS_INT",
+    "RUSH",
+    "RUSH_YDS",
+    "RUSH_TD",
+    "REC_TARGETS",
+    "REC",
+    "REC_YDS",
+    "REC_TD",
+    "FUMBLES",
+    "FUMBLES_LOST",
+    "FF",
+    "FR",
+    "TOTAL",
+    "SOLO",
+    "AST",
+    "TFL",
+    "SACKS",
+    "INT",
+    "PD",
+    "DEF_TD",
+    "FGM",
+    "FGA",
+    "FG%",
+    "XPM",
+    "XPA",
+    "XP%",
+    "PUNTS",
+    "GROSS_PUNT_YDS",
+    "GROSS_PUNT AVG",
+    "NET_PUNT_YDS",
+    "NET_PUNT_AVG",
+    "PUNT_TB",
+    "PUNTS_IN_20",
+    "PUNTS_BLK",
+    "PR",
+    "PR_YDS",
+    "PR_AVG",
+    "PR_TD",
+    "KR",
+    "KR_YDS",
+    "KR_AVG",
+    "KR_TD",
+]
+
+# Game stats where the season value is the best single game.
+SEASON_MAX_COLUMNS = [
+    "RUSH_LONG",
+    "REC_LONG",
+    "PUNT_LONG",
+    "FG_LONG",
+    "PR_LONG",
+    "KR_LONG",
+]
+
+# The columns of the player season stats, in order.
+SEASON_STATS_COLUMNS = [
+    "season",
+    "team",
+    "team_nickname",
+    "player_id",
+    "player_name",
+    "G",
+    "COMP",
+    "ATT",
+    "COMP%",
+    "PASS_YDS",
+    "PASS_TD",
+    "PASS_TD%",
+    "PASS_INT",
+    "PASS_INT%",
+    "PASS_YPA",
+    "PASS_AY/A",
+    "PASS_YPC",
+    "PASS_YDS/G",
+    "NFL_QBR",
+    "CFB_QBR",
+    "RUSH",
+    "RUSH_YDS",
+    "RUSH_TD",
+    "RUSH_AVG",
+    "RUSH_LONG",
+    "RUSH_ATT/G",
+    "RUSH_YDS/G",
+    "REC_TARGETS",
+    "REC",
+    "REC_YDS",
+    "REC_AVG",
+    "REC_TD",
+    "CATCH%",
+    "REC_YDS/TARGET",
+    "REC_YDS/G",
+    "FUMBLES",
+    "FUMBLES_LOST",
+    "FF",
+    "FR",
+    "TOTAL",
+    "SOLO",
+    "AST",
+    "TFL",
+    "SACKS",
+    "INT",
+    "PD",
+    "DEF_TD",
+    "FGM",
+    "FGA",
+    "FG%",
+    "FG_LONG",
+    "XPM",
+    "XPA",
+    "XP%",
+    "PUNTS",
+    "GROSS_PUNT_YDS",
+    "GROSS_PUNT AVG",
+    "NET_PUNT_YDS",
+    "NET_PUNT_AVG",
+    "PUNT_TB",
+    "PUNTS_IN_20",
+    "PUNTS_BLK",
+    "PUNT_LONG",
+    "PR",
+    "PR_YDS",
+    "PR_AVG",
+    "PR_TD",
+    "PR_LONG",
+    "KR",
+    "KR_YDS",
+    "KR_AVG",
+    "KR_TD",
+    "KR_LONG",
+]
+
+
+def get_game_stats_seasons(folder=GAME_STATS_FOLDER):
+    """
+    Returns every season that has a player game stats file, in order.
+    """
+    return sorted(
+        int(os.path.basename(f).split("_")[0])
+        for f in glob.glob(f"{folder}/*_player_game_stats.csv")
     )
 
-    season_df = pd.merge(
-        season_df,
-        season_max_df,
-        how="left",
-        on=[
-            "season",
-            "team",
-            "team_nickname",
-            "player_id",
-            "player_name"
-        ]
-    )
-    season_df.loc[season_df["ATT"] > 0, "COMP%"] = (
-        season_df["COMP"] / season_df["ATT"]
-    ) * 100
-    season_df["COMP%"] = season_df["COMP%"].round(3)
 
-    season_df.loc[season_df["ATT"] > 0, "PASS_TD%"] = (
-        season_df["PASS_TD"] / season_df["ATT"]
-    )
-    season_df["PASS_TD%"] = season_df["PASS_TD%"].round(3)
-
-    season_df.loc[season_df["ATT"] > 0, "PASS_INT%"] = (
-        season_df["PASS_INT"] / season_df["ATT"]
+def generate_usfl_player_season_stats(season: int, save=False):
+    """
+    Generates the player season stats of a single season.
+    See `generate_usfl_season_stats()`.
+    """
+    return generate_usfl_season_stats([season], save)
+
+
+def generate_usfl_season_stats(seasons=None, save=False):
+    """
+    Generates player season stats for any number of seasons at once.
+
+    The game stats of every season are read, and aggregated with a
+    single groupby, which adds up every stat in `SEASON_SUM_COLUMNS`,
+    takes the best game for every stat in `SEASON_MAX_COLUMNS`,
+    and counts the games (`G`) of every player.
+
+    Args:
+        seasons (list):
+            Optional parameter. The seasons you want season stats for.
+            If not set, every season in `player_stats/game_stats/`
+            is used.
+
+        save (bool):
+            Optional parameter. If True, the season stats of every
+            season are saved in `player_stats/season_stats/`.
+
+    Returns:
+        season_df (pandas.DataFrame):
+            The season stats of every player, in every requested season.
+    """
+    if seasons is None:
+        seasons = get_game_stats_seasons()
+
+    games_df = pd.concat(
+        [
+            read_csv_with_schema(
+                f"{GAME_STATS_FOLDER}/{season}_player_game_stats.csv",
+                "player_game_stats"
+            )
+            for season in seasons
+        ],
+        ignore_index=True
     )
-    season_df["PASS_INT%"] = season_df["PASS_INT%"].round(3)
 
-    season_df.loc[season_df["ATT"] > 0, "PASS_YPA"] = (
-        season_df["PASS_YDS"] / season_df["ATT"]
-    )
-    season_df["PASS_YPA"] = season_df["PASS_YPA"].round(3)
+    season_df = get_season_stats(aggregate_game_stats(games_df))
 
-    season_df.loc[season_df["ATT"] > 0, "PASS_AY/A"] = (
-        season_df["PASS_YDS"]
-        + (20 * season_df["PASS_TD"])
-        - (45 * season_df["PASS_INT"])
-    ) / season_df["ATT"]
-    season_df["PASS_AY/A"] = season_df["PASS_AY/A"].round(3)
+    if save is True:
+        save_season_stats(season_df)
 
-    season_df.loc[season_df["COMP"] > 0, "PASS_YPC"] = (
-        season_df["PASS_YDS"] / season_df["COMP"]
-    )
-    season_df["PASS_YPC"] = season_df["PASS_YPC"].round(3)
+    return season_df
 
-    season_df.loc[season_df["G"] > 0, "PASS_YDS/G"] = (
-        season_df["PASS_YDS"] / season_df["G"]
-    )
-    season_df["PASS_YDS/G"] = season_df["PASS_YDS/G"].round(3)
 
+def aggregate_game_stats(games_df: pd.DataFrame, keys=SEASON_STATS_KEYS):
+    """
+    Aggregates player (or team) game stats into the running totals of
+    every player season: the sums of `SEASON_SUM_COLUMNS`, the maxima of
+    `SEASON_MAX_COLUMNS`, and the number of games (`G`).
+    These totals are additive, so the totals of two sets of games
+    can be combined with `combine_season_totals()`.
+    """
+    aggregations = {"G": ("season", "size")}
+    for col in SEASON_SUM_COLUMNS:
+        aggregations[col] = (col, "sum")
+    for col in SEASON_MAX_COLUMNS:
+        aggregations[col] = (col, "max")
+
+    return games_df.groupby(
+        keys,
+        as_index=False,
+        observed=True,
+    ).agg(**aggregations)
+
+
+def combine_season_totals(totals_df: pd.DataFrame, keys=SEASON_STATS_KEYS):
+    """
+    Combines running totals from `aggregate_game_stats()` that share
+    the same `keys`, by adding up the sums and games,
+    and keeping the highest maxima.
+    """
+    aggregations = {"G": "sum"}
+    for col in SEASON_SUM_COLUMNS:
+        aggregations[col] = "sum"
+    for col in SEASON_MAX_COLUMNS:
+        aggregations[col] = "max"
+
+    return totals_df.groupby(
+        keys,
+        as_index=False,
+        observed=True,
+    ).agg(aggregations)
+
+
+def get_season_stats(
+    totals_df: pd.DataFrame,
+    keys=SEASON_STATS_KEYS,
+    schema_name="player_season_stats"
+):
+    """
+    Turns the running totals of `aggregate_game_stats()`
+    into season stats, by computing every rate stat.
+    `keys` are the columns that identify a row, and `schema_name`
+    is the schema of the result. See `schemas.py`.
+    """
+    season_df = totals_df.copy()
     season_df[["COMP", "ATT", "PASS_YDS", "PASS_TD", "PASS_INT"]] = season_df[
-        ["COMP", "PASS_YPA", "PASS_TD", "ATT", "PASS_INT"]
+        ["COMP", "ATT", "PASS_YDS", "PASS_TD", "PASS_INT"]
     ].fillna(0)
 
-    # NFL QB Rating
-    season_df.loc[season_df["ATT"] > 0, "NFL_QBR_A"] = (
-        (season_df["COMP"] / season_df["ATT"]) - 0.3
-    ) * 5
-    season_df.loc[season_df["ATT"] > 0, "NFL_QBR_B"] = (
-        (season_df["PASS_YDS"] / season_df["ATT"]) - 3
-    ) * 0.25
-    season_df.loc[season_df["ATT"] > 0, "NFL_QBR_C"] = (
-        season_df["PASS_TD"] / season_df["ATT"]
-    ) * 20
-    season_df.loc[season_df["ATT"] > 0, "NFL_QBR_D"] = 2.375 - (
-        season_df["PASS_INT"] / season_df["ATT"] * 25
-    )
+    season_df = compute_metrics(season_df, SEASON_METRICS)
 
-    season_df.loc[season_df["NFL_QBR_A"] < 0, "NFL_QBR_A"] = 0
-    season_df.loc[season_df["NFL_QBR_A"] > 2.375, "NFL_QBR_A"] = 2.375
+    season_df["NET_PUNT_YDS"] = None
+    season_df["NET_PUNT_AVG"] = None
 
-    season_df.loc[season_df["NFL_QBR_B"] < 0, "NFL_QBR_B"] = 0
-    season_df.loc[season_df["NFL_QBR_B"] > 2.375, "NFL_QBR_B"] = 2.375
+    stat_columns = [
+        col for col in SEASON_STATS_COLUMNS if col not in SEASON_STATS_KEYS
+    ]
+    return apply_schema(season_df[keys + stat_columns], schema_name)
+
+
+def get_career_stats(totals_df: pd.DataFrame):
+    """
+    Turns the running totals of `aggregate_game_stats()`
+    into player career stats, with the same rate stats as
+    the season stats.
+    """
+    return get_season_stats(
+        combine_season_totals(totals_df, CAREER_STATS_KEYS),
+        CAREER_STATS_KEYS,
+        "player_career_stats"
+    )
 
-    season_df.loc[season_df["NFL_QBR_C"] < 0, "NFL_QBR_C"] = 0
-    season_df.loc[season_df["NFL_QBR_C"] > 2.375, "NFL_QBR_C"] = 2.375
 
-    season_df.loc[season_df["NFL_QBR_D"] < 0, "NFL_QBR_D"] = 0
-    season_df.loc[season_df["NFL_QBR_D"] > 2.375, "NFL_QBR_D"] = 2.375
+def get_team_season_stats(team_games_df: pd.DataFrame):
+    """
+    Aggregates team game stats (see `_build_usfl_player_stats()`
+    in `usfl.py`) into team season stats, with the same
+    rate stats as the player season stats.
+    """
+    return get_season_stats(
+        aggregate_game_stats(team_games_df, TEAM_SEASON_STATS_KEYS),
+        TEAM_SEASON_STATS_KEYS,
+        "team_season_stats"
+    )
 
-    season_df["NFL_QBR"] = (
-        (
-            season_df["NFL_QBR_A"]
-            + season_df["NFL_QBR_B"]
-            + season_df["NFL_QBR_C"]
-            + season_df["NFL_QBR_D"]
-        )
-        / 6
-    ) * 100
 
-    season_df = season_df.drop(
-        columns=["NFL_QBR_A", "NFL_QBR_B", "NFL_QBR_C", "NFL_QBR_D"]
-    )
+def save_season_stats(season_df: pd.DataFrame):
+    """
+    Saves the player season stats of every season in a DataFrame.
+    """
+    for season, df in season_df.groupby("season"):
+        df.to_csv(
+            f"{SEASON_STATS_FOLDER}/csv/{season}_player_season_stats.csv",
+            index=False,
+        )
+        df.to_parquet(
+            f"{SEASON_STATS_FOLDER}/parquet/" +
+            f"{season}_player_season_stats.parquet",
+            index=False,
+        )
 
-    season_df.loc[season_df["ATT"] > 0, "CFB_QBR"] = (
-        (8.4 * season_df["PASS_YDS"])
-        + (330 * season_df["PASS_TD"])
-        + (100 * season_df["COMP"])
-        - (200 * season_df["PASS_INT"])
-    ) / season_df["ATT"]
 
-    season_df.loc[season_df["RUSH"] > 0, "RUSH_AVG"] = (
-        season_df["RUSH_YDS"] / season_df["RUSH"]
+def save_career_stats(career_df: pd.DataFrame):
+    """
+    Saves the player career stats.
+    """
+    os.makedirs(f"{CAREER_STATS_FOLDER}/csv", exist_ok=True)
+    os.makedirs(f"{CAREER_STATS_FOLDER}/parquet", exist_ok=True)
+    career_df.to_csv(
+        f"{CAREER_STATS_FOLDER}/csv/usfl_player_career_stats.csv",
+        index=False,
     )
-    season_df["RUSH_AVG"] = season_df["RUSH_AVG"].round(3)
-
-    season_df.loc[season_df["G"] > 0, "RUSH_ATT/G"] = (
-        season_df["RUSH"] / season_df["G"]
+    career_df.to_parquet(
+        f"{CAREER_STATS_FOLDER}/parquet/usfl_player_career_stats.parquet",
+        index=False,
     )
-    season_df["RUSH_ATT/G"] = season_df["RUSH_ATT/G"].round(3)
 
-    season_df.loc[season_df["G"] > 0, "RUSH_YDS/G"] = (
-        season_df["RUSH_YDS"] / season_df["G"]
-    )
-    season_df["RUSH_YDS/G"] = season_df["RUSH_YDS/G"].round(3)
 
-    season_df.loc[season_df["REC"] > 0, "REC_AVG"] = (
-        season_df["REC_YDS"] / season_df["REC"]
+def load_season_state(state_folder=SEASON_STATE_FOLDER):
+    """
+    Loads the running totals of every player season, and the hash of
+    every game stats partition that has been added to them.
+
+    Returns:
+        totals_df (pandas.DataFrame):
+            The running totals, or None if there are none yet.
+
+        game_hashes (dict):
+            The hash of every game stats partition in `totals_df`,
+            by partition path.
+    """
+    try:
+        totals_df = pd.read_parquet(f"{state_folder}/totals.parquet")
+        with open(f"{state_folder}/games.json", "r", encoding="utf8") as f:
+            game_hashes = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None, {}
+    return totals_df, game_hashes
+
+
+def save_season_state(
+    totals_df: pd.DataFrame,
+    game_hashes: dict,
+    state_folder=SEASON_STATE_FOLDER
+):
+    os.makedirs(state_folder, exist_ok=True)
+    totals_df.to_parquet(f"{state_folder}/totals.parquet", index=False)
+    with open(f"{state_folder}/games.json", "w+", encoding="utf8") as f:
+        f.write(json.dumps(game_hashes, indent=2, sort_keys=True))
+
+
+def _load_game_stats_partitions(part_paths: list):
+    return apply_schema(
+        load_parquet_partitions(GAME_STATS_DATASET, part_paths),
+        "player_game_stats"
     )
-    season_df["REC_AVG"] = season_df["REC_AVG"].round(3)
 
-    season_df.loc[season_df["REC_TARGETS"] > 0, "CATCH%"] = (
-        season_df["REC"] / season_df["REC_TARGETS"]
-    ) * 100
-    season_df["CATCH%"] = season_df["CATCH%"].round(3)
 
-    season_df.loc[season_df["REC_TARGETS"] > 0, "REC_YDS/TARGET"] = (
-        season_df["REC_YDS"] / season_df["REC_TARGETS"]
-    ) * 100
-    season_df["REC_YDS/TARGET"] = season_df["REC_YDS/TARGET"].round(3)
+def _get_partition_season(part_path: str):
+    """
+    Returns the season of a game stats partition,
+    like `season=2023/game_id=45`.
+    """
+    return int(part_path.split("/")[0].split("=", 1)[1])
 
-    season_df.loc[season_df["G"] > 0, "REC_YDS/G"] = (
-        season_df["REC_YDS"] / season_df["G"]
-    )
-    season_df["REC_YDS/G"] = season_df["REC_YDS/G"].round(3)
 
-    season_df.loc[season_df["FGM"] > 0, "FG%"] = (
-        season_df["FGM"] / season_df["FGA"]
-    )
-    season_df["FG%"] = season_df["FG%"].round(3)
+def _replace_rows(old_df, new_df, keys: list, schema_name: str):
+    """
+    Replaces the rows of `old_df` that have the same `keys`
+    as a row of `new_df`, and sorts the result by `keys`.
+    """
+    if len(old_df) == 0:
+        return new_df
 
-    season_df.loc[season_df["FGM"] > 0, "GROSS_PUNT_AVG"] = (
-        season_df["GROSS_PUNT_YDS"] / season_df["PUNTS"]
+    old_index = pd.MultiIndex.from_frame(old_df[keys].astype(str))
+    new_index = pd.MultiIndex.from_frame(new_df[keys].astype(str))
+    df = pd.concat(
+        [old_df[~old_index.isin(new_index)], new_df],
+        ignore_index=True
     )
-    season_df["GROSS_PUNT_AVG"] = season_df["GROSS_PUNT_AVG"].round(3)
+    df = apply_schema(df, schema_name)
+    return df.sort_values(keys, ignore_index=True)
+
+
+def update_usfl_season_stats(rebuild=False, verify=False, save=True):
+    """
+    Updates the player season and career stats with the games that were
+    added to `player_stats/game_stats/parquet/` since the last update.
+
+    The running totals of every player season (sums, maxima, and games)
+    are kept in `cache/season_stats/`. New games are aggregated on their
+    own, and added to the totals of the players in those games. Only the
+    rate stats of those players are recomputed, and only the seasons
+    with new games are saved again.
+
+    A game that was already added, and has changed or been removed
+    (like a game that was saved while it was still being played),
+    can not be taken out of the totals, since they include maxima.
+    Instead, the totals of every season with such a game are
+    aggregated again from the games of that season.
+    If there are no running totals yet, everything is rebuilt.
+
+    Stats that are sums of decimals (like `XP%` or `KR_AVG`) can differ
+    from a rebuild in their last digit, because they are added up
+    in a different order.
+
+    Args:
+        rebuild (bool):
+            Optional parameter. If True, the running totals are rebuilt
+            from every game, instead of being updated.
+
+        verify (bool):
+            Optional parameter. If True, the updated stats are checked
+            against a full rebuild, and an `AssertionError` is raised
+            if they don't match.
+
+        save (bool):
+            Optional parameter. If True, the updated season and career
+            stats, and the running totals, are saved.
+
+    Returns:
+        season_df (pandas.DataFrame):
+            The season stats of every season with new games.
+            Empty if there were no new games.
+
+        career_df (pandas.DataFrame):
+            The career stats of every player.
+    """
+    game_hashes = load_partition_manifest(GAME_STATS_DATASET)
+    if len(game_hashes) == 0:
+        raise FileNotFoundError(
+            f"`{GAME_STATS_DATASET}` has no game stats. " +
+            "Run `usfl.py` first."
+        )
 
-    season_df["NET_PUNT_YDS"] = None
-    season_df["NET_PUNT_AVG"] = None
+    career_file = f"{CAREER_STATS_FOLDER}/csv/usfl_player_career_stats.csv"
+    totals_df, old_game_hashes = load_season_state()
+    new_games = [p for p in game_hashes if p not in old_game_hashes]
+    changed_games = [
+        p for p, h in old_game_hashes.items() if game_hashes.get(p) != h
+    ]
 
-    season_df.loc[season_df["PR"] > 0, "PR_AVG"] = (
-        season_df["PR_YDS"] / season_df["PR"]
-    )
-    season_df["PR_AVG"] = season_df["PR_AVG"].round(3)
+    changed_seasons = {_get_partition_season(p) for p in changed_games}
 
-    season_df.loc[season_df["PR"] > 0, "PR_AVG"] = (
-        season_df["PR_YDS"] / season_df["PR"]
-    )
-    season_df["PR_AVG"] = season_df["PR_AVG"].round(3)
-
-    season_df.to_csv("test.csv")
-    # print(season_df.columns)
-    cols = [
-        "season",
-        "team",
-        "team_nickname",
-        "player_id",
-        "player_name",
-        "G",
-        "COMP",
-        "ATT",
-        "COMP%",
-        "PASS_YDS",
-        "PASS_TD",
-        "PASS_TD%",
-        "PASS_INT",
-        "PASS_INT%",
-        "PASS_YPA",
-        "PASS_AY/A",
-        "PASS_YPC",
-        "PASS_YDS/G",
-        "NFL_QBR",
-        "CFB_QBR",
-        "RUSH",
-        "RUSH_YDS",
-        "RUSH_TD",
-        "RUSH_AVG",
-        "RUSH_LONG",
-        "RUSH_ATT/G",
-        "RUSH_YDS/G",
-        "REC_TARGETS",
-        "REC",
-        "REC_YDS",
-        "REC_AVG",
-        "REC_TD",
-        "CATCH%",
-        "REC_YDS/TARGET",
-        "REC_YDS/G",
-        "FUMBLES",
-        "FUMBLES_LOST",
-        "FF",
-        "FR",
-        "TOTAL",
-        "SOLO",
-        "AST",
-        "TFL",
-        "SACKS",
-        "INT",
-        "PD",
-        "DEF_TD",
-        "FGM",
-        "FGA",
-        "FG%",
-        "FG_LONG",
-        "XPM",
-        "XPA",
-        "XP%",
-        "PUNTS",
-        "GROSS_PUNT_YDS",
-        "GROSS_PUNT AVG",
-        "NET_PUNT_YDS",
-        "NET_PUNT_AVG",
-        "PUNT_TB",
-        "PUNTS_IN_20",
-        "PUNTS_BLK",
-        "PUNT_LONG",
-        "PR",
-        "PR_YDS",
-        "PR_AVG",
-        "PR_TD",
-        "PR_LONG",
-        "KR",
-        "KR_YDS",
-        "KR_AVG",
-        "KR_TD",
-        "KR_LONG",
-    ]
+    if (
+        rebuild is True or totals_df is None or
+        not os.path.exists(career_file)
+    ):
+        print(f"Rebuilding season stats from {len(game_hashes)} games.")
+        totals_df = aggregate_game_stats(
+            _load_game_stats_partitions(list(game_hashes))
+        )
+        season_df = get_season_stats(totals_df)
+        career_df = get_career_stats(totals_df)
+    elif len(new_games) == 0 and len(changed_games) == 0:
+        print("No new games since the last season stats update.")
+        return (
+            pd.DataFrame(columns=SEASON_STATS_COLUMNS),
+            read_csv_with_schema(career_file, "player_career_stats")
+        )
+    else:
+        print(
+            f"Adding {len(new_games)} new games to the season stats, " +
+            f"and rebuilding {len(changed_seasons)} season(s) " +
+            "with changed games."
+        )
+        is_rebuilt = totals_df["season"].isin(changed_seasons)
+        # Players can drop out of a rebuilt season,
+        # so their career stats are recomputed too.
+        rebuilt_players = totals_df.loc[is_rebuilt, "player_id"].unique()
+        totals_df = totals_df[~is_rebuilt]
+
+        new_totals_df = aggregate_game_stats(
+            _load_game_stats_partitions([
+                p for p in game_hashes
+                if p in new_games or
+                _get_partition_season(p) in changed_seasons
+            ])
+        )
+        new_index = pd.MultiIndex.from_frame(
+            new_totals_df[SEASON_STATS_KEYS].astype(str)
+        )
+        is_affected = pd.MultiIndex.from_frame(
+            totals_df[SEASON_STATS_KEYS].astype(str)
+        ).isin(new_index)
+
+        affected_totals_df = combine_season_totals(
+            pd.concat(
+                [totals_df[is_affected], new_totals_df],
+                ignore_index=True
+            )
+        )
+        totals_df = pd.concat(
+            [totals_df[~is_affected], affected_totals_df],
+            ignore_index=True
+        ).sort_values(SEASON_STATS_KEYS, ignore_index=True)
+
+        season_df_list = []
+        for season in sorted(affected_totals_df["season"].unique()):
+            season_file = (
+                f"{SEASON_STATS_FOLDER}/csv/{season}_player_season_stats.csv"
+            )
+            if season not in changed_seasons and os.path.exists(season_file):
+                season_df_list.append(_replace_rows(
+                    read_csv_with_schema(season_file, "player_season_stats"),
+                    get_season_stats(
+                        affected_totals_df[
+                            affected_totals_df["season"] == season
+                        ]
+                    ),
+                    SEASON_STATS_KEYS,
+                    "player_season_stats"
+                ))
+            else:
+                season_df_list.append(get_season_stats(
+                    totals_df[totals_df["season"] == season]
+                ))
+        # Seasons can have different teams, so their categories
+        # are merged again once every season is combined.
+        season_df = apply_schema(
+            pd.concat(season_df_list, ignore_index=True),
+            "player_season_stats"
+        )
 
-    season_df = season_df[cols]
+        affected_players = set(rebuilt_players)
+        affected_players.update(affected_totals_df["player_id"].unique())
+        affected_players = list(affected_players)
+        old_career_df = read_csv_with_schema(
+            career_file,
+            "player_career_stats"
+        )
+        career_df = _replace_rows(
+            old_career_df[~old_career_df["player_id"].isin(affected_players)],
+            get_career_stats(
+                totals_df[totals_df["player_id"].isin(affected_players)]
+            ),
+            CAREER_STATS_KEYS,
+            "player_career_stats"
+        )
 
-    if save is True:
-        season_df.to_csv(
-            f"player_stats/season_stats/csv/{season}_player_season_stats.csv",
-            index=False,
+    if verify is True:
+        full_totals_df = aggregate_game_stats(
+            _load_game_stats_partitions(list(game_hashes))
         )
-        season_df.to_parquet(
-            "player_stats/season_stats/parquet/" +
-            f"{season}_player_season_stats.parquet",
-            index=False,
+        full_season_df = get_season_stats(full_totals_df)
+        full_season_df = full_season_df[
+            full_season_df["season"].isin(season_df["season"].unique())
+        ]
+        pd.testing.assert_frame_equal(
+            season_df.reset_index(drop=True),
+            full_season_df.reset_index(drop=True),
+            check_categorical=False
+        )
+        pd.testing.assert_frame_equal(
+            career_df.reset_index(drop=True),
+            get_career_stats(full_totals_df).reset_index(drop=True),
+            check_categorical=False
         )
 
-    return season_df
+    if save is True:
+        save_season_stats(season_df)
+        save_career_stats(career_df)
+        save_season_state(totals_df, game_hashes)
+
+    return season_df, career_df
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Updates the USFL player season and career stats."
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Profile the memory used to update the season stats."
+    )
+    args = parser.parse_args()
+
     print("Starting up!")
-    generate_usfl_player_season_stats(2023, True)
+    report = RunReport(profile_memory=args.profile_memory)
+    try:
+        with report.stage("season_stats") as stage:
+            season_df, career_df = update_usfl_season_stats()
+            stage["rows"] = len(season_df) + len(career_df)
+    finally:
+        report.save(SEASON_STATS_REPORT_FILE)
     print("All done!")
 
 
@@ -1,43 +1,191 @@
-import ssl
-import time
-import urllib.request
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import pandas as pd
 from tqdm import tqdm
 
+from fox_api_client import get_fox_api_client, submit_in_context
+from schemas import read_csv_with_schema
+from utils import TokenBucket
 
-def get_usfl_headshots(season: int):
-    """ """
+HEADSHOTS_FOLDER = "rosters/headshots"
+HEADSHOTS_INDEX = "rosters/headshots/index.json"
 
-    ssl._create_default_https_context = ssl._create_unverified_context
+# This URL corresponds to the default (blank) headshot.
+# We don't need to save that, so we skip players who's
+# headshot url is equal to this URL.
+DEFAULT_HEADSHOT_URL = (
+    "https://b.fssta.com/uploads/application/fs-app/" +
+    "default-headshot.vresize.140.170.medium.0.png"
+)
 
-    players_df = pd.read_csv(f"rosters/season/csv/{season}_usfl_rosters.csv")
+
+def load_headshot_index(index_path=HEADSHOTS_INDEX):
+    """
+    Loads the headshot index, which records the URL, size, hash, and
+    HTTP validators of every headshot in `rosters/headshots/`,
+    by player ID.
+    """
+    try:
+        with open(index_path, "r", encoding="utf8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_headshot_index(index: dict, index_path=HEADSHOTS_INDEX):
+    with open(index_path, "w+", encoding="utf8") as f:
+        f.write(json.dumps(index, indent=2, sort_keys=True))
+
+
+def get_headshot_entry(url: str, content: bytes, validators: dict):
+    return {
+        "url": url,
+        "size": len(content),
+        "sha256": hashlib.sha256(content).hexdigest(),
+        **validators,
+    }
+
+
+def get_headshot_validators(entry: dict):
+    """
+    Returns the `ETag` and `Last-Modified` a headshot was saved with.
+    """
+    return {
+        key: entry[key] for key in ["etag", "last_modified"] if key in entry
+    }
+
+
+def is_headshot_current(file_path: str, url: str, entry: dict):
+    """
+    Checks if the headshot on disk is the one at `url`,
+    and has not been changed or corrupted since it was saved.
+    """
+    if entry is None or entry["url"] != url:
+        return False
+    elif not os.path.exists(file_path):
+        return False
+    elif os.path.getsize(file_path) != entry["size"]:
+        return False
+
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest() == entry["sha256"]
+
+
+def get_usfl_headshots(
+    season: int,
+    max_workers=4,
+    requests_per_second=4.0,
+    revalidate=False
+):
+    """
+    Syncs `rosters/headshots/` with the headshots in a season's roster.
+
+    Headshots that are new, have a new URL, or do not match the headshot
+    index are downloaded. Every other headshot is skipped, without
+    sending a request, unless `revalidate` is True. Requests are spread
+    over a pool of threads, and rate limited by a token bucket.
+
+    Args:
+        season (int):
+            Required parameter. The season of the roster
+            in `rosters/season/csv/` you want headshots for.
+
+        max_workers (int):
+            Optional parameter. The maximum number of downloads
+            that can be in flight at the same time.
+
+        requests_per_second (float):
+            Optional parameter. The maximum number of downloads
+            started every second.
+
+        revalidate (bool):
+            Optional parameter. If True, every headshot that matches
+            the index is also requested, with the `ETag` and
+            `Last-Modified` it was saved with, so it is downloaded again
+            if a new image was uploaded under the same URL.
+            This sends a request for every headshot.
+    """
+    client = get_fox_api_client()
+    rate_limiter = TokenBucket(requests_per_second)
+    index = load_headshot_index()
+
+    players_df = read_csv_with_schema(
+        f"rosters/season/csv/{season}_usfl_rosters.csv",
+        "rosters"
+    )
     players_df = players_df.dropna(subset=["player_headshot"])
     player_ids_arr = players_df["player_id"].to_list()
     player_headshots_arr = players_df["player_headshot"].to_list()
 
-    for i in tqdm(range(0, len(player_ids_arr))):
-        url = player_headshots_arr[i]
-        player_id = player_ids_arr[i]
-
-        if (
-            url == "https://b.fssta.com/uploads/application/fs-app/" +
-            "default-headshot.vresize.140.170.medium.0.png"
-        ):
-            pass
-            # This URL corresponds to the default (blank) headshot.
-            # We don't need to save that, so we skip players who's
-            # headshot url is equal to this URL.
-        else:
+    download_list = []
+    for player_id, url in zip(player_ids_arr, player_headshots_arr):
+        player_id = str(player_id)
+        file_path = f"{HEADSHOTS_FOLDER}/{player_id}.png"
+        entry = index.get(player_id)
+
+        if url == DEFAULT_HEADSHOT_URL:
+            continue
+        elif not is_headshot_current(file_path, url, entry):
+            download_list.append((player_id, url, file_path, {}))
+        elif revalidate is True:
+            download_list.append((
+                player_id,
+                url,
+                file_path,
+                get_headshot_validators(entry)
+            ))
+
+    def download_headshot(url: str, file_path: str, validators: dict):
+        rate_limiter.acquire()
+        content, validators = client.get_with_validators(url, validators)
+        if content is not None:
+            with open(file_path, "wb") as f:
+                f.write(content)
+        return content, validators
+
+    changed_count = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            submit_in_context(
+                executor,
+                download_headshot,
+                url,
+                file_path,
+                validators
+            ): (
+                player_id,
+                url
+            )
+            for player_id, url, file_path, validators in download_list
+        }
+
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            player_id, url = futures[future]
             try:
-                urllib.request.urlretrieve(
-                    url, filename=f"rosters/headshots/{player_id}.png"
-                )
+                content, validators = future.result()
             except Exception:
                 print(
                     f"\nCould not retrieve the photo for player #{player_id}."
                 )
-            time.sleep(1)
+                continue
+
+            if content is not None:
+                index[player_id] = get_headshot_entry(
+                    url,
+                    content,
+                    validators
+                )
+                changed_count += 1
+
+    print(
+        f"{changed_count} of {len(player_ids_arr)} " +
+        "headshots were new or had changed."
+    )
+    # Saved once, after every download,
+    # instead of after every headshot.
+    save_headshot_index(index)
 
 
 def main():
@@ -0,0 +1,214 @@
+"""
+File: metrics.py
+Author: Joseph Armstrong
+Purpose: Definitions of every derived (rate) stat, like COMP%, YPA,
+    or NFL passer rating, and a vectorized engine that computes them
+    at any level, be it a single game, a season, a career, or a team.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class Metric(NamedTuple):
+    """
+    The definition of a derived stat. It is computed as
+    `((numerator / denominator) + offset) * scale`,
+    then clamped, and rounded.
+
+    Args:
+        name (str):
+            Required parameter. The column this metric is saved in.
+            Metrics starting with `_` are intermediate results,
+            which other metrics can use, but are not saved.
+
+        numerator (dict):
+            Required parameter. The columns (or earlier metrics) that
+            are added up for the numerator, and the weight of each,
+            like `{"PASS_YDS": 1, "PASS_TD": 20, "PASS_INT": -45}`.
+
+        denominator (str or float):
+            Optional parameter. A column, or a constant,
+            the numerator is divided by.
+
+        guard (str):
+            Optional parameter. If set, this metric is only computed
+            where this column is greater than 0. Every other row
+            is set to `fill`.
+
+        fill (float):
+            Optional parameter. The value of rows that fail the `guard`.
+
+        offset (float):
+            Optional parameter. Added to the ratio, before scaling.
+
+        scale (float):
+            Optional parameter. What the ratio is multiplied by.
+
+        clamp (tuple):
+            Optional parameter. The `(min, max)` this metric is kept in.
+
+        round (int):
+            Optional parameter. The number of decimals this metric
+            is rounded to.
+    """
+    name: str
+    numerator: dict
+    denominator: object = None
+    guard: str = None
+    fill: float = np.nan
+    offset: float = 0.0
+    scale: float = 1.0
+    clamp: tuple = None
+    round: int = None
+
+
+# The rate stats of a single game,
+# see `_build_usfl_player_stats()` in `usfl.py`.
+GAME_METRICS = [
+    Metric("COMP%", {"COMP": 1}, "ATT", scale=100),
+    Metric("YPA", {"PASS_YDS": 1}, "ATT"),
+    Metric("YPC", {"PASS_YDS": 1}, "COMP"),
+    Metric("RUSH_AVG", {"RUSH_YDS": 1}, "RUSH"),
+    Metric("REC_AVG", {"REC_YDS": 1}, "REC"),
+    Metric("CATCH%", {"REC": 1}, "REC_TARGETS", scale=100),
+    Metric("YDS/TARGET", {"REC_YDS": 1}, "REC"),
+    Metric("FG%", {"FGM": 1}, "FGA"),
+    Metric("XP%", {"XPM": 1}, "XPA"),
+    Metric("KR_AVG", {"KR_YDS": 1}, "KR"),
+    Metric("PR_AVG", {"PR_YDS": 1}, "PR"),
+]
+
+# The NFL passer rating, built from its four components.
+# Each component is kept between 0 and 2.375.
+NFL_QBR_METRICS = [
+    Metric(
+        "_NFL_QBR_A", {"COMP": 1}, "ATT", guard="ATT",
+        offset=-0.3, scale=5, clamp=(0, 2.375)
+    ),
+    Metric(
+        "_NFL_QBR_B", {"PASS_YDS": 1}, "ATT", guard="ATT",
+        offset=-3, scale=0.25, clamp=(0, 2.375)
+    ),
+    Metric(
+        "_NFL_QBR_C", {"PASS_TD": 1}, "ATT", guard="ATT",
+        scale=20, clamp=(0, 2.375)
+    ),
+    Metric("_NFL_QBR_INT", {"PASS_INT": 1}, "ATT", guard="ATT", scale=25),
+    Metric(
+        "_NFL_QBR_D", {"_NFL_QBR_INT": -1}, guard="ATT",
+        offset=2.375, clamp=(0, 2.375)
+    ),
+    Metric(
+        "NFL_QBR",
+        {"_NFL_QBR_A": 1, "_NFL_QBR_B": 1, "_NFL_QBR_C": 1, "_NFL_QBR_D": 1},
+        6,
+        scale=100
+    ),
+]
+
+# The rate stats of a season (or any other span of games),
+# see `generate_season_stats.py`.
+SEASON_METRICS = [
+    Metric("COMP%", {"COMP": 1}, "ATT", guard="ATT", scale=100, round=3),
+    Metric("PASS_TD%", {"PASS_TD": 1}, "ATT", guard="ATT", round=3),
+    Metric("PASS_INT%", {"PASS_INT": 1}, "ATT", guard="ATT", round=3),
+    Metric("PASS_YPA", {"PASS_YDS": 1}, "ATT", guard="ATT", round=3),
+    Metric(
+        "PASS_AY/A",
+        {"PASS_YDS": 1, "PASS_TD": 20, "PASS_INT": -45},
+        "ATT",
+        guard="ATT",
+        round=3
+    ),
+    Metric("PASS_YPC", {"PASS_YDS": 1}, "COMP", guard="COMP", round=3),
+    Metric("PASS_YDS/G", {"PASS_YDS": 1}, "G", guard="G", round=3),
+    *NFL_QBR_METRICS,
+    Metric(
+        "CFB_QBR",
+        {"PASS_YDS": 8.4, "PASS_TD": 330, "COMP": 100, "PASS_INT": -200},
+        "ATT",
+        guard="ATT"
+    ),
+    Metric("RUSH_AVG", {"RUSH_YDS": 1}, "RUSH", guard="RUSH", round=3),
+    Metric("RUSH_ATT/G", {"RUSH": 1}, "G", guard="G", round=3),
+    Metric("RUSH_YDS/G", {"RUSH_YDS": 1}, "G", guard="G", round=3),
+    Metric("REC_AVG", {"REC_YDS": 1}, "REC", guard="REC", round=3),
+    Metric(
+        "CATCH%", {"REC": 1}, "REC_TARGETS", guard="REC_TARGETS",
+        scale=100, round=3
+    ),
+    Metric(
+        "REC_YDS/TARGET", {"REC_YDS": 1}, "REC_TARGETS", guard="REC_TARGETS",
+        scale=100, round=3
+    ),
+    Metric("REC_YDS/G", {"REC_YDS": 1}, "G", guard="G", round=3),
+    Metric("FG%", {"FGM": 1}, "FGA", guard="FGM", fill=0, round=3),
+    Metric("PR_AVG", {"PR_YDS": 1}, "PR", guard="PR", fill=0, round=3),
+]
+
+
+def compute_metrics(df: pd.DataFrame, metrics: list):
+    """
+    Computes a list of metrics for every row of a DataFrame.
+
+    Every column the metrics need is read into a NumPy array once,
+    every metric is computed on those arrays, in order, and the
+    results are added to the DataFrame in a single step.
+
+    Args:
+        df (pandas.DataFrame):
+            Required parameter. The stats you want metrics for.
+            Can be at any level (games, seasons, careers, teams).
+
+        metrics (list):
+            Required parameter. The `Metric`s you want computed,
+            like `GAME_METRICS` or `SEASON_METRICS`.
+
+    Returns:
+        df (pandas.DataFrame):
+            A copy of `df`, where every metric is set. Metrics that are
+            already a column of `df` are overwritten in place.
+    """
+    arrays = {}
+
+    def get_array(col):
+        if col not in arrays:
+            arrays[col] = df[col].to_numpy(dtype="float64", na_value=np.nan)
+        return arrays[col]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for metric in metrics:
+            value = np.zeros(len(df))
+            for col, weight in metric.numerator.items():
+                value = value + (weight * get_array(col))
+
+            if isinstance(metric.denominator, str):
+                value = value / get_array(metric.denominator)
+            elif metric.denominator is not None:
+                value = value / metric.denominator
+
+            value = (value + metric.offset) * metric.scale
+
+            if metric.guard is not None:
+                value = np.where(get_array(metric.guard) > 0, value, np.nan)
+            if metric.clamp is not None:
+                value = np.clip(value, *metric.clamp)
+            if metric.round is not None:
+                value = np.round(value, metric.round)
+            if metric.guard is not None and not np.isnan(metric.fill):
+                value = np.where(
+                    get_array(metric.guard) > 0,
+                    value,
+                    metric.fill
+                )
+
+            arrays[metric.name] = value
+
+    return df.assign(**{
+        metric.name: arrays[metric.name]
+        for metric in metrics
+        if not metric.name.startswith("_")
+    })
@@ -0,0 +1,412 @@
+"""
+File: pipeline.py
+Author: Joseph Armstrong
+Purpose: Runs every stage of the USFL data pipeline as a small
+    dependency graph. Stages that only wait on the network run at the
+    same time as the stages that parse gamelogs, and stages whose
+    input files have not changed since their last run are skipped.
+"""
+
+import glob
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Callable, NamedTuple
+
+from gamelog_cache import get_file_hash
+from run_report import RunReport
+from usfl_config import CURRENT_SEASON, CURRENT_WEEK
+
+# The files every stage read the last time it ran,
+# see `_get_changed_inputs()`.
+PIPELINE_STATE_FILE = "cache/pipeline_state.json"
+
+
+class Stage(NamedTuple):
+    """
+    A stage of the pipeline.
+
+    Args:
+        name (str):
+            Required parameter. The name of this stage.
+
+        func (callable):
+            Required parameter. Runs this stage. It is called with the
+            `RunReport` of this run, and records itself in it,
+            see `RunReport.stage()`.
+
+        inputs (list):
+            Optional parameter. Globs of the files this stage reads.
+            If none of them changed since this stage last ran,
+            and all of its `outputs` exist, it is skipped.
+            Stages without inputs (like API downloads) always run.
+
+        outputs (list):
+            Optional parameter. Globs of the files this stage writes.
+
+        depends_on (list):
+            Optional parameter. The stages that have to finish
+            before this stage can start.
+
+        cpu_bound (bool):
+            Optional parameter. If True, this stage never runs at the
+            same time as another CPU-bound stage, since they would only
+            take turns holding the GIL. Other stages still run
+            alongside it.
+    """
+    name: str
+    func: Callable
+    inputs: list = []
+    outputs: list = []
+    depends_on: list = []
+    cpu_bound: bool = False
+
+
+def _get_files(patterns: list):
+    """
+    Returns every file that matches a list of globs.
+    """
+    file_list = set()
+    for pattern in patterns:
+        file_list.update(
+            f.replace("\\", "/")
+            for f in glob.glob(pattern, recursive=True)
+            if os.path.isfile(f)
+        )
+    return sorted(file_list)
+
+
+def _get_changed_inputs(stage: Stage, state: dict):
+    """
+    Compares the inputs of a stage to the ones recorded in `state`
+    the last time it ran. Like `gamelog_cache.is_gamelog_unchanged()`,
+    a file is only hashed if its modification time changed.
+
+    Returns:
+        is_changed (bool):
+            True if an input was added, removed, or changed.
+
+        inputs (dict):
+            The size, modification time, and hash of every input,
+            to be saved in `state` once this stage has ran.
+    """
+    old_inputs = state.get(stage.name, {})
+    inputs = {}
+    is_changed = False
+
+    for file_path in _get_files(stage.inputs):
+        stat = os.stat(file_path)
+        entry = old_inputs.get(file_path)
+        if (
+            entry is not None and entry["size"] == stat.st_size and
+            entry["mtime"] == stat.st_mtime
+        ):
+            inputs[file_path] = entry
+            continue
+
+        inputs[file_path] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": get_file_hash(file_path),
+        }
+        if entry is None or entry["sha256"] != inputs[file_path]["sha256"]:
+            is_changed = True
+
+    if set(inputs) != set(old_inputs):
+        is_changed = True
+    return is_changed, inputs
+
+
+def _load_pipeline_state(state_file: str):
+    try:
+        with open(state_file, "r", encoding="utf8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_pipeline_state(state: dict, state_file: str):
+    folder = os.path.dirname(state_file)
+    if len(folder) > 0:
+        os.makedirs(folder, exist_ok=True)
+    with open(state_file, "w+", encoding="utf8") as f:
+        f.write(json.dumps(state, indent=2, sort_keys=True))
+
+
+def run_pipeline(
+    stages: list,
+    report=None,
+    force=False,
+    state_file=PIPELINE_STATE_FILE
+):
+    """
+    Runs a list of stages, in dependency order.
+
+    Every stage starts as soon as all of the stages it depends on have
+    finished, in its own thread, so the wall time of the pipeline is
+    its longest chain of dependent stages, not the sum of all stages.
+    If `report` profiles memory, stages run one at a time instead.
+    If a stage fails, the stages that depend on it are not ran,
+    every other stage still runs, and the first error is raised
+    once the pipeline is done.
+
+    Args:
+        stages (list):
+            Required parameter. The `Stage`s you want ran.
+            Dependencies that are not in this list are ignored.
+
+        report (RunReport):
+            Optional parameter. The report every stage is recorded in.
+
+        force (bool):
+            Optional parameter. If True, no stage is skipped.
+
+        state_file (str):
+            Optional parameter. Where the inputs of every stage
+            are recorded, once it has ran.
+
+    Returns:
+        statuses (dict):
+            `"ok"`, `"skipped"`, `"error"`, or `"upstream_error"`,
+            by stage.
+    """
+    if report is None:
+        report = RunReport()
+
+    stage_names = [stage.name for stage in stages]
+    for stage in stages:
+        for name in stage.depends_on:
+            if name == stage.name:
+                raise ValueError(f"`{stage.name}` depends on itself.")
+            elif name in stage_names and (
+                stage_names.index(name) > stage_names.index(stage.name)
+            ):
+                raise ValueError(
+                    f"`{stage.name}` depends on `{name}`, " +
+                    "which has to be listed before it."
+                )
+
+    state = _load_pipeline_state(state_file)
+    state_lock = threading.Lock()
+    cpu_lock = threading.Lock()
+    statuses = {}
+    errors = []
+
+    def run_stage(stage: Stage):
+        with state_lock:
+            is_changed, inputs = _get_changed_inputs(stage, state)
+        outputs_exist = all(
+            len(_get_files([pattern])) > 0 for pattern in stage.outputs
+        )
+
+        if (
+            force is False and len(stage.inputs) > 0 and
+            is_changed is False and outputs_exist is True
+        ):
+            print(f"Skipping `{stage.name}`, its inputs have not changed.")
+            with state_lock:
+                # Modification times may have changed,
+                # even if the contents did not.
+                state[stage.name] = inputs
+            return "skipped"
+
+        with cpu_lock if stage.cpu_bound is True else nullcontext():
+            stage.func(report)
+
+        # The inputs are recorded as they were when this stage started,
+        # so anything that changes them while it runs is picked up
+        # by the next run.
+        with state_lock:
+            state[stage.name] = inputs
+        return "ok"
+
+    # `tracemalloc` can only measure the memory of one stage at a time,
+    # see `RunReport`.
+    max_workers = max(len(stages), 1)
+    if report.profile_memory is True:
+        max_workers = 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = list(stages)
+        running = {}
+
+        while len(pending) > 0 or len(running) > 0:
+            for stage in list(pending):
+                depends_on = [n for n in stage.depends_on if n in stage_names]
+                if any(
+                    statuses.get(n) in ["error", "upstream_error"]
+                    for n in depends_on
+                ):
+                    print(f"Not running `{stage.name}`, a dependency failed.")
+                    statuses[stage.name] = "upstream_error"
+                    pending.remove(stage)
+                elif all(n in statuses for n in depends_on):
+                    running[executor.submit(run_stage, stage)] = stage
+                    pending.remove(stage)
+
+            if len(running) == 0 and len(pending) > 0:
+                # Nothing is running that could unblock these stages.
+                raise ValueError(
+                    "Could not schedule " +
+                    ", ".join(f"`{stage.name}`" for stage in pending) +
+                    ", their dependencies can never finish."
+                )
+            elif len(running) == 0:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    statuses[stage.name] = future.result()
+                except Exception as e:
+                    print(f"`{stage.name}` failed: {e}")
+                    statuses[stage.name] = "error"
+                    errors.append(e)
+
+    _save_pipeline_state(state, state_file)
+
+    if len(errors) > 0:
+        raise errors[0]
+    return statuses
+
+
+def get_usfl_stages(
+    workers=os.cpu_count() or 1,
+    season=CURRENT_SEASON,
+    week=CURRENT_WEEK,
+    key_path=""
+):
+    """
+    Returns every stage of the USFL data pipeline, as ran by the
+    scheduled workflow. Every module is only imported once its stage
+    runs.
+    """
+
+    def get_api_key():
+        from get_usfl_api_key import get_usfl_api_key
+
+        return get_usfl_api_key(key_path)
+
+    def parse_gamelogs(report):
+        from usfl import get_json_in_folder, parse_usfl_gamelogs
+
+        # Parsing, and building every dataset,
+        # are recorded as separate stages.
+        parse_usfl_gamelogs(
+            get_json_in_folder("Gamelogs"),
+            save=True,
+            workers=workers,
+            use_cache=True,
+            report=report
+        )
+
+    def standings(report):
+        from usfl import get_usfl_standings
+
+        with report.stage("standings") as stage:
+            stage["rows"] = len(
+                get_usfl_standings(season, get_api_key(), True)
+            )
+
+    def rosters(report):
+        from usfl import get_usfl_rosters
+
+        with report.stage("rosters") as stage:
+            stage["rows"] = len(
+                get_usfl_rosters(season, get_api_key(), week, True)
+            )
+
+    def season_stats(report):
+        from generate_season_stats import update_usfl_season_stats
+
+        with report.stage("season_stats") as stage:
+            season_df, career_df = update_usfl_season_stats()
+            stage["rows"] = len(season_df) + len(career_df)
+
+    def database(report):
+        from usfl_database import update_usfl_database
+
+        with report.stage("database") as stage:
+            stage["sources"] = sum(update_usfl_database().values())
+
+    return [
+        Stage(
+            "parse_gamelogs",
+            parse_gamelogs,
+            inputs=[
+                "Gamelogs/*",
+                "usfl.py",
+                "gamelog_io.py",
+                "gamelog_cache.py",
+                "generate_season_stats.py",
+                "metrics.py",
+                "schemas.py",
+                "utils.py",
+                "run_report.py",
+                "fox_api_client.py",
+                "usfl_config.py",
+            ],
+            outputs=[
+                "schedules/*_schedule.csv",
+                "player_stats/game_stats/parquet/_partitions.json",
+                "pbp/parquet/_partitions.json",
+                "team_stats/game_stats/parquet/_partitions.json",
+            ],
+            cpu_bound=True
+        ),
+        Stage(
+            "standings",
+            standings,
+            outputs=[f"standings/csv/{season}_usfl_standings.csv"]
+        ),
+        Stage(
+            "rosters",
+            rosters,
+            outputs=[f"rosters/season/csv/{season}_usfl_rosters.csv"]
+        ),
+        Stage(
+            "season_stats",
+            season_stats,
+            inputs=[
+                "player_stats/game_stats/parquet/_partitions.json",
+                "generate_season_stats.py",
+                "metrics.py",
+                "schemas.py",
+                "utils.py",
+                "run_report.py",
+                "fox_api_client.py",
+            ],
+            outputs=[
+                "player_stats/season_stats/csv/*_player_season_stats.csv",
+                "player_stats/career_stats/csv/*.csv",
+            ],
+            depends_on=["parse_gamelogs"],
+            cpu_bound=True
+        ),
+        Stage(
+            "database",
+            database,
+            inputs=[
+                "schedules/*_schedule.csv",
+                "standings/csv/*_usfl_standings.csv",
+                "rosters/season/csv/*_usfl_rosters.csv",
+                "player_stats/game_stats/parquet/_partitions.json",
+                "player_stats/season_stats/csv/*_player_season_stats.csv",
+                "pbp/parquet/_partitions.json",
+                "usfl_database.py",
+                "schemas.py",
+                "utils.py",
+            ],
+            outputs=["cache/usfl.sqlite"],
+            depends_on=[
+                "parse_gamelogs",
+                "standings",
+                "rosters",
+                "season_stats",
+            ],
+            cpu_bound=True
+        ),
+    ]
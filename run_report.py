@@ -0,0 +1,357 @@
+"""
+File: run_report.py
+Author: Joseph Armstrong
+Purpose: Records how long every stage of a run took, how much work it
+    did, and which HTTP requests it sent, and saves all of it as a
+    JSON report, so slow stages can be found after the fact.
+    Optionally, the memory of every stage and game is profiled too.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:
+    # `resource` is only available on Unix.
+    # Without it, the peak RSS is not reported.
+    resource = None
+
+from fox_api_client import get_fox_api_client
+
+# Kept with the other build caches, so it is not committed every run.
+RUN_REPORT_FILE = "cache/run_report.json"
+
+# The highest traced memory before the last `_reset_peak()`,
+# since the last `_start_peak()`. See `_get_traced_memory()`.
+_peak_before_reset = 0
+_peak_lock = threading.Lock()
+
+
+class RunReport:
+    """
+    Collects the stats of every stage of a run.
+
+    Every stage records its wall time, the CPU time of the thread that
+    ran it, and the HTTP requests it sent through the shared
+    `FoxApiClient`. Anything else a stage wants to report, like the
+    number of games, rows, or bytes it processed, can be added to the
+    `dict` it yields.
+
+    Stages can run at the same time, in separate threads (see
+    `pipeline.py`). Anything that can only be measured for the whole
+    process, like the CPU time of this process and of its finished
+    child processes (the workers of a `ProcessPoolExecutor`), is
+    recorded under the `process` key of a stage, and includes every
+    other stage that ran alongside it, which are listed in
+    `overlapped_with`.
+
+    Args:
+        profile_memory (bool):
+            Optional parameter. If True, `tracemalloc` traces every
+            allocation of this process, and every stage also records
+            its peak RSS, its peak traced memory, and the
+            `top_allocations` lines that allocated the most memory
+            during it. Tracing makes the run noticeably slower.
+            `tracemalloc` can not tell threads apart, so the traced
+            memory of a stage that overlapped with another stage
+            is left out.
+
+        top_allocations (int):
+            Optional parameter. The number of allocation sites
+            recorded for every stage.
+
+    Example:
+        report = RunReport()
+        with report.stage("standings") as stage:
+            stage["rows"] = len(get_usfl_standings(2023, key))
+        report.save()
+    """
+
+    def __init__(self, profile_memory=False, top_allocations=10):
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.profile_memory = profile_memory
+        self.top_allocations = top_allocations
+        self.stages = []
+        # The memory profile of every game, see `profile_memory_usage()`.
+        self.games = []
+        self._start_wall = time.perf_counter()
+        self._start_times = os.times()
+        # The stages that are running right now, and the stages
+        # each of them overlapped with, by stage ID.
+        self._lock = threading.Lock()
+        self._running = {}
+        self._overlaps = {}
+
+        if profile_memory is True and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Records the stats of the code in this `with` block as a stage.
+        If the stage raises an exception, it is still recorded,
+        with a `status` of `"error"`.
+
+        Args:
+            name (str):
+                Required parameter. The name of this stage.
+
+        Yields:
+            counters (dict):
+                Any counters this stage wants to report.
+        """
+        counters = {}
+        status = "error"
+        stage_id = object()
+        with self._lock:
+            overlapped_with = set(self._running.values())
+            for other_overlaps in self._overlaps.values():
+                other_overlaps.add(name)
+            self._running[stage_id] = name
+            self._overlaps[stage_id] = overlapped_with
+            # `tracemalloc` only has one peak, for the whole process,
+            # which is only reset if no other stage is using it.
+            if self.profile_memory is True and len(overlapped_with) == 0:
+                start_snapshot = _take_snapshot()
+                start_traced = tracemalloc.get_traced_memory()[0]
+                _start_peak()
+
+        start_wall = time.perf_counter()
+        start_thread_cpu = time.thread_time()
+        start_times = os.times()
+        try:
+            with get_fox_api_client().record_stats() as http_stats:
+                yield counters
+            status = "ok"
+        finally:
+            end_times = os.times()
+            stage = {
+                "name": name,
+                "status": status,
+                "wall_seconds": time.perf_counter() - start_wall,
+                "cpu_seconds": time.thread_time() - start_thread_cpu,
+                **counters,
+                "http": _get_http_stats(http_stats),
+            }
+
+            with self._lock:
+                del self._running[stage_id]
+                overlapped_with = self._overlaps.pop(stage_id)
+                stage["process"] = _get_cpu_seconds(start_times, end_times)
+                stage["overlapped_with"] = sorted(overlapped_with)
+                if self.profile_memory is True:
+                    stage["memory"] = get_peak_rss()
+                if self.profile_memory is True and len(overlapped_with) == 0:
+                    stage["memory"].update(
+                        self._get_memory_stats(start_snapshot, start_traced)
+                    )
+            self.stages.append(stage)
+
+    def _get_memory_stats(self, start_snapshot, start_traced: int):
+        """
+        Returns the memory a stage used, since `start_snapshot`
+        was taken, and the lines that allocated the most of it.
+        """
+        traced, peak_traced = _get_traced_memory()
+        top_stats = _take_snapshot().compare_to(start_snapshot, "lineno")
+
+        return {
+            "peak_traced_mb": (peak_traced - start_traced) / 2**20,
+            "retained_traced_mb": (traced - start_traced) / 2**20,
+            "top_allocations": [
+                {
+                    "site": f"{s.traceback[0].filename}:" +
+                    f"{s.traceback[0].lineno}",
+                    "size_mb": s.size_diff / 2**20,
+                    "count": s.count_diff,
+                }
+                for s in top_stats[:self.top_allocations]
+            ],
+        }
+
+    def to_dict(self):
+        """
+        Returns this report as a `dict`, with the totals of the whole run.
+        """
+        return {
+            "started_at": self.started_at,
+            "wall_seconds": time.perf_counter() - self._start_wall,
+            **_get_cpu_seconds(self._start_times, os.times()),
+            "stages": self.stages,
+        }
+
+    def save(self, file_path=RUN_REPORT_FILE):
+        """
+        Saves this report as a JSON file, and prints how long
+        every stage took.
+        """
+        report = self.to_dict()
+        if self.profile_memory is True:
+            report["games"] = self.games
+
+        folder = os.path.dirname(file_path)
+        if len(folder) > 0:
+            os.makedirs(folder, exist_ok=True)
+        with open(file_path, "w+", encoding="utf8") as f:
+            f.write(json.dumps(report, indent=2))
+
+        for stage in report["stages"]:
+            print(
+                f"{stage['name']:<16}{stage['wall_seconds']:>9.2f}s wall" +
+                f"{stage['cpu_seconds']:>9.2f}s CPU" +
+                f"{stage['http']['requests']:>6} requests"
+            )
+        print(f"Run report saved to `{file_path}`.")
+
+
+def _take_snapshot():
+    """
+    Takes a `tracemalloc` snapshot, without the memory
+    used by `tracemalloc`, or by imports.
+    """
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+
+
+def get_peak_rss():
+    """
+    Returns the peak resident set size (RSS) of this process, and of
+    its largest finished child process, in megabytes. Empty if
+    `resource` is not available.
+    """
+    if resource is None:
+        return {}
+
+    # `ru_maxrss` is in bytes on macOS, and in kilobytes everywhere else.
+    unit = 2**20 if sys.platform == "darwin" else 2**10
+    return {
+        "peak_rss_mb": (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+        ),
+        "peak_child_rss_mb": (
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit
+        ),
+    }
+
+
+def profile_memory_usage(func, *args):
+    """
+    Runs a function, and measures how much memory it allocated.
+    `tracemalloc` is started in this process if it is not running yet,
+    so this also works in the workers of a `ProcessPoolExecutor`,
+    as long as `func` can be sent to them.
+
+    Returns:
+        result:
+            What `func` returned.
+
+        profile (dict):
+            The wall time, peak traced memory, and retained memory
+            of this call, and the peak RSS of this process.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    start_traced = tracemalloc.get_traced_memory()[0]
+    # The stage this call is part of still gets its own peak,
+    # see `_get_traced_memory()`.
+    _reset_peak()
+    start_wall = time.perf_counter()
+
+    result = func(*args)
+
+    traced, peak_traced = tracemalloc.get_traced_memory()
+    profile = {
+        "wall_seconds": time.perf_counter() - start_wall,
+        "peak_traced_mb": (peak_traced - start_traced) / 2**20,
+        "retained_traced_mb": (traced - start_traced) / 2**20,
+        **get_peak_rss(),
+    }
+    profile.pop("peak_child_rss_mb", None)
+    return result, profile
+
+
+def _start_peak():
+    """
+    Resets the peak traced memory, at the start of a stage.
+    """
+    global _peak_before_reset
+
+    with _peak_lock:
+        _peak_before_reset = 0
+        tracemalloc.reset_peak()
+
+
+def _reset_peak():
+    """
+    Resets the peak traced memory, to measure part of a stage
+    (like one game), and keeps the peak so far for the stage.
+    """
+    global _peak_before_reset
+
+    with _peak_lock:
+        _peak_before_reset = max(
+            _peak_before_reset,
+            tracemalloc.get_traced_memory()[1]
+        )
+        tracemalloc.reset_peak()
+
+
+def _get_traced_memory():
+    """
+    Same as `tracemalloc.get_traced_memory()`, but the peak is the
+    highest traced memory since `_start_peak()`, even if the peak was
+    reset by `_reset_peak()` since then.
+    """
+    with _peak_lock:
+        traced, peak_traced = tracemalloc.get_traced_memory()
+        return traced, max(peak_traced, _peak_before_reset)
+
+
+def _get_cpu_seconds(start_times, end_times):
+    """
+    Returns the CPU time (user + system) spent between two `os.times()`,
+    by this process, and by its child processes.
+    """
+    return {
+        "cpu_seconds": (
+            (end_times.user - start_times.user) +
+            (end_times.system - start_times.system)
+        ),
+        "child_cpu_seconds": (
+            (end_times.children_user - start_times.children_user) +
+            (end_times.children_system - start_times.children_system)
+        ),
+    }
+
+
+def _get_http_stats(stats: dict):
+    """
+    Returns the HTTP requests recorded by `FoxApiClient.record_stats()`,
+    and a summary of how long they took.
+    """
+    request_seconds = sorted(stats["request_seconds"])
+    http_stats = {
+        "requests": stats["requests"],
+        "not_modified": stats["not_modified"],
+        "bytes": stats["bytes"],
+    }
+
+    if len(request_seconds) > 0:
+        http_stats["latency_seconds"] = {
+            "total": sum(request_seconds),
+            "mean": sum(request_seconds) / len(request_seconds),
+            "p50": request_seconds[len(request_seconds) // 2],
+            "p95": request_seconds[int(len(request_seconds) * 0.95)],
+            "max": request_seconds[-1],
+        }
+    return http_stats
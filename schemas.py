@@ -0,0 +1,431 @@
+"""
+File: schemas.py
+Author: Joseph Armstrong
+Purpose: The column types of every CSV and Parquet file this repository
+    produces and consumes. The writers cast their DataFrames with
+    `apply_schema()` before saving them, and the readers pass the same
+    schema to `read_csv_with_schema()`, so pandas never has to infer
+    a column's type, and every frame uses compact types:
+    nullable integers for counts, `float32` for values that only have
+    a decimal or two, and categoricals for team codes and names.
+"""
+
+import pandas as pd
+
+# Types shared by several schemas.
+SEASON = "Int16"
+GAME_ID = "Int32"
+PLAYER_ID = "Int32"
+TEAM_ID = "Int16"
+TEAM = "category"
+TEXT = "string"
+COUNT = "Int16"
+RATE = "float64"
+
+# `schedules/{season}_schedule.csv`
+SCHEDULE_SCHEMA = {
+    "game_id": GAME_ID,
+    "season": SEASON,
+    "analytics_description": TEXT,
+    "event_status": "Int8",
+    "is_tba": "boolean",
+    "game_start": TEXT,
+    "game_end": TEXT,
+    "status_line": "category",
+    "venue_name": "category",
+    "venue_location": "category",
+    "share_text": TEXT,
+    "importance": "Int8",
+    "away_team_abv": TEAM,
+    "away_team_nickname": TEAM,
+    "away_team_full_name": TEAM,
+    "away_team_record": TEXT,
+    "away_team_score": COUNT,
+    "away_team_is_loser": "boolean",
+    "away_team_has_possession": "boolean",
+    "home_team_abv": TEAM,
+    "home_team_nickname": TEAM,
+    "home_team_full_name": TEAM,
+    "home_team_record": TEXT,
+    "home_team_score": COUNT,
+    "home_team_is_loser": "boolean",
+    "home_team_has_possession": "boolean",
+    "additional_title": "category",
+    "event_title": TEXT,
+}
+
+# The columns that identify a player in a game, or in a season.
+PLAYER_GAME_SCHEMA = {
+    "season": SEASON,
+    "game_id": GAME_ID,
+    "game_date": TEXT,
+    "team": TEAM,
+    "team_nickname": TEAM,
+    "loc": "category",
+    "opponent": TEAM,
+    "opponent_nickname": TEAM,
+    "analytics_id": TEXT,
+    "player_id": PLAYER_ID,
+    "player_image": TEXT,
+    "player_name": TEXT,
+}
+
+PLAYER_SEASON_SCHEMA = {
+    "season": SEASON,
+    "team": TEAM,
+    "team_nickname": TEAM,
+    "player_id": PLAYER_ID,
+    "player_name": TEXT,
+}
+
+# `player_stats/game_stats/{season}_player_game_stats.csv`
+PLAYER_GAME_STATS_SCHEMA = {
+    **PLAYER_GAME_SCHEMA,
+    "COMP": COUNT,
+    "ATT": COUNT,
+    "COMP%": RATE,
+    "PASS_YDS": COUNT,
+    "PASS_TD": COUNT,
+    "PASS_INT": COUNT,
+    "NFL_QBR": RATE,
+    "YPA": RATE,
+    "YPC": RATE,
+    "RUSH": COUNT,
+    "RUSH_YDS": COUNT,
+    "RUSH_AVG": RATE,
+    "RUSH_TD": COUNT,
+    "RUSH_LONG": COUNT,
+    "REC_TARGETS": COUNT,
+    "REC": COUNT,
+    "REC_YDS": COUNT,
+    "REC_AVG": RATE,
+    "REC_TD": COUNT,
+    "REC_LONG": COUNT,
+    "CATCH%": RATE,
+    "YDS/TARGET": RATE,
+    "FUMBLES": COUNT,
+    "FUMBLES_LOST": COUNT,
+    "FF": COUNT,
+    "FR": COUNT,
+    "TOTAL": COUNT,
+    "SOLO": COUNT,
+    "AST": COUNT,
+    "TFL": "float32",
+    "SACKS": "float32",
+    "INT": COUNT,
+    "PD": COUNT,
+    "DEF_TD": COUNT,
+    "FG_LONG": COUNT,
+    "FGM": COUNT,
+    "FGA": COUNT,
+    "XPM": COUNT,
+    "XPA": COUNT,
+    "FG%": RATE,
+    "XP%": RATE,
+    "PUNTS": COUNT,
+    "GROSS_PUNT_YDS": COUNT,
+    "GROSS_PUNT AVG": "float32",
+    "NET_PUNT_YDS": COUNT,
+    "NET_PUNT_AVG": "float32",
+    "PUNT_TB": COUNT,
+    "PUNTS_IN_20": COUNT,
+    "PUNTS_BLK": COUNT,
+    "PUNT_LONG": COUNT,
+    "PR": COUNT,
+    "PR_YDS": COUNT,
+    "PR_AVG": RATE,
+    "PR_TD": COUNT,
+    "PR_LONG": COUNT,
+    "KR": COUNT,
+    "KR_YDS": COUNT,
+    "KR_AVG": RATE,
+    "KR_TD": COUNT,
+    "KR_LONG": COUNT,
+}
+
+# `player_stats/season_stats/csv/{season}_player_season_stats.csv`
+PLAYER_SEASON_STATS_SCHEMA = {
+    **PLAYER_SEASON_SCHEMA,
+    "G": COUNT,
+    "COMP": COUNT,
+    "ATT": COUNT,
+    "COMP%": RATE,
+    "PASS_YDS": COUNT,
+    "PASS_TD": COUNT,
+    "PASS_TD%": RATE,
+    "PASS_INT": COUNT,
+    "PASS_INT%": RATE,
+    "PASS_YPA": RATE,
+    "PASS_AY/A": RATE,
+    "PASS_YPC": RATE,
+    "PASS_YDS/G": RATE,
+    "NFL_QBR": RATE,
+    "CFB_QBR": RATE,
+    "RUSH": COUNT,
+    "RUSH_YDS": COUNT,
+    "RUSH_TD": COUNT,
+    "RUSH_AVG": RATE,
+    "RUSH_LONG": COUNT,
+    "RUSH_ATT/G": RATE,
+    "RUSH_YDS/G": RATE,
+    "REC_TARGETS": COUNT,
+    "REC": COUNT,
+    "REC_YDS": COUNT,
+    "REC_AVG": RATE,
+    "REC_TD": COUNT,
+    "CATCH%": RATE,
+    "REC_YDS/TARGET": RATE,
+    "REC_YDS/G": RATE,
+    "FUMBLES": COUNT,
+    "FUMBLES_LOST": COUNT,
+    "FF": COUNT,
+    "FR": COUNT,
+    "TOTAL": COUNT,
+    "SOLO": COUNT,
+    "AST": COUNT,
+    "TFL": "float32",
+    "SACKS": "float32",
+    "INT": COUNT,
+    "PD": COUNT,
+    "DEF_TD": COUNT,
+    "FGM": COUNT,
+    "FGA": COUNT,
+    "FG%": RATE,
+    "FG_LONG": COUNT,
+    "XPM": COUNT,
+    "XPA": COUNT,
+    "XP%": RATE,
+    "PUNTS": COUNT,
+    "GROSS_PUNT_YDS": COUNT,
+    "GROSS_PUNT AVG": "float32",
+    "NET_PUNT_YDS": COUNT,
+    "NET_PUNT_AVG": "float32",
+    "PUNT_TB": COUNT,
+    "PUNTS_IN_20": COUNT,
+    "PUNTS_BLK": COUNT,
+    "PUNT_LONG": COUNT,
+    "PR": COUNT,
+    "PR_YDS": COUNT,
+    "PR_AVG": RATE,
+    "PR_TD": COUNT,
+    "PR_LONG": COUNT,
+    "KR": COUNT,
+    "KR_YDS": COUNT,
+    "KR_AVG": RATE,
+    "KR_TD": COUNT,
+    "KR_LONG": COUNT,
+}
+
+# `player_stats/career_stats/csv/usfl_player_career_stats.csv`
+PLAYER_CAREER_STATS_SCHEMA = {
+    col: dtype for col, dtype in PLAYER_SEASON_STATS_SCHEMA.items()
+    if col not in ["season", "team", "team_nickname"]
+}
+
+# `team_stats/game_stats/{season}_team_game_stats.csv`,
+# built from the "TOTALS" rows of every boxscore table.
+TEAM_GAME_STATS_SCHEMA = {
+    col: dtype for col, dtype in PLAYER_GAME_STATS_SCHEMA.items()
+    if col not in ["analytics_id", "player_id", "player_image", "player_name"]
+}
+
+# `team_stats/season_stats/csv/{season}_team_season_stats.csv`
+TEAM_SEASON_STATS_SCHEMA = {
+    col: dtype for col, dtype in PLAYER_SEASON_STATS_SCHEMA.items()
+    if col not in ["player_id", "player_name"]
+}
+
+# `pbp/{season}_play_by_play.csv`
+PBP_SCHEMA = {
+    "game_id": GAME_ID,
+    "season": SEASON,
+    "game_date": TEXT,
+    "away_team_id": TEAM,
+    "away_team_nickname": TEAM,
+    "away_team_full_name": TEAM,
+    "home_team_id": TEAM,
+    "home_team_nickname": TEAM,
+    "home_team_full_name": TEAM,
+    "off_team_id": TEAM,
+    "off_team_nickname": TEAM,
+    "off_team_full_name": TEAM,
+    "def_team_id": TEAM,
+    "def_team_nickname": TEAM,
+    "def_team_full_name": TEAM,
+    "quarter": "category",
+    "drive_id": "Int16",
+    "play_id": "Int32",
+    "down_and_distance": TEXT,
+    "down": "Int8",
+    "distance": "Int8",
+    "ball_on": TEXT,
+    "time_of_play": TEXT,
+    "time_of_play_min": "Int8",
+    "time_of_play_sec": "Int8",
+    "game_seconds_remaining": COUNT,
+    "drive_play_num": "Int8",
+    "play_description": TEXT,
+    "away_team_score_change": "boolean",
+    "home_team_score_change": "boolean",
+    "away_score": COUNT,
+    "home_score": COUNT,
+    "drive_plays": "Int8",
+    "drive_yards": COUNT,
+    "drive_time": TEXT,
+    "drive_time_min": "Int8",
+    "drive_time_sec": "Int8",
+    "drive_result": "category",
+}
+
+# `standings/csv/{season}_usfl_standings.csv`
+STANDINGS_SCHEMA = {
+    "season": SEASON,
+    "division": "category",
+    "team_rank": "Int8",
+    "team_analytics_name": TEAM,
+    "league": "category",
+    "team_nickname": TEAM,
+    "team_name": TEAM,
+    "team_logo_url": TEXT,
+    "team_logo_alt_url": TEXT,
+    "team_id": TEAM_ID,
+}
+for record in ["overall", "home", "away", "division"]:
+    STANDINGS_SCHEMA.update({
+        f"{record}_record_txt": TEXT,
+        f"{record}_W": "Int8",
+        f"{record}_L": "Int8",
+        f"{record}_T": "Int8",
+        f"{record}_win_pct": "float32",
+    })
+    if record == "overall":
+        STANDINGS_SCHEMA.update({
+            "overall_points_scored": COUNT,
+            "overall_points_allowed": COUNT,
+            "overall_point_diff": COUNT,
+        })
+STANDINGS_SCHEMA["streak"] = TEXT
+del record
+
+# `rosters/season/csv/{season}_usfl_rosters.csv` and
+# `rosters/weekly/csv/{season}_{week}_usfl_rosters.csv`
+ROSTERS_SCHEMA = {
+    "season": SEASON,
+    "team_id": TEAM_ID,
+    "team_analytics_name": TEAM,
+    "team_name_arr": TEAM,
+    "jersey_number": TEXT,
+    "player_id": PLAYER_ID,
+    "player_analytics_name": TEXT,
+    "player_name": TEXT,
+    "player_pos": "category",
+    "player_age": "Int8",
+    "player_height": TEXT,
+    "player_weight": COUNT,
+    "player_college": TEXT,
+    "player_headshot": TEXT,
+    "player_url": TEXT,
+}
+
+SCHEMAS = {
+    "schedule": SCHEDULE_SCHEMA,
+    "player_game_stats": PLAYER_GAME_STATS_SCHEMA,
+    "player_season_stats": PLAYER_SEASON_STATS_SCHEMA,
+    "player_career_stats": PLAYER_CAREER_STATS_SCHEMA,
+    "team_game_stats": TEAM_GAME_STATS_SCHEMA,
+    "team_season_stats": TEAM_SEASON_STATS_SCHEMA,
+    "pbp": PBP_SCHEMA,
+    "standings": STANDINGS_SCHEMA,
+    "rosters": ROSTERS_SCHEMA,
+}
+
+
+def get_schema(schema_name: str):
+    """
+    Returns one of the `SCHEMAS`, by name.
+    """
+    try:
+        return SCHEMAS[schema_name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown schema: `{schema_name}`. " +
+            f"Expected one of {list(SCHEMAS)}."
+        )
+
+
+def apply_schema(df: pd.DataFrame, schema_name: str):
+    """
+    Casts the columns of a DataFrame to the types in a schema.
+
+    Numeric columns that are still stored as text are converted first.
+    Values that are not numbers, like the `-` the API uses for
+    "no value", become missing values. Columns that are not in the
+    schema are left as they are, and their order is not changed.
+
+    Args:
+        df (pandas.DataFrame):
+            Required parameter. The DataFrame you want cast.
+
+        schema_name (str):
+            Required parameter. The name of one of the `SCHEMAS`.
+
+    Returns:
+        df (pandas.DataFrame):
+            A copy of `df`, with the types of the schema.
+    """
+    schema = get_schema(schema_name)
+    df = df.copy()
+
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+
+        column = df[col]
+        is_numeric = dtype not in (TEXT, "category", "boolean")
+        if is_numeric and not pd.api.types.is_numeric_dtype(column):
+            column = pd.to_numeric(column, errors="coerce")
+
+        if dtype == "boolean" and column.dtype == object:
+            column = column.map(
+                {True: True, False: False, "True": True, "False": False}
+            )
+
+        df[col] = column.astype(dtype)
+
+    return df
+
+
+def read_csv_with_schema(file_path: str, schema_name: str, **kwargs):
+    """
+    Reads a CSV file with the types of a schema,
+    instead of letting pandas infer them.
+
+    Args:
+        file_path (str):
+            Required parameter. The CSV file you want to read.
+
+        schema_name (str):
+            Required parameter. The name of one of the `SCHEMAS`.
+
+        **kwargs:
+            Optional parameters, passed on to `pandas.read_csv()`.
+
+    Returns:
+        df (pandas.DataFrame):
+            The contents of this file.
+    """
+    schema = get_schema(schema_name)
+    # Older files can still have the API's `-` placeholder
+    # in columns that are numeric now.
+    na_values = {
+        col: ["-"] for col, dtype in schema.items()
+        if dtype not in (TEXT, "category", "boolean")
+    }
+    # "round_trip" reads every float back exactly as it was written.
+    kwargs.setdefault("float_precision", "round_trip")
+    return pd.read_csv(
+        file_path,
+        dtype=schema,
+        na_values=na_values,
+        **kwargs
+    )
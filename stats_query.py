@@ -0,0 +1,226 @@
+"""
+File: stats_query.py
+Author: Joseph Armstrong
+Purpose: Fast, in-process lookups of player game stats by player, game,
+    team and season. The game stats are loaded once, indexed once,
+    and reloaded only when the files they came from change.
+"""
+
+import glob
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from schemas import read_csv_with_schema
+
+GAME_STATS_FOLDER = "player_stats/game_stats"
+
+# The columns every `PlayerGameStatsIndex` has a hash index on.
+INDEXED_COLUMNS = ["player_id", "game_id", "team", "season"]
+
+
+class PlayerGameStatsIndex:
+    """
+    Loads every `{season}_player_game_stats.csv` in a folder, and builds
+    a hash index on each of the `INDEXED_COLUMNS`, which maps every value
+    to the positions of the rows that have it. A lookup only touches the
+    rows it returns, instead of scanning every row with a boolean mask.
+
+    Before every lookup, the size and modification time of the files are
+    checked, and everything is reloaded if any of them changed.
+
+    The result of every lookup is kept, and the same DataFrame is
+    returned the next time it is asked for, until the files change.
+    Treat the returned DataFrames as read-only, or copy them first.
+
+    Args:
+        folder (str):
+            Optional parameter. The folder with the player game stats.
+
+        seasons (list):
+            Optional parameter. The seasons you want loaded.
+            If not set, every season in `folder` is loaded.
+
+    Example:
+        index = PlayerGameStatsIndex()
+        index.get_player(37)
+        index.get_game(44)
+        index.query(team="PHI", season=2023)
+    """
+
+    def __init__(self, folder=GAME_STATS_FOLDER, seasons=None):
+        self.folder = folder
+        self.seasons = seasons
+        self.load_count = 0
+        self._lock = threading.Lock()
+        self._folder_mtime = None
+        self._files = []
+        self._signature = None
+        self._df = None
+        self._indexes = {}
+        self._results = {}
+
+    def get_player(self, player_id: int):
+        """
+        Returns every game of a player.
+        """
+        return self.query(player_id=player_id)
+
+    def get_game(self, game_id: int):
+        """
+        Returns every player in a game (the box score of that game).
+        """
+        return self.query(game_id=game_id)
+
+    def get_team(self, team: str, season=None):
+        """
+        Returns every player game of a team, optionally in one season.
+        """
+        if season is None:
+            return self.query(team=team)
+        return self.query(team=team, season=season)
+
+    def get_season(self, season: int):
+        """
+        Returns every player game in a season.
+        """
+        return self.query(season=season)
+
+    def query(self, **filters):
+        """
+        Returns the rows that match every filter.
+
+        Args:
+            **filters:
+                Required parameters. One value for any of the
+                `INDEXED_COLUMNS`, like `team="PHI", season=2023`.
+
+        Returns:
+            df (pandas.DataFrame):
+                The matching rows, in the order they were loaded.
+        """
+        if len(filters) == 0:
+            raise ValueError("At least one filter is required.")
+
+        for col in filters:
+            if col not in INDEXED_COLUMNS:
+                raise ValueError(
+                    f"`{col}` is not indexed. " +
+                    f"Expected one of {INDEXED_COLUMNS}."
+                )
+
+        key = tuple(sorted(filters.items()))
+
+        with self._lock:
+            self._refresh()
+            if key in self._results:
+                return self._results[key]
+            df = self._df
+            indexes = self._indexes
+
+        df = self._get_rows(df, indexes, filters)
+        with self._lock:
+            if indexes is self._indexes:
+                self._results[key] = df
+        return df
+
+    def refresh(self):
+        """
+        Reloads the game stats if any of their files changed.
+
+        Returns:
+            True if the game stats were reloaded, False otherwise.
+        """
+        with self._lock:
+            return self._refresh()
+
+    def _get_rows(self, df: pd.DataFrame, indexes: dict, filters: dict):
+        positions = None
+        for col, value in filters.items():
+            col_positions = indexes[col].get(value)
+            if col_positions is None:
+                return df.iloc[0:0]
+            elif positions is None:
+                positions = col_positions
+            else:
+                positions = np.intersect1d(
+                    positions,
+                    col_positions,
+                    assume_unique=True
+                )
+
+        return df.take(positions)
+
+    def _get_files(self):
+        if self.seasons is not None:
+            return [
+                f"{self.folder}/{season}_player_game_stats.csv"
+                for season in self.seasons
+            ]
+
+        # The folder only has to be listed again
+        # when a file was added to it, or removed from it.
+        folder_mtime = os.stat(self.folder).st_mtime_ns
+        if folder_mtime != self._folder_mtime:
+            self._files = sorted(
+                glob.glob(f"{self.folder}/*_player_game_stats.csv")
+            )
+            self._folder_mtime = folder_mtime
+        return self._files
+
+    def _get_signature(self, file_list: list):
+        signature = []
+        for file_path in file_list:
+            stat = os.stat(file_path)
+            signature.append((file_path, stat.st_size, stat.st_mtime_ns))
+        return signature
+
+    def _refresh(self):
+        file_list = self._get_files()
+        signature = self._get_signature(file_list)
+        if signature == self._signature:
+            return False
+
+        if len(file_list) == 0:
+            raise FileNotFoundError(
+                f"No player game stats were found in `{self.folder}`."
+            )
+
+        df = pd.concat(
+            [
+                read_csv_with_schema(file_path, "player_game_stats")
+                for file_path in file_list
+            ],
+            ignore_index=True
+        )
+
+        # `groupby().indices` builds every index in a single pass,
+        # as a dict of value to the sorted positions of its rows.
+        self._indexes = {
+            col: df.groupby(col, observed=True, sort=False).indices
+            for col in INDEXED_COLUMNS
+        }
+        self._df = df
+        self._results = {}
+        self._signature = signature
+        self.load_count += 1
+        return True
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_player_game_stats_index():
+    """
+    Returns the `PlayerGameStatsIndex` shared by every caller in this
+    process, so the game stats are only loaded and indexed once.
+    """
+    global _index
+
+    with _index_lock:
+        if _index is None:
+            _index = PlayerGameStatsIndex()
+    return _index
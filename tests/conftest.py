@@ -0,0 +1,189 @@
+"""
+File: tests/conftest.py
+Author: Joseph Armstrong
+Purpose: Shared fixtures for the tests of this repository: a scratch
+    working folder for the modules that read and write relative paths,
+    and a local stand-in for the FOX Sports bifrost API.
+"""
+
+import hashlib
+import http.server
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import pytest
+
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_FOLDER)
+
+import fox_api_client  # noqa: E402
+
+# The real gamelogs the parser tests are ran on.
+GAMELOGS_FOLDER = f"{REPO_FOLDER}/Gamelogs"
+
+# Two games of every season, see the `gamelogs` fixture.
+TEST_GAME_IDS = [1, 2, 44, 89]
+
+# The output folders this repository ships with,
+# which the writers expect to exist.
+OUTPUT_FOLDERS = [
+    "Gamelogs",
+    "schedules",
+    "player_stats/game_stats",
+    "player_stats/season_stats/csv",
+    "player_stats/season_stats/parquet",
+]
+
+
+@pytest.fixture
+def work_folder(tmp_path, monkeypatch):
+    """
+    Runs a test in an empty folder, with a new shared `FoxApiClient`,
+    so nothing in this repository is read or written by accident.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(fox_api_client, "_client", None)
+    for folder in OUTPUT_FOLDERS:
+        os.makedirs(folder)
+    return tmp_path
+
+
+@pytest.fixture
+def gamelogs(work_folder):
+    """
+    Copies the `TEST_GAME_IDS` gamelogs into the working folder,
+    and returns their paths.
+    """
+    game_json_list = []
+    for game_id in TEST_GAME_IDS:
+        shutil.copy(f"{GAMELOGS_FOLDER}/{game_id}.json", "Gamelogs")
+        game_json_list.append(f"Gamelogs/{game_id}.json")
+    return game_json_list
+
+
+class BifrostStub(http.server.ThreadingHTTPServer):
+    """
+    A local stand-in for the `event/{id}/data` endpoint of bifrost,
+    and for any other file, like a headshot.
+
+    Every game and file is served with an `ETag`, and a request with
+    a matching `If-None-Match` gets a `304 Not Modified`. Every request
+    is logged, along with the most requests that were in flight
+    at the same time.
+
+    Attributes:
+        games (dict):
+            The JSON of every game, by game ID.
+
+        files (dict):
+            The content of every other file, by path, like
+            `{"/headshots/1.png": b"..."}`.
+
+        failures (dict):
+            Status codes to respond with before a game is served,
+            by game ID, like `{1: [429, 503]}`. One is used up
+            by every request for that game.
+
+        delay (float):
+            How long every response takes, in seconds.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _BifrostHandler)
+        self.games = {}
+        self.files = {}
+        self.failures = {}
+        self.delay = 0.0
+        self.requests = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def get_etag(self, game_id: int):
+        return _get_etag(json.dumps(self.games[game_id]).encode("utf8"))
+
+
+def _get_etag(body: bytes):
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+class _BifrostHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        stub = self.server
+        with stub._lock:
+            stub._in_flight += 1
+            stub.max_in_flight = max(stub.max_in_flight, stub._in_flight)
+            stub.requests.append({
+                "path": self.path,
+                "time": time.monotonic(),
+                "if_none_match": self.headers.get("If-None-Match"),
+            })
+        try:
+            time.sleep(stub.delay)
+            self._respond(stub)
+        finally:
+            with stub._lock:
+                stub._in_flight -= 1
+
+    def _respond(self, stub: BifrostStub):
+        path = self.path.split("?")[0]
+        if path in stub.files:
+            return self._send_body(stub.files[path])
+
+        parts = path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "event" or parts[2] != "data":
+            return self._send_status(404)
+
+        game_id = int(parts[1])
+        with stub._lock:
+            failures = stub.failures.get(game_id, [])
+            status_code = failures.pop(0) if len(failures) > 0 else None
+        if status_code is not None:
+            return self._send_status(status_code)
+        elif game_id not in stub.games:
+            return self._send_status(404)
+
+        self._send_body(json.dumps(stub.games[game_id]).encode("utf8"))
+
+    def _send_body(self, body: bytes):
+        etag = _get_etag(body)
+        if self.headers.get("If-None-Match") == etag:
+            return self._send_status(304)
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_status(self, status_code: int):
+        self.send_response(status_code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def bifrost():
+    """
+    Starts a `BifrostStub`, and stops it after the test.
+    """
+    stub = BifrostStub()
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
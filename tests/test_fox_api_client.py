@@ -0,0 +1,97 @@
+"""
+File: tests/test_fox_api_client.py
+Author: Joseph Armstrong
+Purpose: Tests the conditional requests, validator cache, and request
+    stats of `FoxApiClient`, against a local stand-in for the bifrost
+    API (see `conftest.py`).
+"""
+
+import json
+import threading
+
+from fox_api_client import FoxApiClient
+
+
+def _get_client(work_folder):
+    return FoxApiClient(
+        cache_file=f"{work_folder}/cache/http_cache.json",
+        cache_folder=f"{work_folder}/cache/http"
+    )
+
+
+def _get_validators(work_folder):
+    with open(f"{work_folder}/cache/http_cache.json", encoding="utf8") as f:
+        return json.load(f)
+
+
+def test_unchanged_responses_are_served_from_the_cache(work_folder, bifrost):
+    bifrost.games = {1: {"version": 1}}
+    client = _get_client(work_folder)
+    url = f"{bifrost.base_url}/event/1/data"
+
+    assert client.get_json(url) == ({"version": 1}, True)
+    assert client.get_json(url) == ({"version": 1}, False)
+    assert bifrost.requests[-1]["if_none_match"] == bifrost.get_etag(1)
+
+    bifrost.games = {1: {"version": 2}}
+    assert client.get_json(url) == ({"version": 2}, True)
+
+
+def test_validators_are_saved_without_the_api_key(work_folder, bifrost):
+    bifrost.games = {1: {"version": 1}}
+    client = _get_client(work_folder)
+    url = f"{bifrost.base_url}/event/1/data"
+
+    client.get(url, params={"apikey": "secret-key"}, cache_body=False)
+    assert list(_get_validators(work_folder)) == [url]
+    with open(f"{work_folder}/cache/http_cache.json", encoding="utf8") as f:
+        assert "secret-key" not in f.read()
+
+    # A new client sends the validators it loaded from disk.
+    content, is_modified = _get_client(work_folder).get(
+        url,
+        params={"apikey": "secret-key"},
+        cache_body=False
+    )
+    assert (content, is_modified) == (None, False)
+
+
+def test_unsaved_responses_do_not_store_validators(work_folder, bifrost):
+    bifrost.games = {1: {"version": 1}}
+    client = _get_client(work_folder)
+    url = f"{bifrost.base_url}/event/1/data"
+
+    client.get(url, cache_body=False, store_validators=False)
+    client.get(url, cache_body=False, store_validators=False)
+    assert all(r["if_none_match"] is None for r in bifrost.requests)
+
+
+def test_unconditional_requests_always_download(work_folder, bifrost):
+    bifrost.games = {1: {"version": 1}}
+    client = _get_client(work_folder)
+    url = f"{bifrost.base_url}/event/1/data"
+
+    client.get(url, cache_body=False)
+    content, is_modified = client.get(url, cache_body=False, conditional=False)
+    assert json.loads(content) == {"version": 1}
+    assert is_modified is True
+
+
+def test_record_stats_only_counts_its_own_requests(work_folder, bifrost):
+    bifrost.games = {1: {"version": 1}}
+    client = _get_client(work_folder)
+    url = f"{bifrost.base_url}/event/1/data"
+
+    def send_requests(count: int):
+        for _ in range(count):
+            client.get(url, cache_body=False, conditional=False)
+
+    thread = threading.Thread(target=send_requests, args=(5,))
+    with client.record_stats() as stats:
+        thread.start()
+        send_requests(2)
+        thread.join()
+
+    assert stats["requests"] == 2
+    assert len(stats["request_seconds"]) == 2
+    assert client.get_stats()["requests"] == 7
@@ -0,0 +1,92 @@
+"""
+File: tests/test_gamelog_io.py
+Author: Joseph Armstrong
+Purpose: Tests that compressed gamelogs, and gamelogs that are only
+    partly decoded (or streamed), read the same as a plain gamelog.
+"""
+
+import os
+
+import pytest
+
+import gamelog_io
+from gamelog_io import (
+    find_gamelog,
+    load_gamelog,
+    save_gamelog,
+)
+from usfl import (
+    PARSER_SECTIONS,
+    get_json_in_folder,
+    parse_usfl_player_stats,
+)
+
+COMPRESSIONS = [
+    None,
+    "gzip",
+    pytest.param(
+        "zstd",
+        marks=pytest.mark.skipif(
+            gamelog_io.zstandard is None,
+            reason="`zstandard` is not installed."
+        )
+    ),
+]
+
+
+def _save_copies(gamelogs: list, compression: str, folder: str):
+    """
+    Saves a copy of every gamelog with a compression,
+    and returns the path of every copy.
+    """
+    os.makedirs(folder, exist_ok=True)
+    copy_list = []
+    for game_file in gamelogs:
+        game_id = int(os.path.basename(game_file).split(".")[0])
+        copy_list.append(
+            save_gamelog(load_gamelog(game_file), game_id, folder, compression)
+        )
+    return copy_list
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_compressed_gamelogs_load_the_same(gamelogs, compression):
+    copy_list = _save_copies(gamelogs, compression, "Compressed")
+    for game_file, copy_file in zip(gamelogs, copy_list):
+        assert load_gamelog(copy_file) == load_gamelog(game_file)
+    assert sorted(get_json_in_folder("Compressed")) == sorted(
+        os.path.abspath(i) for i in copy_list
+    )
+    assert find_gamelog(1, "Compressed") == copy_list[0]
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+@pytest.mark.parametrize("streamed", [True, False])
+@pytest.mark.parametrize(
+    "sections",
+    list(PARSER_SECTIONS.values()) + [["metadata"], ["header", "pbp"]]
+)
+def test_sections_load_the_same(
+    gamelogs,
+    monkeypatch,
+    compression,
+    streamed,
+    sections
+):
+    if streamed is False:
+        monkeypatch.setattr(gamelog_io, "ijson", None)
+    elif gamelog_io.ijson is None:
+        pytest.skip("`ijson` is not installed.")
+
+    copy_file = _save_copies(gamelogs[:1], compression, "Compressed")[0]
+    full_data = load_gamelog(gamelogs[0])
+    assert load_gamelog(copy_file, sections) == {
+        s: full_data[s] for s in sections if s in full_data
+    }
+
+
+def test_compressed_gamelogs_parse_the_same(gamelogs):
+    copy_list = _save_copies(gamelogs, "gzip", "Compressed")
+    plain_df = parse_usfl_player_stats(gamelogs, workers=1)
+    compressed_df = parse_usfl_player_stats(copy_list, workers=1)
+    assert compressed_df.equals(plain_df)
@@ -0,0 +1,145 @@
+"""
+File: tests/test_get_usfl_games.py
+Author: Joseph Armstrong
+Purpose: Tests `get_usfl_games()` against a local stand-in
+    for the bifrost API (see `conftest.py`).
+"""
+
+import os
+import time
+
+import pytest
+
+import usfl
+from gamelog_io import find_gamelog, load_gamelog
+
+
+class _RecordingTime:
+    """
+    Stands in for the `time` module in `usfl.py`, so retries
+    do not actually wait out their backoff.
+    """
+
+    def __init__(self):
+        self.sleeps = []
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+
+    def __getattr__(self, name: str):
+        return getattr(time, name)
+
+
+@pytest.fixture
+def recorded_time(monkeypatch):
+    recorded_time = _RecordingTime()
+    monkeypatch.setattr(usfl, "time", recorded_time)
+    return recorded_time
+
+
+def _get_game(game_id: int, version=1):
+    return {"header": {"id": str(game_id)}, "version": version}
+
+
+def _get_games(bifrost, game_ids: list, **kwargs):
+    kwargs.setdefault("requests_per_second", 1000.0)
+    return usfl.get_usfl_games(
+        game_ids,
+        "test-key",
+        base_url=bifrost.base_url,
+        **kwargs
+    )
+
+
+def test_downloads_and_saves_every_game(work_folder, bifrost):
+    bifrost.games = {i: _get_game(i) for i in range(1, 6)}
+
+    assert _get_games(bifrost, [3, 1, 5, 2, 4]) == [3, 1, 5, 2, 4]
+    for game_id in range(1, 6):
+        assert load_gamelog(find_gamelog(game_id)) == _get_game(game_id)
+
+
+def test_downloads_games_concurrently(work_folder, bifrost):
+    bifrost.games = {i: _get_game(i) for i in range(1, 9)}
+    bifrost.delay = 0.2
+
+    _get_games(bifrost, range(1, 9), max_workers=4)
+    assert 1 < bifrost.max_in_flight <= 4
+
+
+def test_requests_are_rate_limited(work_folder, bifrost):
+    bifrost.games = {i: _get_game(i) for i in range(1, 7)}
+
+    _get_games(bifrost, range(1, 7), max_workers=4, requests_per_second=5.0)
+    start_times = sorted(r["time"] for r in bifrost.requests)
+    # One request every 0.2 seconds, after the first.
+    assert start_times[-1] - start_times[0] >= 5 * 0.2 * 0.9
+
+
+def test_retries_429_and_5xx_responses(work_folder, bifrost, recorded_time):
+    bifrost.games = {1: _get_game(1), 2: _get_game(2)}
+    bifrost.failures = {1: [429, 503]}
+
+    assert _get_games(bifrost, [1, 2], max_retries=3) == [1, 2]
+    game_requests = [r for r in bifrost.requests if "/event/1/" in r["path"]]
+    assert len(game_requests) == 3
+    # Exponential backoff.
+    assert recorded_time.sleeps == [1, 2]
+
+
+def test_gives_up_after_max_retries(work_folder, bifrost, recorded_time):
+    bifrost.games = {1: _get_game(1)}
+    bifrost.failures = {1: [500] * 5}
+
+    assert _get_games(bifrost, [1], max_retries=2) == []
+    assert len(bifrost.requests) == 3
+    assert find_gamelog(1) is None
+
+
+def test_does_not_retry_other_4xx_responses(work_folder, bifrost, capsys):
+    bifrost.games = {1: _get_game(1)}
+
+    assert _get_games(bifrost, [1, 2]) == [1]
+    assert len([r for r in bifrost.requests if "/event/2/" in r["path"]]) == 1
+
+    output = capsys.readouterr().out
+    assert "Could not download game #2: HTTP 404" in output
+    assert "test-key" not in output
+
+
+def test_unchanged_games_are_not_saved_again(work_folder, bifrost):
+    bifrost.games = {1: _get_game(1)}
+
+    _get_games(bifrost, [1])
+    modified_time = os.stat(find_gamelog(1)).st_mtime_ns
+
+    assert _get_games(bifrost, [1]) == [1]
+    assert bifrost.requests[-1]["if_none_match"] == bifrost.get_etag(1)
+    assert os.stat(find_gamelog(1)).st_mtime_ns == modified_time
+    assert load_gamelog(find_gamelog(1)) == _get_game(1)
+
+
+def test_changed_games_are_saved_again(work_folder, bifrost):
+    bifrost.games = {1: _get_game(1)}
+    _get_games(bifrost, [1])
+
+    bifrost.games = {1: _get_game(1, version=2)}
+    _get_games(bifrost, [1])
+    assert load_gamelog(find_gamelog(1)) == _get_game(1, version=2)
+
+
+def test_fetches_that_are_not_saved_do_not_store_validators(
+    work_folder,
+    bifrost
+):
+    bifrost.games = {1: _get_game(1)}
+    _get_games(bifrost, [1])
+
+    # A fetch that is not saved must not make the next saving fetch
+    # believe the new version is already on disk.
+    bifrost.games = {1: _get_game(1, version=2)}
+    _get_games(bifrost, [1], save=False)
+    assert load_gamelog(find_gamelog(1)) == _get_game(1)
+
+    _get_games(bifrost, [1])
+    assert load_gamelog(find_gamelog(1)) == _get_game(1, version=2)
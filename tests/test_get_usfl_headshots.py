@@ -0,0 +1,96 @@
+"""
+File: tests/test_get_usfl_headshots.py
+Author: Joseph Armstrong
+Purpose: Tests that `get_usfl_headshots()` only downloads headshots
+    that are new or have changed, against a local stand-in
+    for the headshot server (see `conftest.py`).
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from get_usfl_headshots import (
+    HEADSHOTS_FOLDER,
+    get_usfl_headshots,
+    load_headshot_index,
+)
+from schemas import get_schema
+
+
+@pytest.fixture
+def roster(work_folder, bifrost):
+    """
+    Saves a 2023 roster of three players, whose headshots are served
+    by `bifrost`, and returns the headshot of every player.
+    """
+    headshots = {1: b"a" * 100, 2: b"b" * 100, 3: b"c" * 100}
+    bifrost.files = {f"/{i}.png": image for i, image in headshots.items()}
+
+    roster_df = pd.DataFrame(columns=list(get_schema("rosters")))
+    roster_df["player_id"] = list(headshots)
+    roster_df["season"] = 2023
+    roster_df["player_headshot"] = [
+        f"{bifrost.base_url}/{i}.png" for i in headshots
+    ]
+    os.makedirs("rosters/season/csv")
+    os.makedirs(HEADSHOTS_FOLDER)
+    roster_df.to_csv("rosters/season/csv/2023_usfl_rosters.csv", index=False)
+    return headshots
+
+
+def _read_headshot(player_id: int):
+    with open(f"{HEADSHOTS_FOLDER}/{player_id}.png", "rb") as f:
+        return f.read()
+
+
+def _get_headshots(**kwargs):
+    get_usfl_headshots(2023, requests_per_second=1000.0, **kwargs)
+
+
+def test_downloads_every_new_headshot(roster, bifrost):
+    _get_headshots()
+    for player_id, image in roster.items():
+        assert _read_headshot(player_id) == image
+    assert set(load_headshot_index()) == {"1", "2", "3"}
+    # Headshot URLs are not written to the shared HTTP cache.
+    assert not os.path.exists("cache/http_cache.json")
+
+
+def test_unchanged_headshots_send_no_requests(roster, bifrost):
+    _get_headshots()
+    request_count = len(bifrost.requests)
+
+    _get_headshots()
+    assert len(bifrost.requests) == request_count
+
+
+def test_changed_files_are_downloaded_again(roster, bifrost):
+    _get_headshots()
+    request_count = len(bifrost.requests)
+
+    with open(f"{HEADSHOTS_FOLDER}/2.png", "wb") as f:
+        f.write(b"corrupted")
+    _get_headshots()
+    assert _read_headshot(2) == roster[2]
+    assert len(bifrost.requests) == request_count + 1
+
+
+def test_revalidate_picks_up_new_images_under_the_same_url(roster, bifrost):
+    _get_headshots()
+    bifrost.files["/3.png"] = b"d" * 50
+
+    _get_headshots()
+    assert _read_headshot(3) == roster[3]
+
+    request_count = len(bifrost.requests)
+    _get_headshots(revalidate=True)
+    assert _read_headshot(3) == b"d" * 50
+    assert _read_headshot(1) == roster[1]
+    # Every headshot is requested, and the unchanged ones get a 304.
+    assert len(bifrost.requests) == request_count + 3
+    assert all(
+        r["if_none_match"] is not None
+        for r in bifrost.requests[request_count:]
+    )
@@ -0,0 +1,116 @@
+"""
+File: tests/test_parsers.py
+Author: Joseph Armstrong
+Purpose: Tests that the gamelog parsers still give the same schedule,
+    player stats, and play-by-play data as the original parsers,
+    and that every faster way of parsing gives the same results
+    as a full, serial parse.
+"""
+
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import REPO_FOLDER, TEST_GAME_IDS
+from gamelog_io import load_gamelog, save_gamelog
+from run_report import RunReport
+from usfl import parse_usfl_gamelogs
+
+# What the original parsers gave for the `TEST_GAME_IDS` gamelogs.
+BASELINE_FOLDER = f"{REPO_FOLDER}/tests/data"
+
+# The columns every table is sorted by, before it's compared.
+TABLE_KEYS = {
+    "schedule": ["game_id"],
+    "player_stats": ["game_id", "player_id"],
+    "pbp": ["game_id", "play_id"],
+}
+
+# Columns the original parsers left blank, and are now filled in.
+NEW_BASELINE_COLUMNS = {
+    "player_stats": [
+        "team",
+        "team_nickname",
+        "loc",
+        "opponent",
+        "opponent_nickname",
+    ],
+}
+
+
+def _parse(game_json_list: list, **kwargs):
+    return parse_usfl_gamelogs(game_json_list, save=False, **kwargs)
+
+
+def _sort_table(df: pd.DataFrame, table: str):
+    return df.sort_values(
+        by=TABLE_KEYS[table],
+        kind="stable"
+    ).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("table", list(TABLE_KEYS))
+def test_parsed_output_matches_the_baseline(gamelogs, table):
+    baseline_df = pd.read_csv(f"{BASELINE_FOLDER}/baseline_{table}.csv.gz")
+    columns = [
+        c for c in baseline_df.columns
+        if c not in NEW_BASELINE_COLUMNS.get(table, [])
+    ]
+
+    # Read back like the baseline, so both have the same dtypes.
+    parsed_df = pd.read_csv(
+        io.StringIO(_parse(gamelogs)[table][columns].to_csv(index=False))
+    )
+    pd.testing.assert_frame_equal(
+        _sort_table(parsed_df, table),
+        _sort_table(baseline_df[columns], table),
+        check_dtype=False
+    )
+
+
+def test_parallel_parse_matches_serial(gamelogs):
+    serial = _parse(gamelogs, workers=1)
+    parallel = _parse(gamelogs, workers=2)
+    for table in TABLE_KEYS:
+        pd.testing.assert_frame_equal(parallel[table], serial[table])
+
+
+def _get_parsed_games(report: RunReport):
+    stage = [s for s in report.stages if s["name"] == "parse_gamelogs"][0]
+    return stage["parsed_games"]
+
+
+def _assert_same_tables(results: dict, expected: dict):
+    for table in TABLE_KEYS:
+        pd.testing.assert_frame_equal(results[table], expected[table])
+
+
+def test_cached_parse_matches_a_full_parse(gamelogs):
+    full = _parse(gamelogs)
+
+    report = RunReport()
+    _assert_same_tables(_parse(gamelogs, use_cache=True, report=report), full)
+    assert _get_parsed_games(report) == len(gamelogs)
+
+    report = RunReport()
+    _assert_same_tables(_parse(gamelogs, use_cache=True, report=report), full)
+    assert _get_parsed_games(report) == 0
+
+
+def test_cached_parse_only_reparses_changed_gamelogs(gamelogs):
+    _parse(gamelogs, use_cache=True)
+
+    # Only the modification time of this gamelog changes.
+    os.utime(gamelogs[1], (0, 0))
+
+    data = load_gamelog(gamelogs[0])
+    data["header"]["venueName"] = "Test Stadium"
+    save_gamelog(data, TEST_GAME_IDS[0])
+
+    report = RunReport()
+    results = _parse(gamelogs, use_cache=True, report=report)
+    assert _get_parsed_games(report) == 1
+    assert results["schedule"]["venue_name"].iloc[0] == "Test Stadium"
+    _assert_same_tables(results, _parse(gamelogs))
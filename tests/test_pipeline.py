@@ -0,0 +1,120 @@
+"""
+File: tests/test_pipeline.py
+Author: Joseph Armstrong
+Purpose: Tests that `run_pipeline()` only reruns stages whose inputs
+    changed, runs independent stages at the same time, and stops
+    at a stage that failed.
+"""
+
+import os
+import time
+
+import pytest
+
+from pipeline import Stage, run_pipeline
+
+
+@pytest.fixture
+def stage_log(work_folder):
+    """
+    Returns a list every `_stage()` adds its name to, when it runs.
+    """
+    return []
+
+
+def _stage(name: str, stage_log: list, delay=0.0, **kwargs):
+    """
+    Returns a `Stage` that copies `{name}.in` to `{name}.out`.
+    """
+
+    def func(report):
+        stage_log.append(name)
+        time.sleep(delay)
+        with open(f"{name}.in") as f, open(f"{name}.out", "w+") as g:
+            g.write(f.read())
+
+    with open(f"{name}.in", "w+") as f:
+        f.write(name)
+    return Stage(
+        name,
+        func,
+        inputs=[f"{name}.in"],
+        outputs=[f"{name}.out"],
+        **kwargs
+    )
+
+
+def _run(stages: list, **kwargs):
+    return run_pipeline(stages, state_file="state.json", **kwargs)
+
+
+def test_unchanged_stages_are_skipped(stage_log):
+    stages = [_stage("a", stage_log)]
+    assert _run(stages) == {"a": "ok"}
+    assert _run(stages) == {"a": "skipped"}
+
+    # The contents are the same, only the modification time changed.
+    os.utime("a.in", (0, 0))
+    assert _run(stages) == {"a": "skipped"}
+    assert stage_log == ["a"]
+
+
+def test_changed_stages_run_again(stage_log):
+    stages = [_stage("a", stage_log), _stage("b", stage_log)]
+    _run(stages)
+
+    with open("a.in", "w+") as f:
+        f.write("changed")
+    os.remove("b.out")
+    assert _run(stages) == {"a": "ok", "b": "ok"}
+    assert _run(stages, force=True) == {"a": "ok", "b": "ok"}
+    assert stage_log.count("a") == 3
+
+
+def test_stages_without_inputs_always_run(stage_log):
+    stages = [Stage("download", lambda report: stage_log.append("run"))]
+    _run(stages)
+    _run(stages)
+    assert stage_log == ["run", "run"]
+
+
+def test_failed_stages_stop_their_dependents(stage_log):
+
+    def fail(report):
+        raise RuntimeError("The API is down.")
+
+    stages = [
+        Stage("download", fail),
+        _stage("parse", stage_log, depends_on=["download"]),
+        _stage("rosters", stage_log),
+    ]
+    with pytest.raises(RuntimeError, match="The API is down."):
+        _run(stages)
+    assert stage_log == ["rosters"]
+
+
+def test_stages_can_not_depend_on_themselves(stage_log):
+    with pytest.raises(ValueError, match="depends on itself"):
+        _run([_stage("a", stage_log, depends_on=["a"])])
+
+
+def test_independent_stages_overlap(stage_log):
+    stages = [
+        _stage("a", stage_log, delay=0.5),
+        _stage("b", stage_log, delay=0.5),
+        _stage("c", stage_log, depends_on=["a", "b"]),
+    ]
+    start_time = time.monotonic()
+    _run(stages)
+    assert time.monotonic() - start_time < 0.9
+    assert stage_log[-1] == "c"
+
+
+def test_cpu_bound_stages_do_not_overlap(stage_log):
+    stages = [
+        _stage("a", stage_log, delay=0.5, cpu_bound=True),
+        _stage("b", stage_log, delay=0.5, cpu_bound=True),
+    ]
+    start_time = time.monotonic()
+    _run(stages)
+    assert time.monotonic() - start_time >= 1.0
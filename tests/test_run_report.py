@@ -0,0 +1,49 @@
+"""
+File: tests/test_run_report.py
+Author: Joseph Armstrong
+Purpose: Tests that `RunReport` records the memory of a stage,
+    even if parts of it are profiled on their own.
+"""
+
+import tracemalloc
+
+import pytest
+
+from run_report import RunReport, profile_memory_usage
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    """
+    `RunReport` leaves `tracemalloc` running,
+    which would slow down every test after this one.
+    """
+    yield
+    tracemalloc.stop()
+
+
+def _allocate(size_mb: int):
+    return len(bytearray(size_mb * 2**20))
+
+
+def test_stage_peak_includes_profiled_calls():
+    report = RunReport(profile_memory=True)
+    with report.stage("parse"):
+        _, big_profile = profile_memory_usage(_allocate, 20)
+        # Resets the peak again, after the big allocation was freed.
+        _, small_profile = profile_memory_usage(_allocate, 1)
+
+    assert big_profile["peak_traced_mb"] >= 19
+    assert small_profile["peak_traced_mb"] < 5
+    assert report.stages[0]["memory"]["peak_traced_mb"] >= 19
+
+
+def test_stage_peak_starts_over_every_stage():
+    report = RunReport(profile_memory=True)
+    with report.stage("big"):
+        profile_memory_usage(_allocate, 20)
+    with report.stage("small"):
+        _allocate(1)
+
+    assert report.stages[0]["memory"]["peak_traced_mb"] >= 19
+    assert report.stages[1]["memory"]["peak_traced_mb"] < 5
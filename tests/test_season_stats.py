@@ -0,0 +1,128 @@
+"""
+File: tests/test_season_stats.py
+Author: Joseph Armstrong
+Purpose: Tests that updating the season and career stats with new,
+    changed, and removed games gives the same stats as a rebuild.
+"""
+
+import glob
+
+import pandas as pd
+import pytest
+
+from generate_season_stats import (
+    CAREER_STATS_FOLDER,
+    SEASON_STATS_FOLDER,
+    SEASON_STATS_KEYS,
+    update_usfl_season_stats,
+)
+from schemas import apply_schema, read_csv_with_schema
+from usfl import (
+    PLAYER_STATS_DATASET,
+    PLAYER_STATS_PARTITIONS,
+    parse_usfl_player_stats,
+)
+from utils import save_partitioned_parquet
+
+
+@pytest.fixture
+def game_stats(gamelogs):
+    """
+    Returns the player game stats of the test gamelogs.
+    """
+    return parse_usfl_player_stats(gamelogs)
+
+
+def _save_game_stats(game_stats_df: pd.DataFrame):
+    save_partitioned_parquet(
+        game_stats_df,
+        PLAYER_STATS_DATASET,
+        PLAYER_STATS_PARTITIONS
+    )
+
+
+def _load_saved_stats():
+    season_df = apply_schema(
+        pd.concat(
+            [
+                read_csv_with_schema(f, "player_season_stats")
+                for f in glob.glob(
+                    f"{SEASON_STATS_FOLDER}/csv/*_player_season_stats.csv"
+                )
+            ],
+            ignore_index=True
+        ),
+        "player_season_stats"
+    )
+    career_df = read_csv_with_schema(
+        f"{CAREER_STATS_FOLDER}/csv/usfl_player_career_stats.csv",
+        "player_career_stats"
+    )
+    return season_df, career_df
+
+
+def _assert_same_as_a_rebuild():
+    """
+    Checks that the saved season and career stats
+    match a rebuild from every saved game.
+    """
+    season_df, career_df = _load_saved_stats()
+    full_season_df, full_career_df = update_usfl_season_stats(
+        rebuild=True,
+        save=False
+    )
+    pd.testing.assert_frame_equal(
+        season_df.sort_values(SEASON_STATS_KEYS, ignore_index=True),
+        full_season_df.sort_values(SEASON_STATS_KEYS, ignore_index=True),
+        check_categorical=False
+    )
+    pd.testing.assert_frame_equal(
+        career_df.reset_index(drop=True),
+        full_career_df.reset_index(drop=True),
+        check_categorical=False
+    )
+
+
+def test_new_games_are_added_to_the_totals(game_stats):
+    first_games = game_stats["game_id"].isin([1, 44])
+    _save_game_stats(game_stats[first_games])
+    update_usfl_season_stats()
+
+    _save_game_stats(game_stats)
+    season_df, _ = update_usfl_season_stats(verify=True)
+    assert sorted(season_df["season"].unique()) == [2022, 2023]
+    _assert_same_as_a_rebuild()
+
+
+def test_changed_games_rebuild_their_season(game_stats):
+    _save_game_stats(game_stats)
+    update_usfl_season_stats()
+
+    game_stats = game_stats.copy()
+    is_changed = game_stats["game_id"] == 2
+    game_stats.loc[is_changed, "RUSH_YDS"] = (
+        game_stats.loc[is_changed, "RUSH_YDS"].fillna(0) + 10
+    )
+    _save_game_stats(game_stats)
+    season_df, _ = update_usfl_season_stats(verify=True)
+    assert list(season_df["season"].unique()) == [2022]
+    _assert_same_as_a_rebuild()
+
+
+def test_removed_games_rebuild_their_season(game_stats):
+    _save_game_stats(game_stats)
+    update_usfl_season_stats()
+
+    _save_game_stats(game_stats[game_stats["game_id"] != 89])
+    season_df, _ = update_usfl_season_stats(verify=True)
+    assert list(season_df["season"].unique()) == [2023]
+    _assert_same_as_a_rebuild()
+
+
+def test_unchanged_games_are_not_added_again(game_stats):
+    _save_game_stats(game_stats)
+    update_usfl_season_stats()
+
+    season_df, _ = update_usfl_season_stats()
+    assert len(season_df) == 0
+    _assert_same_as_a_rebuild()
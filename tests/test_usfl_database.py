@@ -0,0 +1,74 @@
+"""
+File: tests/test_usfl_database.py
+Author: Joseph Armstrong
+Purpose: Tests that updating the USFL database with new, changed,
+    and removed games gives the same tables as a rebuild.
+"""
+
+import sqlite3
+
+import pandas as pd
+
+from conftest import TEST_GAME_IDS
+from gamelog_io import load_gamelog, save_gamelog
+from usfl import parse_usfl_gamelogs
+from usfl_database import DATABASE_TABLES, update_usfl_database
+
+# The tables that are built from the parsed gamelogs.
+GAMELOG_TABLES = [
+    table for table in DATABASE_TABLES
+    if table.name in ["schedule", "player_game_stats", "pbp"]
+]
+
+
+def _read_tables(database_file: str):
+    con = sqlite3.connect(database_file)
+    try:
+        return {
+            table.name: pd.read_sql(
+                f"SELECT * FROM {table.name} " +
+                f"ORDER BY {', '.join(table.keys)}",
+                con
+            )
+            for table in GAMELOG_TABLES
+        }
+    finally:
+        con.close()
+
+
+def _assert_same_as_a_rebuild():
+    update_usfl_database("updated.sqlite")
+    update_usfl_database("rebuilt.sqlite", rebuild=True)
+
+    updated = _read_tables("updated.sqlite")
+    rebuilt = _read_tables("rebuilt.sqlite")
+    for table in GAMELOG_TABLES:
+        pd.testing.assert_frame_equal(
+            updated[table.name],
+            rebuilt[table.name]
+        )
+    return updated
+
+
+def test_updates_match_a_rebuild(gamelogs):
+    parse_usfl_gamelogs(gamelogs[::2])
+    update_usfl_database("updated.sqlite")
+
+    # New games.
+    parse_usfl_gamelogs(gamelogs)
+    tables = _assert_same_as_a_rebuild()
+    assert sorted(tables["schedule"]["game_id"]) == TEST_GAME_IDS
+
+    # A changed game.
+    data = load_gamelog(gamelogs[1])
+    data["header"]["venueName"] = "Test Stadium"
+    save_gamelog(data, TEST_GAME_IDS[1])
+    parse_usfl_gamelogs(gamelogs)
+    tables = _assert_same_as_a_rebuild()
+    assert "Test Stadium" in tables["schedule"]["venue_name"].values
+
+    # A removed game.
+    parse_usfl_gamelogs(gamelogs[:-1])
+    tables = _assert_same_as_a_rebuild()
+    for table in GAMELOG_TABLES:
+        assert TEST_GAME_IDS[-1] not in tables[table.name]["game_id"].values
@@ -4,19 +4,121 @@ Author: Joseph Armstrong
 Purpose: Download data related to the 2022 reboot of the USFL.
 """
 
+import argparse
 import json
+import multiprocessing
 import os
 import ssl
 import time
-from urllib.request import urlopen
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from functools import partial
 
 import pandas as pd
+import requests
 from tqdm import tqdm
 
-from get_usfl_api_key import get_usfl_api_key
+from gamelog_cache import (
+    is_gamelog_unchanged,
+    load_cached_game,
+    load_gamelog_manifest,
+    save_cached_game,
+    save_gamelog_manifest,
+    update_gamelog_manifest,
+)
+from fox_api_client import (
+    FOX_API_URL,
+    get_fox_api_client,
+    submit_in_context,
+)
+from gamelog_io import (
+    find_gamelog,
+    is_gamelog_file,
+    load_gamelog,
+    save_gamelog,
+)
+from generate_season_stats import get_team_season_stats
+from metrics import GAME_METRICS, compute_metrics
+from run_report import RunReport, profile_memory_usage
+from schemas import PBP_SCHEMA, apply_schema
+from utils import TokenBucket, save_partitioned_parquet
 
 ssl._create_default_https_context = ssl._create_unverified_context
 
+# Every boxscore table `parse_usfl_player_stats()` knows how to parse.
+PLAYER_STAT_TABLES = [
+    "PASSING",
+    "RUSHING",
+    "RECEIVING",
+    "DEFENSIVE",
+    "FUMBLES",
+    "KICK RETURN",
+    "PUNT RETURN",
+    "KICKING",
+    "PUNTING",
+]
+
+# The top-level gamelog sections each per-game parser reads.
+PARSER_SECTIONS = {
+    "schedule": ["header", "metadata"],
+    "player_stats": ["header", "boxscore"],
+    "pbp": ["header", "pbp"],
+}
+
+# The titles of plays that are not ran from a down,
+# which get a `down` and `distance` of 0.
+PBP_PLAYS_WITHOUT_DOWN = ["END QUARTER", "KICKOFF", "PAT"]
+
+# Every player game stats row is keyed on these columns.
+PLAYER_GAME_KEYS = ["game_id", "player_id"]
+
+# The columns that describe a player in a game,
+# and come before the stats in the player game stats.
+PLAYER_GAME_COLUMNS = [
+    "season",
+    "game_id",
+    "game_date",
+    "team",
+    "team_nickname",
+    "loc",
+    "opponent",
+    "opponent_nickname",
+    "analytics_id",
+    "player_id",
+    "player_image",
+    "player_name",
+]
+
+# Every team game stats row is keyed on these columns.
+TEAM_GAME_KEYS = ["game_id", "team"]
+
+# The columns that describe a team in a game.
+TEAM_GAME_COLUMNS = [
+    "season",
+    "game_id",
+    "game_date",
+    "team",
+    "team_nickname",
+    "loc",
+    "opponent",
+    "opponent_nickname",
+]
+
+TEAM_GAME_STATS_FOLDER = "team_stats/game_stats"
+TEAM_SEASON_STATS_FOLDER = "team_stats/season_stats"
+
+# Where the Parquet copies of the game stats and play-by-play are saved,
+# and the columns they are partitioned by. See `save_partitioned_parquet()`.
+PLAYER_STATS_DATASET = "player_stats/game_stats/parquet"
+PLAYER_STATS_PARTITIONS = ["season", "game_id"]
+PBP_DATASET = "pbp/parquet"
+PBP_PARTITIONS = ["season", "game_id"]
+TEAM_STATS_DATASET = "team_stats/game_stats/parquet"
+TEAM_STATS_PARTITIONS = ["season"]
+
 
 def reformatFolderString(folder: str):
     """
@@ -41,6 +143,7 @@ def reformatFolderString(folder: str):
 def get_json_in_folder(folder: str):
     """
     Retrieves a list of JSON files in a given directory.
+    Compressed (`.json.gz` and `.json.zst`) gamelogs are included.
     Be warned, this may not work recursively.
 
     Args:
@@ -56,7 +159,7 @@ def get_json_in_folder(folder: str):
     json_list = []
     dir_list = os.listdir(abs_path)
     # print(dir_list)
-    file_list = list(filter(lambda x: ".json" in x, dir_list))
+    file_list = list(filter(is_gamelog_file, dir_list))
     # print(l)
     for i in file_list:
         json_list.append(abs_path + "/" + i)
@@ -67,7 +170,217 @@ def get_json_in_folder(folder: str):
     return json_list
 
 
-def get_usfl_game(gameID: int, apiKey: str, save=True):
+def _get_process_context():
+    """
+    Returns the multiprocessing context the gamelog parsers start their
+    workers with. `parse_usfl_gamelogs()` can run in a thread, next to
+    threads that are sending requests and printing (see `pipeline.py`).
+    Forking a process like that can deadlock a worker on a lock another
+    thread held at the time, so workers are started by a forkserver
+    instead, or spawned where there is none (like on Windows).
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def parse_usfl_gamelogs(
+    game_json_list: list,
+    schedule=True,
+    player_stats=True,
+    pbp=True,
+    save=True,
+    workers=1,
+    use_cache=False,
+    report=None
+):
+    """
+    Parses the schedule, player stats, and/or play-by-play data
+    from a list of USFL gamelogs, while only opening and decoding
+    each gamelog once.
+
+    Args:
+        game_json_list (list):
+            Required parameter. A list of gamelog JSON files,
+            as returned by `get_json_in_folder()`.
+
+        schedule (bool):
+            Optional parameter. If True, parses the schedule,
+            like `get_usfl_schedule()`.
+
+        player_stats (bool):
+            Optional parameter. If True, parses player game stats,
+            like `parse_usfl_player_stats()`.
+
+        pbp (bool):
+            Optional parameter. If True, parses play-by-play data,
+            like `parse_usfl_pbp()`.
+
+        save (bool):
+            Optional parameter. If True, saves the results
+            of every parser that was ran.
+
+        workers (int):
+            Optional parameter. The number of processes used to parse
+            gamelogs. If this is greater than 1, every game is parsed
+            in a `ProcessPoolExecutor`. The results are identical
+            to parsing every game in this process.
+
+        use_cache (bool):
+            Optional parameter. If True, only gamelogs that are new,
+            or have changed since the last run, are parsed.
+            Every other game is loaded from the per-game cache
+            in `gamelog_cache.CACHE_FOLDER`.
+
+        report (RunReport):
+            Optional parameter. If set, parsing the gamelogs, and
+            building every dataset, are recorded as separate stages
+            of this report. If this report profiles memory, the memory
+            used to parse every game is recorded too.
+
+    Returns:
+        results (dict):
+            A dictionary with a `schedule`, `player_stats` and/or `pbp`
+            DataFrame, for every parser that was ran.
+
+    Example:
+        parse_usfl_gamelogs(get_json_in_folder("Gamelogs"), pbp=False)
+    """
+    results = {}
+    if report is None:
+        report = RunReport()
+
+    with report.stage("parse_gamelogs") as stage:
+        if use_cache is True:
+            # Cached games hold the rows of every parser,
+            # so one cache can serve any subset of parsers.
+            parse_game = _parse_usfl_gamelog
+            manifest = load_gamelog_manifest()
+            game_dict = {}
+
+            for i in game_json_list:
+                if is_gamelog_unchanged(i, manifest):
+                    game_dict[i] = load_cached_game(i)
+
+            parse_list = [
+                i for i in game_json_list if game_dict.get(i) is None
+            ]
+            print(
+                f"{len(parse_list)} of {len(game_json_list)} " +
+                "gamelogs are new or have changed."
+            )
+        else:
+            parse_game = partial(
+                _parse_usfl_gamelog,
+                schedule=schedule,
+                player_stats=player_stats,
+                pbp=pbp
+            )
+            parse_list = game_json_list
+
+        if report.profile_memory is True:
+            # Every game is profiled in the process that parses it.
+            parse_game = partial(profile_memory_usage, parse_game)
+
+        if workers > 1 and len(parse_list) > 1:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=_get_process_context()
+            ) as executor:
+                # `map()` returns results in the order of `parse_list`,
+                # no matter which worker finishes first.
+                game_list = list(
+                    tqdm(
+                        executor.map(parse_game, parse_list),
+                        total=len(parse_list)
+                    )
+                )
+        else:
+            game_list = [parse_game(i) for i in tqdm(parse_list)]
+
+        if report.profile_memory is True:
+            for i, (_, game_profile) in zip(parse_list, game_list):
+                report.games.append({
+                    "game_file": os.path.basename(i),
+                    "bytes": os.path.getsize(i),
+                    **game_profile,
+                })
+            game_list = [game for game, _ in game_list]
+
+        if use_cache is True:
+            for i, game in zip(parse_list, game_list):
+                save_cached_game(i, game)
+                update_gamelog_manifest(i, manifest)
+                game_dict[i] = game
+
+            save_gamelog_manifest(manifest)
+            game_list = [game_dict[i] for i in game_json_list]
+
+        stage["games"] = len(game_json_list)
+        stage["parsed_games"] = len(parse_list)
+        stage["bytes"] = sum(os.path.getsize(i) for i in parse_list)
+
+    builders = [
+        ("schedule", schedule, _build_usfl_schedule),
+        ("player_stats", player_stats, _build_usfl_player_stats),
+        ("pbp", pbp, _build_usfl_pbp),
+    ]
+    for parser, is_requested, build_func in builders:
+        if is_requested is True:
+            with report.stage(parser) as stage:
+                results[parser] = build_func(
+                    [game[parser] for game in game_list], save
+                )
+                stage["games"] = len(game_list)
+                stage["rows"] = len(results[parser])
+
+    return results
+
+
+def _parse_usfl_gamelog(
+    game_file: str,
+    schedule=True,
+    player_stats=True,
+    pbp=True
+):
+    """
+    Opens and decodes a single USFL gamelog, and runs the requested
+    per-game parsers on it. This has to be a top-level function,
+    so it can be sent to a `ProcessPoolExecutor`.
+
+    Returns:
+        game (dict):
+            The per-game `schedule`, `player_stats` and/or `pbp` rows
+            for every parser that was ran.
+    """
+    parsers = [
+        parser for parser, is_requested in [
+            ("schedule", schedule),
+            ("player_stats", player_stats),
+            ("pbp", pbp),
+        ] if is_requested is True
+    ]
+    sections = []
+    for parser in parsers:
+        sections += [
+            s for s in PARSER_SECTIONS[parser] if s not in sections
+        ]
+
+    # Only the sections these parsers need are decoded.
+    data = load_gamelog(game_file, sections)
+    game = {}
+
+    if schedule is True:
+        game["schedule"] = _get_usfl_game_schedule(data)
+    if player_stats is True:
+        game["player_stats"] = _get_usfl_game_player_stats(data, game_file)
+    if pbp is True:
+        game["pbp"] = _get_usfl_game_pbp(data)
+
+    return game
+
+
+def get_usfl_game(gameID: int, apiKey: str, save=True, compression=None):
     """
     Retrieves game data for a USFL game, given a proper
     USFL game ID.
@@ -82,26 +395,167 @@ def get_usfl_game(gameID: int, apiKey: str, save=True):
             you have from the USFL. Otherwise, this function will
             not work.
 
+        save (bool):
+            Optional parameter. If True, the game is saved into `Gamelogs/`.
+
+        compression (str):
+            Optional parameter. If set to `"gzip"` or `"zstd"`,
+            the game is saved minified and compressed.
+            See `gamelog_io.save_gamelog()`.
+
     Example:
         get_usfl_game(1,"api-key-placeholder",False)
     """
-    url = (
-        "https://api.foxsports.com/bifrost/v1/usfl/event/" +
-        f"{gameID}/data?apikey={apiKey}"
+    game_file = find_gamelog(gameID)
+    json_data, is_modified = get_fox_api_client().get_json(
+        f"{FOX_API_URL}/event/{gameID}/data",
+        params={"apikey": apiKey},
+        cache_body=False,
+        conditional=game_file is not None,
+        store_validators=save
     )
-    response = urlopen(url)
-    json_data = json.loads(response.read())
     time.sleep(1)
-    if save is True:
-        with open(f"Gamelogs/{gameID}.json", "w+") as f:
-            f.write(json.dumps(json_data, indent=2))
+
+    if is_modified is False:
+        # This game has not changed since it was last saved.
+        return load_gamelog(game_file)
+    elif save is True:
+        save_gamelog(json_data, gameID, "Gamelogs", compression)
 
     return json_data
 
 
+def get_usfl_games(
+    game_ids: list,
+    apiKey: str,
+    save=True,
+    max_workers=4,
+    requests_per_second=2.0,
+    max_retries=3,
+    base_url=FOX_API_URL,
+    compression=None,
+):
+    """
+    Retrieves game data for multiple USFL games at once.
+
+    Games are downloaded by a pool of threads, while a token bucket
+    limits how many requests are sent every second. Every game is saved
+    as soon as it has been downloaded.
+
+    Args:
+        game_ids (list):
+            Required parameter. A list (or range) of the USFL game IDs
+            you want to download.
+
+        apiKey (str):
+            Required parameter. You must pass a proper API Key
+            you have from the USFL. Otherwise, this function will
+            not work.
+
+        save (bool):
+            Optional parameter. If True, every game is saved
+            into `Gamelogs/` as soon as it has been downloaded.
+
+        max_workers (int):
+            Optional parameter. The maximum number of requests
+            that can be in flight at the same time.
+
+        requests_per_second (float):
+            Optional parameter. The maximum number of requests
+            sent every second.
+
+        max_retries (int):
+            Optional parameter. How many times a request that failed
+            because of a timeout, a connection error,
+            a 429 or a 5xx response is retried, with exponential backoff.
+
+        base_url (str):
+            Optional parameter. The base URL of the API.
+            Can be pointed to a local server for testing.
+
+        compression (str):
+            Optional parameter. If set to `"gzip"` or `"zstd"`,
+            every game is saved minified and compressed.
+            See `gamelog_io.save_gamelog()`.
+
+    Returns:
+        downloaded_ids (list):
+            The game IDs that were downloaded (or were unchanged
+            since they were last saved), in the order they were passed in.
+
+    Example:
+        get_usfl_games(range(1, 101), "api-key-placeholder")
+    """
+    client = get_fox_api_client()
+    rate_limiter = TokenBucket(requests_per_second)
+    game_ids = list(game_ids)
+    downloaded_ids = set()
+
+    def download_game(gameID: int):
+        url = f"{base_url}/event/{gameID}/data"
+        game_file = find_gamelog(gameID)
+
+        for attempt in range(max_retries + 1):
+            rate_limiter.acquire()
+            try:
+                json_data, is_modified = client.get_json(
+                    url,
+                    params={"apikey": apiKey},
+                    cache_body=False,
+                    conditional=save and game_file is not None,
+                    store_validators=save
+                )
+                break
+            except requests.HTTPError as e:
+                status_code = e.response.status_code
+                if status_code != 429 and status_code < 500:
+                    raise
+                elif attempt == max_retries:
+                    raise
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == max_retries:
+                    raise
+            time.sleep(2 ** attempt)
+
+        # A game that has not changed since it was last saved
+        # does not need to be saved again.
+        if save is True and is_modified is True:
+            save_gamelog(json_data, gameID, "Gamelogs", compression)
+        return gameID
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            submit_in_context(executor, download_game, gameID): gameID
+            for gameID in game_ids
+        }
+
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            gameID = futures[future]
+            try:
+                future.result()
+                downloaded_ids.add(gameID)
+            except requests.HTTPError as e:
+                # The error message includes the URL, and the API key.
+                print(
+                    f"\nCould not download game #{gameID}: " +
+                    f"HTTP {e.response.status_code} {e.response.reason}."
+                )
+            except requests.RequestException as e:
+                print(
+                    f"\nCould not download game #{gameID}: " +
+                    f"{type(e).__name__}."
+                )
+            except Exception as e:
+                print(f"\nCould not download game #{gameID}: {e}")
+
+    return [gameID for gameID in game_ids if gameID in downloaded_ids]
+
+
 def get_usfl_rosters(season: int, apiKey: str, week=0, save=True):
     rosters_df = pd.DataFrame()
     row_df = pd.DataFrame()
+    client = get_fox_api_client()
+    is_modified = False
 
     teams_df = pd.read_csv("teams/usfl_teams.csv")
 
@@ -116,14 +570,12 @@ def get_usfl_rosters(season: int, apiKey: str, week=0, save=True):
         team_name = team_name_arr[i]
 
         print(f"\nGetting the {season} {team_name} roster.")
-        url = (
-            "https://api.foxsports.com/bifrost/v1/usfl/team/" +
-            f"{team_id}/roster?apikey={apiKey}"
+        json_data, team_is_modified = client.get_json(
+            f"{FOX_API_URL}/team/{team_id}/roster",
+            params={"apikey": apiKey}
         )
-
-        response = urlopen(url)
+        is_modified = is_modified or team_is_modified
         time.sleep(1)
-        json_data = json.loads(response.read())
 
         for i in json_data["groups"]:
             if len(i["rows"]) > 1:
@@ -170,9 +622,16 @@ def get_usfl_rosters(season: int, apiKey: str, week=0, save=True):
                         ignore_index=True
                     )
 
-    if save is True:
+    rosters_df = apply_schema(rosters_df, "rosters")
+
+    season_file = f"rosters/season/csv/{season}_usfl_rosters.csv"
+    week_file = f"rosters/weekly/csv/{season}_{week}_usfl_rosters.csv"
+
+    # If no roster has changed since the last run,
+    # there is nothing new to save.
+    if save is True and (is_modified or not os.path.exists(season_file)):
         rosters_df.to_csv(
-            f"rosters/season/csv/{season}_usfl_rosters.csv",
+            season_file,
             index=False
         )
         rosters_df.to_parquet(
@@ -180,118 +639,142 @@ def get_usfl_rosters(season: int, apiKey: str, week=0, save=True):
             index=False
         )
 
-        if week > 0:
-            rosters_df.to_csv(
-                f"rosters/weekly/csv/{season}_{week}_usfl_rosters.csv",
-                index=False
-            )
-            rosters_df.to_parquet(
-                f"rosters/weekly/parquet/{season}_{week}_usfl_rosters.parquet",
-                index=False,
-            )
+    if (
+        save is True and week > 0 and
+        (is_modified or not os.path.exists(week_file))
+    ):
+        rosters_df.to_csv(
+            week_file,
+            index=False
+        )
+        rosters_df.to_parquet(
+            f"rosters/weekly/parquet/{season}_{week}_usfl_rosters.parquet",
+            index=False,
+        )
     return rosters_df
 
 
-def get_usfl_schedule(game_json_list: list, save=True):
-    main_df = pd.DataFrame()
-    for i in tqdm(game_json_list):
-        with open(i, "r", encoding="utf8") as j:
-            data = json.load(j)
-        # print(f'data: \n {data}')
-        # print(data['header']['id'],data['header']['socialStartTime'])
-        game_id = data["header"]["id"]
-        game_date = data["header"]["eventTime"]
-        game_df = pd.DataFrame(columns=["game_id"], data=[game_id])
-        game_df["season"] = game_date[:4]
-        game_df["analytics_description"] = data[
-            "header"
-        ]["analyticsDescription"]
-        game_df["event_status"] = data["header"]["eventStatus"]
-
-        game_df["is_tba"] = data["header"]["isTba"]
-        game_df["game_start"] = data["header"]["socialStartTime"]
-        game_df["game_end"] = data["header"]["socialStopTime"]
-
-        try:
-            game_df["status_line"] = data["header"]["statusLine"]
-        except Exception:
-            game_df["status_line"] = None
-
-        game_df["venue_name"] = data["header"]["venueName"]
-        game_df["venue_location"] = data["header"]["venueLocation"]
-        game_df["share_text"] = data["header"]["shareText"]
-        game_df["importance"] = data["header"]["importance"]
-
-        # data['header']['leftTeam'] == Away Team
-        game_df["away_team_abv"] = data["header"]["leftTeam"]["name"]
-        game_df["away_team_nickname"] = data["header"]["leftTeam"]["longName"]
-        game_df["away_team_full_name"] = data[
-            "header"
-        ]["leftTeam"]["alternateName"]
-        game_df["away_team_record"] = data["header"]["leftTeam"]["record"]
-
-        try:
-            game_df["away_team_score"] = data["header"]["leftTeam"]["score"]
-        except Exception:
-            game_df["away_team_score"] = None
-
-        game_df["away_team_is_loser"] = data["header"]["leftTeam"]["isLoser"]
-        game_df["away_team_has_possession"] = data["header"]["leftTeam"][
-            "hasPossession"
-        ]
+def get_usfl_schedule(game_json_list: list, save=True, workers=1):
+    return parse_usfl_gamelogs(
+        game_json_list,
+        player_stats=False,
+        pbp=False,
+        save=save,
+        workers=workers
+    )["schedule"]
+
+
+def _get_usfl_game_schedule(data: dict):
+    """
+    Parses the schedule row of a single, already decoded, USFL gamelog.
+
+    Args:
+        data (dict):
+            Required parameter. A decoded gamelog,
+            as returned by `load_gamelog()`.
+
+    Returns:
+        game_row (dict):
+            This game's row in the schedule, as a `dict`
+            of column name to value.
+    """
+    # print(f'data: \n {data}')
+    # print(data['header']['id'],data['header']['socialStartTime'])
+    game_id = data["header"]["id"]
+    game_date = data["header"]["eventTime"]
+    game_row = {"game_id": game_id}
+    game_row["season"] = game_date[:4]
+    game_row["analytics_description"] = data[
+        "header"
+    ]["analyticsDescription"]
+    game_row["event_status"] = data["header"]["eventStatus"]
+
+    game_row["is_tba"] = data["header"]["isTba"]
+    game_row["game_start"] = data["header"]["socialStartTime"]
+    game_row["game_end"] = data["header"]["socialStopTime"]
+
+    try:
+        game_row["status_line"] = data["header"]["statusLine"]
+    except Exception:
+        game_row["status_line"] = None
+
+    game_row["venue_name"] = data["header"]["venueName"]
+    game_row["venue_location"] = data["header"]["venueLocation"]
+    game_row["share_text"] = data["header"]["shareText"]
+    game_row["importance"] = data["header"]["importance"]
+
+    # data['header']['leftTeam'] == Away Team
+    game_row["away_team_abv"] = data["header"]["leftTeam"]["name"]
+    game_row["away_team_nickname"] = data["header"]["leftTeam"]["longName"]
+    game_row["away_team_full_name"] = data[
+        "header"
+    ]["leftTeam"]["alternateName"]
+    game_row["away_team_record"] = data["header"]["leftTeam"]["record"]
+
+    try:
+        game_row["away_team_score"] = data["header"]["leftTeam"]["score"]
+    except Exception:
+        game_row["away_team_score"] = None
+
+    game_row["away_team_is_loser"] = data["header"]["leftTeam"]["isLoser"]
+    game_row["away_team_has_possession"] = data["header"]["leftTeam"][
+        "hasPossession"
+    ]
+
+    # data['header']['rightTeam'] == Home Team
+    game_row["home_team_abv"] = data["header"]["rightTeam"]["name"]
+    game_row["home_team_nickname"] = data["header"]["rightTeam"]["longName"]
+    game_row["home_team_full_name"] = data[
+        "header"
+    ]["rightTeam"]["alternateName"]
+    game_row["home_team_record"] = data["header"]["rightTeam"]["record"]
+    try:
+        game_row["home_team_score"] = data["header"]["rightTeam"]["score"]
+    except Exception:
+        game_row["home_team_score"] = None
+
+    game_row["home_team_is_loser"] = data["header"]["rightTeam"]["isLoser"]
+    game_row["home_team_has_possession"] = data["header"]["rightTeam"][
+        "hasPossession"
+    ]
 
-        # data['header']['rightTeam'] == Home Team
-        game_df["home_team_abv"] = data["header"]["rightTeam"]["name"]
-        game_df["home_team_nickname"] = data["header"]["rightTeam"]["longName"]
-        game_df["home_team_full_name"] = data[
-            "header"
-        ]["rightTeam"]["alternateName"]
-        game_df["home_team_record"] = data["header"]["rightTeam"]["record"]
-        try:
-            game_df["home_team_score"] = data["header"]["rightTeam"]["score"]
-        except Exception:
-            game_df["home_team_score"] = None
-
-        game_df["home_team_is_loser"] = data["header"]["rightTeam"]["isLoser"]
-        game_df["home_team_has_possession"] = data["header"]["rightTeam"][
-            "hasPossession"
+    try:
+        game_row["additional_title"] = data["metadata"]["parameters"][
+            "additionalTitle"
         ]
+    except Exception:
+        pass
 
-        try:
-            game_df["additional_title"] = data["metadata"]["parameters"][
-                "additionalTitle"
-            ]
-        except Exception:
-            pass
-
-        try:
-            game_df["event_title"] = data[
-                "metadata"
-            ]["parameters"]["eventTitle"]
-        except Exception:
-            pass
-        main_df = pd.concat([game_df, main_df], ignore_index=True)
-
-    main_df = main_df.astype({"game_id": int, "season": int})
-    main_df = main_df.infer_objects()
+    try:
+        game_row["event_title"] = data[
+            "metadata"
+        ]["parameters"]["eventTitle"]
+    except Exception:
+        pass
+    return game_row
+
+
+def _build_usfl_schedule(game_list: list, save=True):
+    """
+    Combines the per-game schedule rows from `_get_usfl_game_schedule()`
+    into a single schedule, and saves it.
+    """
+    # Newer games were historically stacked on top of older games,
+    # which decides the column order when a field is missing
+    # from some of the gamelogs.
+    main_df = pd.DataFrame(game_list[::-1])
+
+    main_df = apply_schema(main_df, "schedule")
     main_df = main_df.sort_values("game_id")
     # print(main_df.dtypes)
     # print(main_df)
-    maxSeason = int(main_df["season"].max())
-    minSeason = int(main_df["season"].min())
-
     print()
-    for i in range(minSeason, maxSeason + 1):
-        main_df.to_csv(f"schedules/{i}_schedule.csv", index=False)
-
-    # if save is True:
-    #     maxSeason = main_df["season"].max()
-    #     minSeason = main_df["season"].min()
+    if save is True:
+        maxSeason = int(main_df["season"].max())
+        minSeason = int(main_df["season"].min())
 
-    #     for i in range(maxSeason, minSeason + 1):
-    #         main_df.to_csv(f"schedules/{i}_schedule.csv", index=False)
-    # else:
-    #     pass
+        for i in range(minSeason, maxSeason + 1):
+            main_df.to_csv(f"schedules/{i}_schedule.csv", index=False)
 
     return main_df
 
@@ -300,12 +783,20 @@ def get_usfl_standings(season: int, apiKey: str, save=True):
 
     main_df = pd.DataFrame()
     row_df = pd.DataFrame()
-    url = (
-        "https://api.foxsports.com/bifrost/v1/usfl/league/standings?" +
-        f"season={season}&apikey={apiKey}"
+    standings_file = f"standings/json/{season}_usfl_standings.json"
+    json_data, is_modified = get_fox_api_client().get_json(
+        f"{FOX_API_URL}/league/standings",
+        params={"season": season, "apikey": apiKey},
+        cache_body=False,
+        conditional=os.path.exists(standings_file),
+        store_validators=save
     )
-    response = urlopen(url)
-    json_data = json.loads(response.read())
+
+    if is_modified is False:
+        # The standings have not changed since they were last saved.
+        with open(standings_file, "r", encoding="utf8") as f:
+            json_data = json.load(f)
+        save = False
 
     for i in json_data["standingsSections"][0]["standings"]:
         # print(i['template'])
@@ -430,6 +921,8 @@ def get_usfl_standings(season: int, apiKey: str, save=True):
 
             main_df = pd.concat([main_df, row_df], ignore_index=True)
 
+    main_df = apply_schema(main_df, "standings")
+
     if save is True:
         # raise NotImplementedError('help')
         main_df.to_csv(
@@ -437,155 +930,170 @@ def get_usfl_standings(season: int, apiKey: str, save=True):
             index=False
         )
         # main_df.to_parquet(f'standings/parquet/{season}_usfl_standings.parquet',index=False)
-        with open(f"standings/json/{season}_usfl_standings.json", "w+") as f:
+        with open(standings_file, "w+") as f:
             f.write(json.dumps(json_data, indent=2))
 
     return main_df
 
 
-def parse_usfl_player_stats(game_json_list: list, saveResults=False):
-    main_df = pd.DataFrame()
-    # game_df = pd.DataFrame()
-    s_df = pd.DataFrame()
-
-    passing_df = pd.DataFrame()
-    rush_df = pd.DataFrame()
-    receiving_df = pd.DataFrame()
-    defensive_df = pd.DataFrame()
-    fumbles_df = pd.DataFrame()
-    kick_return_df = pd.DataFrame()
-    punt_return_df = pd.DataFrame()
-    kicking_df = pd.DataFrame()
-    punting_df = pd.DataFrame()
+def parse_usfl_player_stats(
+    game_json_list: list,
+    saveResults=False,
+    workers=1
+):
+    return parse_usfl_gamelogs(
+        game_json_list,
+        schedule=False,
+        pbp=False,
+        save=saveResults,
+        workers=workers
+    )["player_stats"]
 
+
+def _get_usfl_game_player_stats(data: dict, game_file=""):
+    """
+    Parses the boxscore of a single, already decoded, USFL gamelog.
+
+    Args:
+        data (dict):
+            Required parameter. A decoded gamelog,
+            as returned by `load_gamelog()`.
+
+        game_file (str):
+            Optional parameter. The file this gamelog was loaded from.
+            Only used to report games that cannot be parsed.
+
+    Returns:
+        stats_dict (dict):
+            Every boxscore row in this game, as a `dict` of
+            column name to value, grouped by their boxscore table
+            (`PASSING`, `RUSHING`, etc.).
+    """
+    stats_dict = {}
     index_0 = ""
-    # game_df = pd.DataFrame()
-
-    for i in tqdm(game_json_list):
-        # game_df = pd.DataFrame()
-        with open(i, "r", encoding="utf8") as j:
-            data = json.load(j)
-        game_id = data["header"]["id"]
-        game_date = data["header"]["eventTime"]
-        game_date = game_date[:10]
-        season = game_date[:4]
-
-        away_team_id = data["header"]["leftTeam"]["name"]
-        away_team_nickname = data["header"]["leftTeam"]["longName"]
-
-        home_team_id = data["header"]["rightTeam"]["name"]
-        home_team_nickname = data["header"]["rightTeam"]["longName"]
-        try:
-            for j in data["boxscore"]["boxscoreSections"]:
-                team_title = j["title"]
-                if j["title"] != "MATCHUP":
-                    for k in j["boxscoreItems"]:
-                        column_list = []
-                        for header in k["boxscoreTable"]["headers"]:
-                            for m in header["columns"]:
-                                if m["index"] == 0:
-                                    index_0 = m["text"]
-                                    # print(index_0)
-                                    column_list.append("player_name")
-                                else:
-                                    column_list.append(m["text"])
-                        # print(column_list)
-                        for header in k["boxscoreTable"]["rows"]:
-                            stat_column = []
-
-                            for m in header["columns"]:
-                                stat_column.append(m["text"])
-
-                            s_df = pd.DataFrame(
-                                columns=column_list,
-                                data=[stat_column]
-                            )
-                            s_df["season"] = season
-                            s_df["game_id"] = game_id
-                            s_df["game_date"] = game_date
-
-                            if team_title == away_team_nickname:
-                                s_df["team"] = away_team_id
-                                s_df["team_nickname"] = team_title
-                                s_df["loc"] = "A"
-                                s_df["opponent"] = home_team_id
-                                s_df["opponent_nickname"] = home_team_nickname
-                            elif team_title == home_team_nickname:
-                                s_df["team"] = home_team_id
-                                s_df["team_nickname"] = team_title
-                                s_df["loc"] = "H"
-                                s_df["opponent"] = away_team_id
-                                s_df["opponent_nickname"] = away_team_nickname
-                            else:
-                                pass
-
-                            try:
-                                s_df["analytics_id"] = header[
-                                    "entityLink"
-                                ]["analyticsName"]
-                            except Exception:
-                                pass
-                            try:
-                                s_df["player_name"] = str(
-                                    header["entityLink"]["title"]
-                                ).title()
-                            except Exception:
-                                pass
-                            try:
-                                s_df["player_id"] = header[
-                                    "entityLink"
-                                ]["layout"]["tokens"]["id"]
-                            except Exception:
-                                pass
-                            try:
-                                s_df["player_image"] = header[
-                                    "entityLink"
-                                ]["imageUrl"]
-                            except Exception:
-                                pass
-
-                            if index_0 == "PASSING":
-                                passing_df = pd.concat(
-                                    [passing_df, s_df], ignore_index=True
-                                )
-
-                            elif index_0 == "RUSHING":
-                                rush_df = pd.concat(
-                                    [rush_df, s_df],
-                                    ignore_index=True
-                                )
-                            elif index_0 == "RECEIVING":
-                                receiving_df = pd.concat(
-                                    [receiving_df, s_df], ignore_index=True
-                                )
-                            elif index_0 == "DEFENSIVE":
-                                defensive_df = pd.concat(
-                                    [defensive_df, s_df], ignore_index=True
-                                )
-                            elif index_0 == "FUMBLES":
-                                fumbles_df = pd.concat(
-                                    [fumbles_df, s_df], ignore_index=True
-                                )
-                            elif index_0 == "KICK RETURN":
-                                kick_return_df = pd.concat(
-                                    [kick_return_df, s_df], ignore_index=True
-                                )
-                            elif index_0 == "PUNT RETURN":
-                                punt_return_df = pd.concat(
-                                    [punt_return_df, s_df], ignore_index=True
-                                )
-                            elif index_0 == "KICKING":
-                                kicking_df = pd.concat(
-                                    [kicking_df, s_df], ignore_index=True
-                                )
-                            elif index_0 == "PUNTING":
-                                punting_df = pd.concat(
-                                    [punting_df, s_df], ignore_index=True
-                                )
+
+    game_id = data["header"]["id"]
+    game_date = data["header"]["eventTime"]
+    game_date = game_date[:10]
+    season = game_date[:4]
+
+    away_team_id = data["header"]["leftTeam"]["name"]
+    away_team_nickname = data["header"]["leftTeam"]["longName"]
+
+    home_team_id = data["header"]["rightTeam"]["name"]
+    home_team_nickname = data["header"]["rightTeam"]["longName"]
+    try:
+        for j in data["boxscore"]["boxscoreSections"]:
+            team_title = j["title"]
+            if j["title"] != "MATCHUP":
+                for k in j["boxscoreItems"]:
+                    column_list = []
+                    for header in k["boxscoreTable"]["headers"]:
+                        for m in header["columns"]:
+                            if m["index"] == 0:
+                                index_0 = m["text"]
+                                # print(index_0)
+                                column_list.append("player_name")
                             else:
-                                print(f"Need DF for {index_0}")
-        except Exception:
-            print(f"Cannot parse player game stats from {i}.")
+                                column_list.append(m["text"])
+                    # print(column_list)
+                    for header in k["boxscoreTable"]["rows"]:
+                        stat_column = []
+
+                        for m in header["columns"]:
+                            stat_column.append(m["text"])
+
+                        if len(stat_column) != len(column_list):
+                            raise ValueError(
+                                f"{len(column_list)} columns passed, " +
+                                f"passed data had {len(stat_column)} columns"
+                            )
+                        s_row = dict(zip(column_list, stat_column))
+                        s_row["season"] = season
+                        s_row["game_id"] = game_id
+                        s_row["game_date"] = game_date
+
+                        # Boxscore sections are titled with the team's
+                        # nickname in upper case, like "GENERALS".
+                        if team_title.upper() == away_team_nickname.upper():
+                            s_row["team"] = away_team_id
+                            s_row["team_nickname"] = team_title
+                            s_row["loc"] = "A"
+                            s_row["opponent"] = home_team_id
+                            s_row["opponent_nickname"] = (
+                                home_team_nickname.upper()
+                            )
+                        elif (
+                            team_title.upper() == home_team_nickname.upper()
+                        ):
+                            s_row["team"] = home_team_id
+                            s_row["team_nickname"] = team_title
+                            s_row["loc"] = "H"
+                            s_row["opponent"] = away_team_id
+                            s_row["opponent_nickname"] = (
+                                away_team_nickname.upper()
+                            )
+                        else:
+                            pass
+
+                        try:
+                            s_row["analytics_id"] = header[
+                                "entityLink"
+                            ]["analyticsName"]
+                        except Exception:
+                            pass
+                        try:
+                            s_row["player_name"] = str(
+                                header["entityLink"]["title"]
+                            ).title()
+                        except Exception:
+                            pass
+                        try:
+                            s_row["player_id"] = header[
+                                "entityLink"
+                            ]["layout"]["tokens"]["id"]
+                        except Exception:
+                            pass
+                        try:
+                            s_row["player_image"] = header[
+                                "entityLink"
+                            ]["imageUrl"]
+                        except Exception:
+                            pass
+
+                        if index_0 in PLAYER_STAT_TABLES:
+                            stats_dict.setdefault(index_0, []).append(
+                                s_row
+                            )
+                        else:
+                            print(f"Need DF for {index_0}")
+    except Exception:
+        print(f"Cannot parse player game stats from {game_file}.")
+
+    return stats_dict
+
+
+def _build_usfl_player_stats(game_list: list, saveResults=False):
+    """
+    Combines the per-game boxscore rows from
+    `_get_usfl_game_player_stats()` into player game stats, and saves them.
+    """
+    # Rows are collected into plain lists, and each boxscore table
+    # is turned into a DataFrame exactly once.
+    stats_dict = {}
+    for game in game_list:
+        for table, rows in game.items():
+            stats_dict.setdefault(table, []).extend(rows)
+
+    passing_df = pd.DataFrame(stats_dict.get("PASSING", []))
+    rush_df = pd.DataFrame(stats_dict.get("RUSHING", []))
+    receiving_df = pd.DataFrame(stats_dict.get("RECEIVING", []))
+    defensive_df = pd.DataFrame(stats_dict.get("DEFENSIVE", []))
+    fumbles_df = pd.DataFrame(stats_dict.get("FUMBLES", []))
+    kick_return_df = pd.DataFrame(stats_dict.get("KICK RETURN", []))
+    punt_return_df = pd.DataFrame(stats_dict.get("PUNT RETURN", []))
+    kicking_df = pd.DataFrame(stats_dict.get("KICKING", []))
+    punting_df = pd.DataFrame(stats_dict.get("PUNTING", []))
 
     pass_column_names = [
         "season",
@@ -676,9 +1184,6 @@ def parse_usfl_player_stats(game_json_list: list, saveResults=False):
     ]].apply(
         pd.to_numeric
     )
-    passing_df["COMP%"] = (passing_df["COMP"] / passing_df["ATT"]) * 100
-    passing_df["YPA"] = passing_df["PASS_YDS"] / passing_df["ATT"]
-    passing_df["YPC"] = passing_df["PASS_YDS"] / passing_df["COMP"]
     passing_df = passing_df.reindex(columns=pass_column_names)
     # passing_df.to_csv('test_pass.csv',index=False)
 
@@ -742,7 +1247,6 @@ def parse_usfl_player_stats(game_json_list: list, saveResults=False):
         "RUSH_LONG"
     ]].apply(pd.to_numeric)
 
-    rush_df["RUSH_AVG"] = rush_df["RUSH_YDS"] / rush_df["RUSH"]
     rush_df = rush_df.reindex(columns=rush_column_names)
     # rush_df.to_csv('test_rush.csv',index=False)
 
@@ -815,12 +1319,6 @@ def parse_usfl_player_stats(game_json_list: list, saveResults=False):
             "REC_LONG"
         ]].apply(pd.to_numeric)
     )
-    receiving_df["REC_AVG"] = receiving_df["REC_YDS"] / receiving_df["REC"]
-    receiving_df["CATCH%"] = (
-        receiving_df["REC"] /
-        receiving_df["REC_TARGETS"]
-    ) * 100
-    receiving_df["YDS/TARGET"] = receiving_df["REC_YDS"] / receiving_df["REC"]
     receiving_df = receiving_df.reindex(columns=rec_column_names)
     # receiving_df.to_csv('test_rec.csv',index=False)
 
@@ -944,28 +1442,27 @@ def parse_usfl_player_stats(game_json_list: list, saveResults=False):
 
     # FG Kicking
     kicking_df = kicking_df.drop_duplicates()
-    # kicking_column_names = [
-    #     "season",
-    #     "game_id",
-    #     "game_date",
-    #     "team",
-    #     "team_nickname",
-    #     "loc",
-    #     "opponent",
-    #     "opponent_nickname",
-    #     "analytics_id",
-    #     "player_id",
-    #     "player_image",
-    #     "player_name",
-    #     "FGM",
-    #     "FGA",
-    #     "FG%",
-    #     "FG_LONG",
-    #     "XPM",
-    #     "XPA",
-    #     "XP%",
-    # ]
-    # # kicking_df = kicking_df.reindex(columns=kicking_column_names)
+    kicking_column_names = [
+        "season",
+        "game_id",
+        "game_date",
+        "team",
+        "team_nickname",
+        "loc",
+        "opponent",
+        "opponent_nickname",
+        "analytics_id",
+        "player_id",
+        "player_image",
+        "player_name",
+        "FG_LONG",
+        "FGM",
+        "FGA",
+        "XPM",
+        "XPA",
+        "FG%",
+        "XP%",
+    ]
 
     kicking_df.drop(["PTS", "PCT"], axis=1, inplace=True)
     kicking_df[["FGM", "FGA"]] = kicking_df["FG"].str.split("/", expand=True)
@@ -983,8 +1480,10 @@ def parse_usfl_player_stats(game_json_list: list, saveResults=False):
     kicking_df[["FGM", "FGA", "XPM", "XPA"]] = kicking_df[
         ["FGM", "FGA", "XPM", "XPA"]
     ].apply(pd.to_numeric)
-    kicking_df["FG%"] = kicking_df["FGM"] / kicking_df["FGA"]
-    kicking_df["XP%"] = kicking_df["XPM"] / kicking_df["XPA"]
+    # Kicking used to be merged on fewer key columns than the other tables.
+    # It now has the same descriptive columns as every other table,
+    # so it can be combined the same way.
+    kicking_df = kicking_df.reindex(columns=kicking_column_names)
     # kicking_df.to_csv('test_kick.csv',index=False)
 
     # Punting
@@ -1121,7 +1620,6 @@ def parse_usfl_player_stats(game_json_list: list, saveResults=False):
         "KR_TD",
         "KR_LONG"
     ]].apply(pd.to_numeric)
-    kick_return_df["KR_AVG"] = kick_return_df["KR_YDS"] / kick_return_df["KR"]
     kick_return_df = kick_return_df.reindex(columns=kr_column_names)
     # kick_return_df.to_csv('test_kr.csv',index=False)
 
@@ -1185,385 +1683,423 @@ def parse_usfl_player_stats(game_json_list: list, saveResults=False):
         "PR_TD",
         "PR_LONG"
     ]].apply(pd.to_numeric)
-    punt_return_df["PR_AVG"] = punt_return_df["PR_YDS"] / punt_return_df["PR"]
     punt_return_df = punt_return_df.reindex(columns=pr_column_names)
     # punt_return_df.to_csv('test_pr.csv',index=False)
 
-    main_df = passing_df
-    main_df = pd.merge(
-        main_df,
+    stat_df_list = [
+        passing_df,
         rush_df,
-        on=[
-            "season",
-            "game_id",
-            "game_date",
-            "team",
-            "team_nickname",
-            "loc",
-            "opponent",
-            "opponent_nickname",
-            "analytics_id",
-            "player_id",
-            "player_image",
-            "player_name",
-        ],
-        how="outer",
-    )
-    main_df = pd.merge(
-        main_df,
         receiving_df,
-        on=[
-            "season",
-            "game_id",
-            "game_date",
-            "team",
-            "team_nickname",
-            "loc",
-            "opponent",
-            "opponent_nickname",
-            "analytics_id",
-            "player_id",
-            "player_image",
-            "player_name",
-        ],
-        how="outer",
-    )
-    main_df = pd.merge(
-        main_df,
         fumbles_df,
-        on=[
-            "season",
-            "game_id",
-            "game_date",
-            "team",
-            "team_nickname",
-            "loc",
-            "opponent",
-            "opponent_nickname",
-            "analytics_id",
-            "player_id",
-            "player_image",
-            "player_name",
-        ],
-        how="outer",
-    )
-    main_df = pd.merge(
-        main_df,
         defensive_df,
-        on=[
-            "season",
-            "game_id",
-            "game_date",
-            "team",
-            "team_nickname",
-            "loc",
-            "opponent",
-            "opponent_nickname",
-            "analytics_id",
-            "player_id",
-            "player_image",
-            "player_name",
-        ],
-        how="outer",
-    )
-    main_df = pd.merge(
-        main_df,
         kicking_df,
-        on=[
-            "season",
-            "game_id",
-            "game_date",
-            # "team",
-            # "team_nickname",
-            # "loc",
-            # "opponent",
-            # "opponent_nickname",
-            "analytics_id",
-            "player_id",
-            "player_image",
-            "player_name",
-        ],
-        how="outer",
-    )
-    main_df = pd.merge(
-        main_df,
         punting_df,
-        on=[
-            "season",
-            "game_id",
-            "game_date",
-            "team",
-            "team_nickname",
-            "loc",
-            "opponent",
-            "opponent_nickname",
-            "analytics_id",
-            "player_id",
-            "player_image",
-            "player_name",
-        ],
-        how="outer",
-    )
-    main_df = pd.merge(
-        main_df,
         punt_return_df,
-        on=[
-            "season",
-            "game_id",
-            "game_date",
-            "team",
-            "team_nickname",
-            "loc",
-            "opponent",
-            "opponent_nickname",
-            "analytics_id",
-            "player_id",
-            "player_image",
-            "player_name",
-        ],
-        how="outer",
-    )
-    main_df = pd.merge(
-        main_df,
         kick_return_df,
-        on=[
-            "season",
-            "game_id",
-            "game_date",
-            "team",
-            "team_nickname",
-            "loc",
-            "opponent",
-            "opponent_nickname",
-            "analytics_id",
-            "player_id",
-            "player_image",
-            "player_name",
-        ],
-        how="outer",
+    ]
+
+    # The "TOTALS" row of every table is the team's total in that game.
+    team_df = _combine_stat_tables(
+        [df[df["player_name"] == "TOTALS"] for df in stat_df_list],
+        TEAM_GAME_KEYS,
+        TEAM_GAME_COLUMNS
     )
-    main_df = main_df[main_df["player_name"] != "TOTALS"]
-    main_df = main_df.drop_duplicates(
-        subset=[
-            "season",
-            "game_id",
-            "game_date",
-            "team",
-            "team_nickname",
-            "loc",
-            "opponent",
-            "opponent_nickname",
-            "analytics_id",
-            "player_id",
-            "player_image",
-            "player_name",
-        ],
-        keep="last",
+    team_df = compute_metrics(team_df, GAME_METRICS)
+    team_df = apply_schema(team_df, "team_game_stats")
+    team_df = team_df.sort_values(by=["season", "game_date", "game_id", "loc"])
+
+    main_df = _combine_stat_tables(
+        [df[df["player_name"] != "TOTALS"] for df in stat_df_list],
+        PLAYER_GAME_KEYS,
+        PLAYER_GAME_COLUMNS
     )
 
+    # The rate stats of every table are computed in one pass,
+    # see `GAME_METRICS` in `metrics.py`.
+    main_df = compute_metrics(main_df, GAME_METRICS)
+
+    main_df = apply_schema(main_df, "player_game_stats")
     main_df = main_df.sort_values(
         by=["season", "game_date", "game_id", "loc", "player_id"]
     )
 
     if saveResults is True:
-        min_season = int(main_df["season"].min())
-        max_season = int(main_df["season"].max())
-        for i in range(min_season, max_season + 1):
-            main_df.to_csv(
+        seasons_arr = main_df["season"].astype(int)
+        for i in sorted(seasons_arr.unique()):
+            main_df[seasons_arr == i].to_csv(
                 f"player_stats/game_stats/{i}_player_game_stats.csv",
                 index=False
             )
 
+        save_partitioned_parquet(
+            main_df,
+            PLAYER_STATS_DATASET,
+            PLAYER_STATS_PARTITIONS
+        )
+
+        _save_usfl_team_stats(team_df)
+
     return main_df
 
 
-def parse_usfl_pbp(game_json_list: list, saveResults=False):
-    main_df = pd.DataFrame()
-    game_df = pd.DataFrame()
-    play_df = pd.DataFrame()
-    for i in tqdm(game_json_list):
-        away_score = 0
-        home_score = 0
-
-        game_df = pd.DataFrame()
-
-        with open(i, "r", encoding="utf8") as j:
-            data = json.load(j)
-
-        game_id = data["header"]["id"]
-        game_date = data["header"]["eventTime"]
-        game_date = game_date[:10]
-        season = game_date[:4]
-
-        away_team_id = data["header"]["leftTeam"]["name"]
-        away_team_nickname = data["header"]["leftTeam"]["longName"]
-        away_team_full_name = data["header"]["leftTeam"]["alternateName"]
-
-        home_team_id = data["header"]["rightTeam"]["name"]
-        home_team_nickname = data["header"]["rightTeam"]["longName"]
-        home_team_full_name = data["header"]["rightTeam"]["alternateName"]
-
-        try:
-            for j in data["pbp"]["sections"]:
-                quarter = j["title"]
-                # print(f'\n{quarter}')
-
-                for k in j["groups"]:
-                    drive_play_num = 1
-                    drive_id = k["id"]
-                    drive_result = k["title"]
-                    drive_summary = str(k["subtitle"])
-                    drive_plays, drive_yards, drive_time = \
-                        drive_summary.split(" · ")
-                    drive_plays = drive_plays.replace(" plays", "")
-                    drive_yards = drive_yards.replace(" yards", "")
-
-                    off_team_full_name = k["imageAltText"]
-                    if (
-                        off_team_full_name == away_team_full_name
-                    ):  # Offense == away team
-                        off_team_nickname = away_team_nickname
-                        off_team_id = away_team_id
-                        def_team_id = home_team_id
-                        def_team_nickname = home_team_nickname
-                        def_team_full_name = home_team_full_name
-
-                    elif off_team_full_name == home_team_full_name:
-                        off_team_nickname = home_team_nickname
-                        off_team_id = home_team_id
-                        def_team_id = away_team_id
-                        def_team_nickname = away_team_nickname
-                        def_team_full_name = away_team_full_name
-                    for play in k["plays"]:
-                        # print(play['id'])
-                        play_df = pd.DataFrame(
-                            columns=["game_id"],
-                            data=[game_id]
-                        )
-                        play_df["season"] = season
-                        play_df["game_date"] = game_date
-                        play_df["away_team_id"] = away_team_id
-                        play_df["away_team_nickname"] = away_team_nickname
-                        play_df["away_team_full_name"] = away_team_full_name
-                        play_df["home_team_id"] = home_team_id
-                        play_df["home_team_nickname"] = home_team_nickname
-                        play_df["home_team_full_name"] = home_team_full_name
-                        play_df["off_team_id"] = off_team_id
-                        play_df["off_team_nickname"] = off_team_nickname
-                        play_df["off_team_full_name"] = off_team_full_name
-                        play_df["def_team_id"] = def_team_id
-                        play_df["def_team_nickname"] = def_team_nickname
-                        play_df["def_team_full_name"] = def_team_full_name
-                        play_df["quarter"] = quarter
-                        play_df["drive_id"] = drive_id
-                        play_df["play_id"] = play["id"]
+def _combine_stat_tables(
+    stat_df_list: list,
+    keys: list,
+    info_columns: list
+):
+    """
+    Combines boxscore tables (passing, rushing, etc.) into one row
+    per player (or team) in every game.
 
-                        try:
-                            down_and_distance = play["title"]
-                        except Exception:
-                            down_and_distance = None
-                        play_df["down_and_distance"] = down_and_distance
-                        play_down = 0
-                        play_distance = 0
-                        if (
-                            down_and_distance == "END QUARTER"
-                            or down_and_distance == "KICKOFF"
-                            or down_and_distance == "PAT"
-                            or down_and_distance is None
-                        ):
-                            pass
-                        else:
-                            play_down, play_distance = \
-                                down_and_distance.split(" AND ")
-                            play_down = play_down[0]
-                            # print(down)
-                        play_df["down"] = play_down
-                        play_df["distance"] = play_distance
+    Every table is keyed on a compact key, like (game_id, player_id),
+    so all of them are combined in one aligned `concat()` on that key,
+    and the descriptive columns are joined back once,
+    instead of merging the tables one by one on every descriptive column.
 
-                        try:
-                            play_df["ball_on"] = play["subtitle"]
-                        except Exception:
-                            play_df["ball_on"] = None
+    Args:
+        stat_df_list (list):
+            Required parameter. The boxscore tables you want combined.
 
-                        play_df["time_of_play"] = play["timeOfPlay"]
-                        play_df[[
-                            "time_of_play_min",
-                            "time_of_play_sec"
-                        ]] = play_df[
-                            "time_of_play"
-                        ].str.split(":", expand=True)
+        keys (list):
+            Required parameter. The columns that identify a row.
+            If a table has more than one row with the same key,
+            the last one is kept.
 
-                        play_df["drive_play_num"] = drive_play_num
+        info_columns (list):
+            Required parameter. The descriptive columns of a row,
+            including `keys`, which come before the stats.
 
-                        play_df["play_description"] = play["playDescription"]
-                        play_df["away_team_score_change"] = play[
-                            "leftTeamScoreChange"
-                        ]
-                        play_df["home_team_score_change"] = play[
-                            "rightTeamScoreChange"
-                        ]
+    Returns:
+        df (pandas.DataFrame):
+            The combined tables.
+    """
+    info_df_list = []
+    stat_columns = []
+    stat_df_list = list(stat_df_list)
+
+    for i, stat_df in enumerate(stat_df_list):
+        stat_df = stat_df.dropna(subset=keys).copy()
+        stat_df["game_id"] = pd.to_numeric(stat_df["game_id"])
+        if "player_id" in keys:
+            stat_df["player_id"] = pd.to_numeric(stat_df["player_id"])
+        stat_df = stat_df.drop_duplicates(subset=keys, keep="last")
+
+        info_df_list.append(stat_df[info_columns])
+        stat_df = stat_df.set_index(keys).drop(
+            columns=[
+                col for col in PLAYER_GAME_COLUMNS
+                if col not in keys
+            ]
+        )
+        stat_columns += stat_df.columns.to_list()
+        stat_df_list[i] = stat_df
 
-                        try:
-                            away_score = play["leftTeamScore"]
-                            home_score = play["rightTeamScore"]
-                        except Exception:
-                            pass
-                        play_df["away_score"] = away_score
-                        play_df["home_score"] = home_score
-
-                        # drive_plays, drive_yards, drive_time
-                        play_df["drive_plays"] = drive_plays
-                        play_df["drive_yards"] = drive_yards
-                        play_df["drive_time"] = drive_time
-                        # kicking_df[[
-                        # 'XPM','XPA'
-                        # ]] = kicking_df['XP'].str.split('/',expand=True)
-                        play_df[[
-                            "drive_time_min",
-                            "drive_time_sec"
-                        ]] = play_df[
-                            "drive_time"
-                        ].str.split(":", expand=True)
-
-                        play_df["drive_result"] = drive_result
-                        game_df = pd.concat(
-                            [game_df, play_df],
-                            ignore_index=True
-                        )
-                        drive_play_num += 1
-            main_df = pd.concat([main_df, game_df], ignore_index=True)
-        except Exception:
-            print(f"Cannot parse play-by-play data from game #{game_id}.")
-
-    main_df[["game_id", "play_id"]] = main_df[[
-        "game_id", "play_id"
-    ]].astype("int")
+    info_df = pd.concat(info_df_list).drop_duplicates(
+        subset=keys
+    ).set_index(keys)
+
+    df = pd.concat([info_df] + stat_df_list, axis=1).reset_index()
+    return df[info_columns + stat_columns]
+
+
+def _save_usfl_team_stats(team_df: pd.DataFrame):
+    """
+    Saves the team game stats built by `_build_usfl_player_stats()`,
+    and the team season stats of every season in them.
+    """
+    team_season_df = get_team_season_stats(team_df)
+
+    os.makedirs(TEAM_GAME_STATS_FOLDER, exist_ok=True)
+    os.makedirs(f"{TEAM_SEASON_STATS_FOLDER}/csv", exist_ok=True)
+    os.makedirs(f"{TEAM_SEASON_STATS_FOLDER}/parquet", exist_ok=True)
+
+    for season, df in team_df.groupby("season"):
+        df.to_csv(
+            f"{TEAM_GAME_STATS_FOLDER}/{season}_team_game_stats.csv",
+            index=False
+        )
+    save_partitioned_parquet(
+        team_df,
+        TEAM_STATS_DATASET,
+        TEAM_STATS_PARTITIONS
+    )
+
+    for season, df in team_season_df.groupby("season"):
+        df.to_csv(
+            f"{TEAM_SEASON_STATS_FOLDER}/csv/{season}_team_season_stats.csv",
+            index=False
+        )
+        df.to_parquet(
+            f"{TEAM_SEASON_STATS_FOLDER}/parquet/" +
+            f"{season}_team_season_stats.parquet",
+            index=False
+        )
+
+
+def parse_usfl_pbp(game_json_list: list, saveResults=False, workers=1):
+    return parse_usfl_gamelogs(
+        game_json_list,
+        schedule=False,
+        player_stats=False,
+        save=saveResults,
+        workers=workers
+    )["pbp"]
+
+
+def _get_usfl_game_pbp(data: dict):
+    """
+    Parses the play-by-play data of a single, already decoded, USFL gamelog.
+
+    Args:
+        data (dict):
+            Required parameter. A decoded gamelog,
+            as returned by `load_gamelog()`.
+
+    Returns:
+        game_list (list):
+            Every play in this game, as a `dict` of column name to value.
+            Empty if the play-by-play data in this game
+            could not be parsed.
+    """
+    game_list = []
+
+    away_score = 0
+    home_score = 0
+
+    game_id = data["header"]["id"]
+    game_date = data["header"]["eventTime"]
+    game_date = game_date[:10]
+    season = game_date[:4]
+
+    away_team_id = data["header"]["leftTeam"]["name"]
+    away_team_nickname = data["header"]["leftTeam"]["longName"]
+    away_team_full_name = data["header"]["leftTeam"]["alternateName"]
+
+    home_team_id = data["header"]["rightTeam"]["name"]
+    home_team_nickname = data["header"]["rightTeam"]["longName"]
+    home_team_full_name = data["header"]["rightTeam"]["alternateName"]
+
+    try:
+        for j in data["pbp"]["sections"]:
+            quarter = j["title"]
+            # print(f'\n{quarter}')
+
+            for k in j["groups"]:
+                drive_play_num = 1
+                drive_id = k["id"]
+                drive_result = k["title"]
+                # Decoded for every play at once, see `_decode_usfl_pbp()`.
+                drive_summary = str(k["subtitle"])
+
+                off_team_full_name = k["imageAltText"]
+                if (
+                    off_team_full_name == away_team_full_name
+                ):  # Offense == away team
+                    off_team_nickname = away_team_nickname
+                    off_team_id = away_team_id
+                    def_team_id = home_team_id
+                    def_team_nickname = home_team_nickname
+                    def_team_full_name = home_team_full_name
+
+                elif off_team_full_name == home_team_full_name:
+                    off_team_nickname = home_team_nickname
+                    off_team_id = home_team_id
+                    def_team_id = away_team_id
+                    def_team_nickname = away_team_nickname
+                    def_team_full_name = away_team_full_name
+                for play in k["plays"]:
+                    # print(play['id'])
+                    play_row = {"game_id": game_id}
+                    play_row["season"] = season
+                    play_row["game_date"] = game_date
+                    play_row["away_team_id"] = away_team_id
+                    play_row["away_team_nickname"] = away_team_nickname
+                    play_row["away_team_full_name"] = away_team_full_name
+                    play_row["home_team_id"] = home_team_id
+                    play_row["home_team_nickname"] = home_team_nickname
+                    play_row["home_team_full_name"] = home_team_full_name
+                    play_row["off_team_id"] = off_team_id
+                    play_row["off_team_nickname"] = off_team_nickname
+                    play_row["off_team_full_name"] = off_team_full_name
+                    play_row["def_team_id"] = def_team_id
+                    play_row["def_team_nickname"] = def_team_nickname
+                    play_row["def_team_full_name"] = def_team_full_name
+                    play_row["quarter"] = quarter
+                    play_row["drive_id"] = drive_id
+                    play_row["play_id"] = play["id"]
+
+                    play_row["down_and_distance"] = play.get("title")
+                    play_row["ball_on"] = play.get("subtitle")
+                    play_row["time_of_play"] = play["timeOfPlay"]
+                    play_row["drive_play_num"] = drive_play_num
+
+                    play_row["play_description"] = play["playDescription"]
+                    play_row["away_team_score_change"] = play[
+                        "leftTeamScoreChange"
+                    ]
+                    play_row["home_team_score_change"] = play[
+                        "rightTeamScoreChange"
+                    ]
+
+                    try:
+                        away_score = play["leftTeamScore"]
+                        home_score = play["rightTeamScore"]
+                    except Exception:
+                        pass
+                    play_row["away_score"] = away_score
+                    play_row["home_score"] = home_score
+
+                    play_row["drive_summary"] = drive_summary
+                    play_row["drive_result"] = drive_result
+                    game_list.append(play_row)
+                    drive_play_num += 1
+    except Exception:
+        print(f"Cannot parse play-by-play data from game #{game_id}.")
+        game_list = []
+
+    return game_list
+
+
+def _extract_pbp_field(field: pd.Series, pattern: str):
+    """
+    Extracts the groups of a regex from a text column of the
+    play-by-play data, like `Series.str.extract()`. These columns only
+    have a few hundred distinct values, so each distinct value is only
+    matched once, and the matches are spread back to every play.
+
+    Returns:
+        field_df (pandas.DataFrame):
+            One column for every group of `pattern`, and one row
+            for every play. Values that do not match are missing.
+    """
+    codes, uniques = pd.factorize(field)
+    uniques_df = pd.Series(uniques, dtype=object).str.extract(pattern)
+    # `pd.factorize()` gives missing values a code of -1,
+    # which is matched to an extra row of missing values.
+    uniques_df.loc[len(uniques_df)] = None
+    field_df = uniques_df.take(codes)
+    field_df.index = field.index
+    return field_df
+
+
+def _decode_usfl_pbp(main_df: pd.DataFrame):
+    """
+    Decodes the text fields of every play, which are kept as they are
+    while the gamelogs are traversed, a column at a time:
+
+    - `down_and_distance` (like `"1ST AND 10"`) into `down` and `distance`.
+    - `time_of_play` (like `"14:35"`) into `time_of_play_min`,
+      `time_of_play_sec`, and `game_seconds_remaining`.
+    - The drive summary (like `"7 plays · 63 yards · 3:15"`) into
+      `drive_plays`, `drive_yards`, `drive_time`, `drive_time_min`,
+      and `drive_time_sec`.
+
+    Returns:
+        main_df (pandas.DataFrame):
+            The decoded plays, with the columns of `PBP_SCHEMA`,
+            in that order.
+    """
+    down_and_distance = main_df["down_and_distance"]
+    down_df = _extract_pbp_field(
+        down_and_distance,
+        r"^(\d)\S* AND (\S+)$"
+    )
+    # Kickoffs, extra points, and the end of a quarter have no down.
+    has_no_down = (
+        down_and_distance.isna() |
+        down_and_distance.isin(PBP_PLAYS_WITHOUT_DOWN)
+    )
+    main_df["down"] = down_df[0].mask(has_no_down, "0")
+    main_df["distance"] = down_df[1].mask(has_no_down, "0")
+
+    time_df = _extract_pbp_field(
+        main_df["time_of_play"],
+        r"^(\d+):(\d+)$"
+    ).apply(pd.to_numeric)
+    main_df["time_of_play_min"] = time_df[0]
+    main_df["time_of_play_sec"] = time_df[1]
+
+    # Every quarter is 15 minutes long. Overtime has no clock.
+    quarter_num = pd.to_numeric(
+        _extract_pbp_field(main_df["quarter"], r"^(\d)")[0]
+    )
+    quarters_left = (4 - quarter_num).clip(lower=0).fillna(0)
+    main_df["game_seconds_remaining"] = (
+        (quarters_left * 900) + (time_df[0] * 60) + time_df[1]
+    )
+
+    drive_df = _extract_pbp_field(
+        main_df["drive_summary"],
+        r"^(-?\d+) plays? · (-?\d+) yards? · ((\d+):(\d+))$"
+    )
+    main_df["drive_plays"] = drive_df[0]
+    main_df["drive_yards"] = drive_df[1]
+    main_df["drive_time"] = drive_df[2]
+    main_df["drive_time_min"] = drive_df[3]
+    main_df["drive_time_sec"] = drive_df[4]
+
+    return main_df[list(PBP_SCHEMA)]
+
+
+def _build_usfl_pbp(game_list: list, saveResults=False):
+    """
+    Combines the per-game plays from `_get_usfl_game_pbp()`
+    into a single play-by-play DataFrame, and saves it.
+    """
+    # Every play is a plain record until this point,
+    # so the season is turned into a DataFrame in one step.
+    main_df = pd.DataFrame(
+        [play_row for game in game_list for play_row in game]
+    )
+    main_df = apply_schema(_decode_usfl_pbp(main_df), "pbp")
 
     main_df = main_df.sort_values(by=["game_id", "play_id"])
 
     if saveResults is True:
-        min_season = int(main_df["season"].min())
-        max_season = int(main_df["season"].max())
-        for i in range(min_season, max_season + 1):
-            main_df.to_csv(f"pbp/{i}_play_by_play.csv", index=False)
+        os.makedirs("pbp", exist_ok=True)
+        seasons_arr = main_df["season"].astype(int)
+        for i in sorted(seasons_arr.unique()):
+            main_df[seasons_arr == i].to_csv(
+                f"pbp/{i}_play_by_play.csv",
+                index=False
+            )
+
+        save_partitioned_parquet(main_df, PBP_DATASET, PBP_PARTITIONS)
 
     # main_df.to_csv(f'pbp/usfl_play_by_play.csv',index=False)
     print(main_df)
+    return main_df
 
 
 def main():
-    print("Starting up")
-    key = get_usfl_api_key()
-    # for i in tqdm(range(87, 90)):
-    #     get_usfl_game(i, key, True)
-    json_list = get_json_in_folder("Gamelogs")
+    from pipeline import get_usfl_stages, run_pipeline
 
-    get_usfl_schedule(json_list, True)
-    parse_usfl_player_stats(json_list, True)
-    parse_usfl_pbp(json_list, True)
+    parser = argparse.ArgumentParser(
+        description="Downloads and parses USFL data."
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Profile the memory of every stage, and every game."
+    )
+    args = parser.parse_args()
 
-    get_usfl_standings(2023, key, True)
-    get_usfl_rosters(2023, key, 10, True)
+    print("Starting up")
+    # How long every stage took is saved in `RUN_REPORT_FILE`,
+    # even if one of them fails.
+    report = RunReport(profile_memory=args.profile_memory)
+    try:
+        # The standings and rosters are downloaded
+        # while the gamelogs are parsed.
+        run_pipeline(
+            [
+                stage for stage in get_usfl_stages(os.cpu_count() or 1)
+                if stage.name in ["parse_gamelogs", "standings", "rosters"]
+            ],
+            report
+        )
+    finally:
+        report.save()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,12 @@
+"""
+File: usfl_config.py
+Author: Joseph Armstrong
+Purpose: Settings shared by the modules of this repository,
+    like the season that is currently being played.
+    This module should not import anything else from this repository,
+    so it can be imported from anywhere.
+"""
+
+# The season, and week, standings and rosters are downloaded for.
+CURRENT_SEASON = 2023
+CURRENT_WEEK = 10
@@ -0,0 +1,350 @@
+"""
+File: usfl_database.py
+Author: Joseph Armstrong
+Purpose: Loads the schedules, standings, rosters, player stats, and
+    play-by-play data of this repository into a single, indexed SQLite
+    database, so these datasets can be joined with SQL, instead of
+    reading and joining dozens of CSV files.
+"""
+
+import glob
+import os
+import sqlite3
+from typing import NamedTuple
+
+import pandas as pd
+
+from schemas import apply_schema, get_schema, read_csv_with_schema
+from utils import load_parquet_partitions, load_partition_manifest
+
+# Kept with the other build caches,
+# so it can be updated incrementally between runs.
+DATABASE_FILE = "cache/usfl.sqlite"
+
+# Every source a table was loaded from, and the signature of that source
+# when it was loaded. See `update_usfl_database()`.
+SOURCES_TABLE = "_sources"
+
+
+class DatabaseTable(NamedTuple):
+    """
+    A dataset that is loaded into the database.
+
+    Args:
+        name (str):
+            Required parameter. The name of this table.
+
+        schema_name (str):
+            Required parameter. The schema of this dataset,
+            see `schemas.py`.
+
+        csv_files (str):
+            Required parameter. A glob of the per-season CSV files
+            of this dataset, like `"schedules/*_schedule.csv"`.
+
+        keys (list):
+            Required parameter. The primary key of this table.
+
+        indexes (list):
+            Optional parameter. Every other index of this table,
+            as a list of columns.
+
+        dataset (str):
+            Optional parameter. The partitioned Parquet copy of this
+            dataset, saved by `save_partitioned_parquet()`. If it has
+            been saved, it is used instead of `csv_files`, so only the
+            games that changed are loaded again.
+    """
+    name: str
+    schema_name: str
+    csv_files: str
+    keys: list
+    indexes: list = []
+    dataset: str = None
+
+
+DATABASE_TABLES = [
+    DatabaseTable(
+        "schedule",
+        "schedule",
+        "schedules/*_schedule.csv",
+        ["game_id"],
+        [["season"], ["away_team_abv"], ["home_team_abv"]]
+    ),
+    DatabaseTable(
+        "standings",
+        "standings",
+        "standings/csv/*_usfl_standings.csv",
+        ["season", "team_id"]
+    ),
+    DatabaseTable(
+        "rosters",
+        "rosters",
+        "rosters/season/csv/*_usfl_rosters.csv",
+        ["season", "team_id", "player_id"],
+        [["player_id"]]
+    ),
+    DatabaseTable(
+        "player_game_stats",
+        "player_game_stats",
+        "player_stats/game_stats/*_player_game_stats.csv",
+        ["game_id", "player_id"],
+        [["player_id"], ["season", "team"]],
+        "player_stats/game_stats/parquet"
+    ),
+    DatabaseTable(
+        "player_season_stats",
+        "player_season_stats",
+        "player_stats/season_stats/csv/*_player_season_stats.csv",
+        ["season", "team", "player_id"],
+        [["player_id"]]
+    ),
+    DatabaseTable(
+        "pbp",
+        "pbp",
+        "pbp/*_play_by_play.csv",
+        ["game_id", "play_id"],
+        [["season"], ["off_team_id"], ["def_team_id"]],
+        "pbp/parquet"
+    ),
+]
+
+
+def _get_sql_type(dtype: str):
+    """
+    Returns the SQLite type of a column with this schema dtype.
+    """
+    dtype = str(dtype)
+    if dtype.lower().startswith("int") or dtype == "boolean":
+        return "INTEGER"
+    elif dtype.startswith("float"):
+        return "REAL"
+    return "TEXT"
+
+
+def _get_sources(table: DatabaseTable):
+    """
+    Returns the signature of every source of a table, by source.
+
+    Partitions of a Parquet dataset are signed with their content hash,
+    and CSV files with their size and modification time.
+    """
+    manifest = {}
+    if table.dataset is not None:
+        manifest = load_partition_manifest(table.dataset)
+    if len(manifest) > 0:
+        return manifest
+
+    sources = {}
+    for file_path in sorted(glob.glob(table.csv_files)):
+        stat = os.stat(file_path)
+        sources[file_path] = f"{stat.st_size}:{stat.st_mtime_ns}"
+    return sources
+
+
+def _get_source_scope(source: str):
+    """
+    Returns the rows a source holds, as a `dict` of column to value.
+    A partition, like `season=2023/game_id=45`, holds one game,
+    and a CSV file, like `schedules/2023_schedule.csv`, one season.
+    """
+    if source.endswith(".csv"):
+        return {"season": int(os.path.basename(source).split("_")[0])}
+    return {
+        col: int(value)
+        for col, value in (p.split("=", 1) for p in source.split("/"))
+    }
+
+
+def _load_sources(table: DatabaseTable, sources: list):
+    """
+    Loads the rows of some of the sources of a table.
+    """
+    if len(sources) == 0:
+        return pd.DataFrame()
+    elif not sources[0].endswith(".csv"):
+        df = load_parquet_partitions(table.dataset, sources)
+        return apply_schema(df, table.schema_name)
+
+    df_list = []
+    for file_path in sources:
+        df = read_csv_with_schema(file_path, table.schema_name)
+        # Some season files hold the rows of other seasons too.
+        season = _get_source_scope(file_path)["season"]
+        df_list.append(df[df["season"] == season])
+    return pd.concat(df_list, ignore_index=True)
+
+
+def _create_table(con: sqlite3.Connection, table: DatabaseTable):
+    """
+    Creates a table, and its indexes. If the table already exists,
+    but its columns no longer match its schema, it is dropped,
+    and created again.
+    """
+    schema = get_schema(table.schema_name)
+    columns = [
+        row[1] for row in con.execute(f'PRAGMA table_info("{table.name}")')
+    ]
+    if len(columns) > 0 and columns != list(schema.keys()):
+        con.execute(f'DROP TABLE "{table.name}"')
+        con.execute(
+            f"DELETE FROM {SOURCES_TABLE} WHERE table_name = ?",
+            (table.name,)
+        )
+
+    column_sql = [
+        f'"{col}" {_get_sql_type(dtype)}' for col, dtype in schema.items()
+    ]
+    key_sql = ", ".join(f'"{col}"' for col in table.keys)
+    con.execute(
+        f'CREATE TABLE IF NOT EXISTS "{table.name}" (' +
+        ", ".join(column_sql) +
+        f", PRIMARY KEY ({key_sql}))"
+    )
+
+    for index in table.indexes:
+        index_name = f"{table.name}_{'_'.join(index)}_idx"
+        index_sql = ", ".join(f'"{col}"' for col in index)
+        con.execute(
+            f'CREATE INDEX IF NOT EXISTS "{index_name}" ' +
+            f'ON "{table.name}" ({index_sql})'
+        )
+
+
+def _update_table(con: sqlite3.Connection, table: DatabaseTable):
+    """
+    Replaces the rows of every source of a table that was added,
+    changed, or removed since the last update.
+
+    Returns:
+        The number of sources that were replaced.
+    """
+    _create_table(con, table)
+
+    old_sources = dict(
+        con.execute(
+            f"SELECT source, signature FROM {SOURCES_TABLE} " +
+            "WHERE table_name = ?",
+            (table.name,)
+        ).fetchall()
+    )
+    new_sources = _get_sources(table)
+
+    changed_sources = [
+        source for source, signature in new_sources.items()
+        if old_sources.get(source) != signature
+    ]
+    removed_sources = [
+        source for source in old_sources if source not in new_sources
+    ]
+
+    for source in removed_sources + changed_sources:
+        scope = _get_source_scope(source)
+        con.execute(
+            f'DELETE FROM "{table.name}" WHERE ' +
+            " AND ".join(f'"{col}" = ?' for col in scope),
+            tuple(scope.values())
+        )
+        con.execute(
+            f"DELETE FROM {SOURCES_TABLE} " +
+            "WHERE table_name = ? AND source = ?",
+            (table.name, source)
+        )
+
+    df = _load_sources(table, changed_sources)
+    if len(df) > 0:
+        # Missing values of every dtype become None (NULL),
+        # and every other value a plain Python object.
+        df = df.astype(object).where(df.notna(), None)
+        column_sql = ", ".join(f'"{col}"' for col in df.columns)
+        con.executemany(
+            f'INSERT INTO "{table.name}" ({column_sql}) VALUES (' +
+            ", ".join("?" * len(df.columns)) + ")",
+            df.itertuples(index=False, name=None)
+        )
+
+    con.executemany(
+        f"INSERT INTO {SOURCES_TABLE} VALUES (?, ?, ?)",
+        [
+            (table.name, source, new_sources[source])
+            for source in changed_sources
+        ]
+    )
+    return len(changed_sources) + len(removed_sources)
+
+
+def update_usfl_database(
+    database_file=DATABASE_FILE,
+    tables=None,
+    rebuild=False
+):
+    """
+    Creates, or incrementally updates, the USFL database.
+
+    Every table keeps track of the sources (season CSV files, or game
+    partitions) it was loaded from. Only sources that were added,
+    changed, or removed since the last update are loaded again, and
+    each table is updated in a single transaction.
+
+    Args:
+        database_file (str):
+            Optional parameter. The SQLite database file.
+
+        tables (list):
+            Optional parameter. The names of the tables you want updated.
+            If not set, every table in `DATABASE_TABLES` is updated.
+
+        rebuild (bool):
+            Optional parameter. If set to True, the database is deleted,
+            and every table is loaded from scratch.
+
+    Returns:
+        updates (dict):
+            The number of sources that were replaced, by table.
+
+    Example:
+        update_usfl_database()
+
+        con = sqlite3.connect(DATABASE_FILE)
+        pd.read_sql(
+            "SELECT * FROM pbp JOIN schedule USING (game_id) " +
+            "WHERE pbp.season = 2023",
+            con
+        )
+    """
+    if rebuild and os.path.exists(database_file):
+        os.remove(database_file)
+
+    folder = os.path.dirname(database_file)
+    if folder != "":
+        os.makedirs(folder, exist_ok=True)
+
+    updates = {}
+    con = sqlite3.connect(database_file)
+    try:
+        con.execute(
+            f"CREATE TABLE IF NOT EXISTS {SOURCES_TABLE} (" +
+            "table_name TEXT, source TEXT, signature TEXT, " +
+            "PRIMARY KEY (table_name, source))"
+        )
+        for table in DATABASE_TABLES:
+            if tables is not None and table.name not in tables:
+                continue
+            with con:
+                updates[table.name] = _update_table(con, table)
+    finally:
+        con.close()
+
+    return updates
+
+
+def main():
+    print("Starting up!")
+    updates = update_usfl_database()
+    for table_name, count in updates.items():
+        print(f"{table_name}: {count} source(s) updated.")
+    print("All done!")
+
+
+if __name__ == "__main__":
+    main()
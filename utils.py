@@ -8,11 +8,63 @@
 ###############################################################################
 """
 
+import hashlib
 import json
 import logging
+import os
+import shutil
+import threading
+import time
 from os import environ, mkdir
 from os.path import expanduser
 
+import pandas as pd
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket, used to limit how many requests
+    per second are sent to an API from multiple threads.
+
+    Parameters
+    ----------
+
+    `rate` (float, mandatory):
+        How many tokens are added to the bucket every second.
+        This is the sustained number of requests per second.
+
+    `capacity` (int, optional):
+        The maximum number of tokens the bucket can hold.
+        This is the largest burst of requests that can be sent at once.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until a token is available, and takes it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._last_update) * self.rate
+                )
+                self._last_update = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
 
 def format_folder_path(folder_path: str) -> str:
     """
@@ -33,6 +85,144 @@ def format_folder_path(folder_path: str) -> str:
     return folder_path.replace("\\", "/").replace("//", "/")
 
 
+def load_partition_manifest(dataset_folder: str) -> dict:
+    """
+    Loads the hash of every partition in a dataset saved by
+    `save_partitioned_parquet()`, by partition path
+    (like `season=2023/game_id=45`). Returns an empty `dict`
+    if this dataset has not been saved yet.
+    """
+    try:
+        with open(
+            f"{dataset_folder}/_partitions.json",
+            "r",
+            encoding="utf8"
+        ) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def load_parquet_partitions(dataset_folder: str, part_paths: list):
+    """
+    Loads some of the partitions of a dataset saved by
+    `save_partitioned_parquet()`.
+
+    Parameters
+    ----------
+
+    `dataset_folder` (str, mandatory):
+        The folder of this dataset.
+
+    `part_paths` (list, mandatory):
+        The partitions you want, like `["season=2023/game_id=45"]`.
+
+    Returns
+    ----------
+    A DataFrame with the rows of every requested partition. The partition
+    columns are added back as the first columns, as strings.
+    """
+    df_list = []
+    for part_path in part_paths:
+        part_df = pd.read_parquet(f"{dataset_folder}/{part_path}/data.parquet")
+        keys = [p.split("=", 1) for p in part_path.split("/")]
+        for i, (col, value) in enumerate(keys):
+            part_df.insert(i, col, value)
+        df_list.append(part_df)
+
+    if len(df_list) == 0:
+        return pd.DataFrame()
+    return pd.concat(df_list, ignore_index=True)
+
+
+def save_partitioned_parquet(
+    df: pd.DataFrame,
+    dataset_folder: str,
+    partition_cols: list
+) -> list:
+    """
+    Saves a DataFrame as a Hive-style partitioned Parquet dataset,
+    like `{dataset_folder}/season=2023/game_id=45/data.parquet`.
+    The dataset can be read back with `pd.read_parquet(dataset_folder)`.
+
+    A hash of every partition is kept in `_partitions.json`, so only
+    partitions whose rows changed since the last save are rewritten.
+    Partitions that no longer have any rows are removed.
+
+    Parameters
+    ----------
+
+    `df` (pandas.DataFrame, mandatory):
+        The DataFrame you want saved.
+
+    `dataset_folder` (str, mandatory):
+        The folder of this dataset.
+
+    `partition_cols` (list, mandatory):
+        The columns this dataset is partitioned by, in order.
+        These columns are stored in the folder names,
+        not in the Parquet files themselves.
+
+    Returns
+    ----------
+    A list of every partition that was (re)written.
+    """
+    old_manifest = load_partition_manifest(dataset_folder)
+
+    df = df.copy()
+    for col in df.columns:
+        # Parquet columns need a single type, so columns that mix
+        # numbers and strings are stored as strings.
+        if df[col].dtype == object and (
+            df[col].dropna().map(type).nunique() > 1
+        ):
+            df[col] = df[col].map(
+                lambda x: str(x) if isinstance(x, (int, float)) else x
+            )
+
+    manifest = {}
+    written_list = []
+    for keys, part_df in df.groupby(partition_cols, sort=True):
+        if not isinstance(keys, tuple):
+            keys = (keys,)
+        part_path = "/".join(
+            f"{col}={key}" for col, key in zip(partition_cols, keys)
+        )
+        part_df = part_df.drop(columns=partition_cols).reset_index(drop=True)
+
+        part_hash = hashlib.sha256()
+        part_hash.update(str(list(part_df.dtypes.items())).encode("utf8"))
+        part_hash.update(
+            pd.util.hash_pandas_object(part_df, index=False).values.tobytes()
+        )
+        manifest[part_path] = part_hash.hexdigest()
+
+        file_path = f"{dataset_folder}/{part_path}/data.parquet"
+        if (
+            old_manifest.get(part_path) == manifest[part_path]
+            and os.path.exists(file_path)
+        ):
+            continue
+
+        os.makedirs(f"{dataset_folder}/{part_path}", exist_ok=True)
+        part_df.to_parquet(file_path, index=False)
+        written_list.append(part_path)
+
+    for part_path in old_manifest:
+        if part_path not in manifest:
+            shutil.rmtree(f"{dataset_folder}/{part_path}", ignore_errors=True)
+
+    os.makedirs(dataset_folder, exist_ok=True)
+    with open(
+        f"{dataset_folder}/_partitions.json",
+        "w+",
+        encoding="utf8"
+    ) as f:
+        f.write(json.dumps(manifest, indent=2, sort_keys=True))
+
+    return written_list
+
+
 def get_fox_api_key() -> str:
     """ """
     try: